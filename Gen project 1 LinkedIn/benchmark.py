@@ -0,0 +1,167 @@
+# benchmark.py - Offline throughput/latency benchmark for generate_post
+#
+# Usage:
+#   python benchmark.py [--requests 200] [--concurrency 8] [--latency-ms 300] [--tokens-per-s 100] [--failure-rate 0]
+#   python benchmark.py --task metadata [--labels processedpost.json] [--requests 10000]
+#   python benchmark.py --task extract [--requests 200] [--batch-tokens 2000] [--malformed-rate 0] [--short]
+#
+# Runs against the fake LLM backend (see llm_hleper.py), so the numbers are
+# reproducible without a Groq key or network access. Pass --backend groq to
+# measure the real service instead.
+#
+# --task metadata compares local_metadata's line_count and language with the
+# LLM-labelled posts in --labels, and times it over --requests posts against
+# a sample of LLM calls. --task extract tags --requests posts one per call
+# and then in token-budgeted batches, and compares throughput and prompt
+# tokens per post.
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return (samples[0],) * 3 if samples else (0.0, 0.0, 0.0)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate_post throughput and latency")
+    parser.add_argument("--task", choices=("generate", "metadata", "extract"), default="generate")
+    parser.add_argument("--backend", choices=("fake", "groq"), default="fake")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-s", type=float, default=100)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--batch-tokens", type=int, default=2000)
+    parser.add_argument("--short", action="store_true", help="--task extract: keep only each post's first line")
+    parser.add_argument("--labels", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "processedpost.json"))
+    parser.add_argument("--llm-sample", type=int, default=20, help="LLM calls timed by --task metadata")
+    args = parser.parse_args()
+
+    # The backend is chosen when llm_hleper is imported, so configure it first.
+    os.environ["LLM_BACKEND"] = args.backend
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_S"] = str(args.tokens_per_s)
+    os.environ["FAKE_LLM_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["FAKE_LLM_MALFORMED_RATE"] = str(args.malformed_rate)
+    os.environ.setdefault("FAKE_LLM_SEED", "1")
+    if args.task == "metadata":
+        return benchmark_metadata(args)
+    if args.task == "extract":
+        return benchmark_extract(args)
+    from post_generator import fs, generate_post
+    from llm_hleper import client
+
+    combos = list(itertools.product(("Short", "Medium", "Long"), ("English",), sorted(fs.get_tags())))
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def one(n):
+        length, language, tag = combos[n % len(combos)]
+        start = time.perf_counter()
+        try:
+            generate_post(length, language, tag)
+            error = None
+        except Exception as e:
+            error = e
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            (failures if error else latencies).append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    p50, p95, p99 = percentiles(latencies)
+    print(f"{args.requests} posts, concurrency {args.concurrency}, backend {args.backend}"
+          + (f" ({args.latency_ms}ms + {args.tokens_per_s} tok/s, failure rate {args.failure_rate})"
+             if args.backend == "fake" else ""))
+    print(f"throughput {args.requests / wall:.1f} posts/s, {len(failures)} failed")
+    print(f"latency p50 {p50:.1f}ms p95 {p95:.1f}ms p99 {p99:.1f}ms")
+    stats = client.stats()
+    print(f"llm client: {stats['attempts']} attempts, {stats['retries']} retries, {stats['hedges']} hedges "
+          f"({stats['hedge_wins']} won), {stats['timeouts']} timeouts, {stats['rejected']} rejected by the breaker")
+
+
+def load_labelled(path):
+    with open(path, encoding="utf-8") as file:
+        return [post for post in json.load(file) if "line_count" in post and "language" in post]
+
+
+def benchmark_extract(args):
+    from preporcess import extract_all_tags
+    from rate_limit import RateLimiter
+
+    texts = [post.get("text") or post.get("title", "") for post in load_labelled(args.labels)]
+    if args.short:
+        texts = [text.strip().splitlines()[0] for text in texts]
+    corpus = [f"{texts[i % len(texts)]}\n#{i}" for i in range(args.requests)]
+    print(f"{args.requests} posts, concurrency {args.concurrency}, backend {args.backend}"
+          + (f" ({args.latency_ms}ms + {args.tokens_per_s} tok/s, malformed rate {args.malformed_rate})"
+             if args.backend == "fake" else ""))
+    for label, batch_tokens in (("one post per call", 0), (f"batches of <= {args.batch_tokens} tokens", args.batch_tokens)):
+        limiter = RateLimiter()  # No caps; only counts calls and tokens
+        start = time.perf_counter()
+        tags = extract_all_tags(corpus, concurrency=args.concurrency, limiter=limiter, batch_tokens=batch_tokens)
+        wall = time.perf_counter() - start
+        failed = sum(t is None for t in tags)
+        print(f"{label}: {args.requests / wall:.1f} posts/s, {limiter.requests} calls, "
+              f"{limiter.tokens / args.requests:.0f} tokens/post (prompt + reply budget), {failed} failed")
+
+
+def benchmark_metadata(args):
+    import local_metadata
+    from preporcess import extract_tags
+
+    labelled = load_labelled(args.labels)
+    texts = [post.get("text") or post.get("title", "") for post in labelled]
+    local = local_metadata.extract_corpus(texts)
+
+    exact = sum(ours["line_count"] == post["line_count"] for ours, post in zip(local, labelled))
+    close = sum(abs(ours["line_count"] - post["line_count"]) <= 1 for ours, post in zip(local, labelled))
+    language = sum(ours["language"] == post["language"] for ours, post in zip(local, labelled))
+    hinglish = sum(post["language"] == "Hinglish" for post in labelled)
+    found = sum(ours["language"] == post["language"] == "Hinglish" for ours, post in zip(local, labelled))
+    n = len(labelled)
+    print(f"agreement with {n} LLM-labelled posts ({os.path.basename(args.labels)}):")
+    print(f"  line_count exact {exact}/{n} ({100 * exact / n:.0f}%), within 1 line {close}/{n} ({100 * close / n:.0f}%)")
+    print(f"  language {language}/{n} ({100 * language / n:.0f}%), Hinglish found {found}/{hinglish}")
+
+    corpus = [texts[i % n] + f"\n#{i}" for i in range(args.requests)]  # Distinct posts, realistic vocabulary
+    start = time.perf_counter()
+    local_metadata.extract_corpus(corpus)
+    whole = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in corpus:
+        local_metadata.extract(text)
+    single = time.perf_counter() - start
+    print(f"local, {args.requests} posts: whole corpus {whole * 1000:.1f}ms ({whole / args.requests * 1e6:.1f}us/post), "
+          f"one at a time {single * 1000:.1f}ms ({single / args.requests * 1e6:.1f}us/post)")
+
+    latencies = []
+    for text in corpus[:args.llm_sample]:
+        start = time.perf_counter()
+        try:
+            extract_tags(text)
+        except Exception:
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, _ = percentiles(latencies)
+    print(f"llm tags call, {len(latencies)} sampled: p50 {p50:.1f}ms p95 {p95:.1f}ms per post (backend {args.backend})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 import json
+import os
 import pandas as pd
 
+# Processed posts shipped next to this file; pass file_path to use another set.
+DEFAULT_POSTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processedpost.json")
+
 class FewShotPosts:
-    def __init__(self, file_path=("PATH-FOR-FILE")):
+    def __init__(self, file_path=DEFAULT_POSTS_PATH):
         self.df = None
         self.unique_tags = None
         self.load_posts(file_path)
 
     def load_posts(self, file_path):
+        # A JSON array, or the JSON-lines file written by preporcess.process_posts.
         with open(file_path, encoding="utf-8") as f:
-            posts = json.load(f)
+            if file_path.endswith(".jsonl"):
+                posts = [json.loads(line) for line in f if line.strip()]
+            else:
+                posts = json.load(f)
             df = pd.json_normalize(posts)
             df["length"] = df["line_count"].apply(self.categorize_length)
             all_tags = df['tags'].apply(lambda x: x).sum()
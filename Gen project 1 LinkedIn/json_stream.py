@@ -0,0 +1,109 @@
+# json_stream.py - Items of a large JSON array, read one at a time
+#
+#   with open("post.json", encoding="utf-8") as file:
+#       for post in json_stream.iter_items(file, key="posts"):
+#           ...
+#
+# json.load has to hold the whole document, and every post in it, in memory.
+# iter_items reads the file in chunks and decodes one array item at a time
+# with json.JSONDecoder.raw_decode, so memory stays at about one chunk plus
+# one item whatever the size of the file. Standard library only.
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 16  # Characters read at a time
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = re.compile(r"[0-9.eE+-]")
+
+
+class _Reader:
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read one more chunk, dropping what was consumed; False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next non-whitespace character, not consumed; "" at end of file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number cut at the chunk boundary decodes as a shorter one ("12" of
+            # "12.5", "1" of "1e5"), so read on until something that cannot
+            # belong to it follows, or the file ends.
+            if self._may_continue(end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def _may_continue(self, end):
+        if end == len(self.buffer):
+            return True
+        return self.buffer[end - 1] not in "\"]}" and _NUMBER_CHARS.match(self.buffer, end) is not None
+
+
+def iter_items(file, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the items of the JSON array in `file`: the top-level array, or the
+    array under `key` of a top-level object (nothing if the key is missing).
+    Other members of the object are decoded and discarded.
+    """
+    reader = _Reader(file, chunk_size)
+    if key is not None and reader.peek() == "{":
+        reader.expect("{")
+        while True:
+            if reader.peek() == "}":
+                return
+            name = reader.value()
+            reader.expect(":")
+            if name == key:
+                break
+            reader.value()
+            if reader.peek() == ",":
+                reader.expect(",")
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() != ",":
+            reader.expect("]")
+            return
+        reader.expect(",")
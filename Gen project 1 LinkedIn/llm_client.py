@@ -0,0 +1,18 @@
+# llm_client.py - Loads the LLM client shared with the other project
+#
+#   import llm_client   # the module in ../shared/llm_client.py
+#
+# The implementation lives once, in shared/llm_client.py at the repository
+# root. This file puts that module in its own place in sys.modules, so code
+# here keeps importing it as llm_client.
+
+import importlib.util
+import os
+import sys
+
+_SHARED = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared", "llm_client.py")
+
+_spec = importlib.util.spec_from_file_location(__name__, _SHARED)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
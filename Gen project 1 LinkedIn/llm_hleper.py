@@ -1,11 +1,120 @@
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.runnables import RunnableLambda
+from llm_client import LLMClient
+import json
 import os
+import random
+import re
+import threading
+import time
 
 load_dotenv()
 
-# Initialize the model
-llm = ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.3-70b-versatile")
+# --- Backend selection ---
+#   LLM_BACKEND=groq  (default) Groq's hosted model; LLM_BASE_URL points it at
+#                     any other Groq/OpenAI-compatible server instead
+#   LLM_BACKEND=fake  offline stand-in below, no network or API key needed
+# Fake backend knobs: FAKE_LLM_LATENCY_MS, FAKE_LLM_TOKENS_PER_S,
+# FAKE_LLM_FAILURE_RATE, FAKE_LLM_MALFORMED_RATE (replies cut in half),
+# FAKE_LLM_SEED.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+
+
+class FakeLLMError(Exception):
+    """Injected failure (FAKE_LLM_FAILURE_RATE)."""
+
+
+def _fake_metadata(post):
+    lines = [line for line in post.strip().splitlines() if line.strip()]
+    words = re.findall(r"[A-Za-z]{5,}", post)
+    tags = []
+    for word in sorted(set(words), key=lambda w: (-words.count(w), w)):
+        if word.title() not in tags:
+            tags.append(word.title())
+        if len(tags) == 2:
+            break
+    return {"line_count": len(lines), "language": "English", "tags": tags or ["General"]}
+
+
+def fake_reply(prompt):
+    """What the stand-in answers for the prompts in preporcess.py and post_generator.py."""
+    batch = re.search(r"Here are the posts on which you need to perform this task:\s*(.*)\Z", prompt, re.S)
+    if batch:
+        parts = re.split(r"^### Post (\d+)[ \t]*$", batch.group(1), flags=re.M)[1:]
+        return json.dumps([{"index": int(number), "tags": _fake_metadata(text)["tags"]}
+                           for number, text in zip(parts[::2], parts[1::2])])
+    post = re.search(r"Here is the actual post on which you need to perform this task:\s*(.*)\Z", prompt, re.S)
+    if post:
+        metadata = _fake_metadata(post.group(1))
+        if "line_count" not in prompt:  # The tags-only prompt
+            metadata = {"tags": metadata["tags"]}
+        return json.dumps(metadata)
+    tags = re.search(r"Here is the list of tags:\s*(.*)\Z", prompt, re.S)
+    if tags:
+        return json.dumps({tag.strip(): tag.strip().title() for tag in tags.group(1).split(",") if tag.strip()})
+    topic = re.search(r"Topic: (.*)", prompt)
+    length = re.search(r"Length: \d+ to (\d+) lines", prompt)
+    lines = int(length.group(1)) if length else 5
+    topic = topic.group(1).strip() if topic else "work"
+    return "\n".join(f"Line {n} of a post about {topic}." for n in range(1, lines + 1))
+
+
+class FakeChatModel(SimpleChatModel):
+    """Chat model stand-in with configurable latency, token rate and failure injection."""
+
+    latency_ms: float = 300
+    tokens_per_s: float = 100
+    failure_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int | None = None
+
+    def model_post_init(self, __context):
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            malformed = self._random.random() < self.malformed_rate
+        if failed:
+            raise FakeLLMError("Injected fake LLM failure")
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = fake_reply(prompt)
+        if malformed:
+            text = text[:len(text) // 2]
+        output_tokens = max(1, len(text) // 4)
+        time.sleep(self.latency_ms / 1000 + (output_tokens / self.tokens_per_s if self.tokens_per_s else 0))
+        return text
+
+
+def create_llm():
+    if LLM_BACKEND == "fake":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return FakeChatModel(latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", 300)),
+                             tokens_per_s=float(os.getenv("FAKE_LLM_TOKENS_PER_S", 100)),
+                             failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", 0)),
+                             malformed_rate=float(os.getenv("FAKE_LLM_MALFORMED_RATE", 0)),
+                             seed=int(seed) if seed else None)
+    if LLM_BACKEND == "groq":
+        # Retries are left to LLMClient, so they share its deadline and breaker.
+        return ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.3-70b-versatile",
+                        base_url=os.getenv("LLM_BASE_URL") or None, max_retries=0)
+    raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}' (expected 'groq' or 'fake')")
+
+
+# Initialize the model. Calls go through LLMClient: per-call deadline,
+# jittered retries, optional hedging and a circuit breaker (LLM_* env vars,
+# see llm_client.py). `llm` is still a Runnable, so `prompt | llm` and
+# llm.invoke() work as before.
+chat_model = create_llm()
+client = LLMClient("groq")
+llm = RunnableLambda(lambda prompt: client.call(chat_model.invoke, prompt), name="llm")
 
 if __name__ == "__main__":
     # Invoke the model
@@ -13,4 +122,3 @@ if __name__ == "__main__":
     
     # Print the response content
     print(response.content)  # Adjust this based on the structure of the `invoke` method's return
-
@@ -0,0 +1,119 @@
+# local_metadata.py - line_count and language of a post, computed without the LLM
+#
+#   local_metadata.extract("sapne dekhna achi baat hai")   # {"line_count": 1, "language": "Hinglish"}
+#   local_metadata.extract_corpus(texts)                   # same, for a whole list of posts
+#
+# line_count is the number of non-empty lines. language is English or
+# Hinglish (Hindi written in Latin script, mixed with English): a word counts
+# as Hindi when it is in the lexicon below, or, for words in neither word
+# list, when its character trigrams look more like the Hindi seed words than
+# the English ones. A post is Hinglish when enough of its words are Hindi.
+#
+# extract_corpus classifies each distinct word of the corpus once, so a
+# corpus costs roughly one dictionary lookup per word. Agreement with the
+# LLM's labels is measured by `python benchmark.py --task metadata`.
+
+import math
+import re
+from collections import Counter
+
+HINGLISH_MIN_RATIO = 0.2  # Share of a post's words that must be Hindi
+HINGLISH_MIN_WORDS = 2    # ... and at least this many, so one "yaar" does not flip a post
+NGRAM_MARGIN = 1.0        # Mean trigram log-odds a word needs to count as Hindi
+
+# Frequent romanized Hindi words that are not also English words ("main",
+# "to", "hi", "par", "so", "the" are left out for that reason).
+HINDI_WORDS = frozenset("""
+    hai hain tha thi nahi nahin nhi kya kyu kyun kyunki kaise kaisa kaisi kab kahan kaha kaun
+    mein mai mujhe mera meri mere tum tumhe tera teri tere aap aapka aapki apna apni apne hum humein
+    hamara hamari yeh ye woh wo voh iska iski uska uski unka unki inka unhe inhe usne maine
+    ka ki ke ko se bhi aur ya toh lekin magar phir fir abhi ab sab kuch kuchh koi bahut bohot
+    zyada jyada kam accha acha achha achi achhi bura bekaar sahi galat pata samajh socho soch
+    karna karo karte karta karti kar kiya kiye liya diya dena lena hona hota hoti hote hua hue
+    raha rahi rahe rha rhi gaya gayi gaye jaana jao jata jati chahiye chaiye sakta sakti sakte
+    dekho dekha dekh dekhna bolo bola bolna suno suna likhna likha padhai naukri kaam paisa paise
+    yaar bhai dost log logon baat baatein wala wali wale waala sapna sapne dil zindagi duniya
+    jab tab jaisa jaise aisa aise waise agar warna matlab bas sirf kabhi hamesha pehle baad
+    din saal mahina aaj kal raat subah shaam ghar bahar andar upar neeche sath saath liye
+    na haan ji bilkul shayad zaroor jaldi dheere thoda thodi bada badi bade chota choti
+    mushkil aasan milna mila mili aajkal zaroori samjho kijiye chalo dekhiye padhna bekar
+""".split())
+
+ENGLISH_WORDS = frozenset("""
+    the be to of and a in that have i it for not on with he as you do at this but his by from they
+    we say her she or an will my one all would there their what so up out if about who get which go
+    me when make can like time no just him know take people into year your good some could them see
+    other than then now look only come its over think also back after use two how our work first
+    well way even new want because any these give day most us is are was were been has had did does
+    job jobs interview interviews company companies career linkedin post posts hiring manager team
+    application applications rejection growth skills learning network offer salary role resume
+    everyone someone something nothing every never always again still here why where thank thanks
+    life feel felt heart right better best great much many more less last next same each while
+    through during before between under without within against toward people's don't can't i'm
+""".split())
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_NONEMPTY_LINE = re.compile(r"^[ \t]*\S", re.MULTILINE)
+
+
+# --- Character n-gram model ---
+
+def _trigrams(word):
+    padded = f"^{word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _profile(words):
+    counts = Counter(gram for word in words for gram in _trigrams(word))
+    total = sum(counts.values())
+    return counts, total
+
+
+_HINDI_PROFILE = _profile(HINDI_WORDS)
+_ENGLISH_PROFILE = _profile(ENGLISH_WORDS)
+_VOCABULARY = len(set(_HINDI_PROFILE[0]) | set(_ENGLISH_PROFILE[0]))
+
+
+def _log_prob(gram, profile):
+    counts, total = profile
+    return math.log((counts[gram] + 1) / (total + _VOCABULARY))  # Add-one smoothing
+
+
+def ngram_log_odds(word):
+    """Mean per-trigram log-odds that `word` is romanized Hindi rather than English."""
+    grams = _trigrams(word)
+    return sum(_log_prob(g, _HINDI_PROFILE) - _log_prob(g, _ENGLISH_PROFILE) for g in grams) / len(grams)
+
+
+def is_hindi_word(word):
+    if word in HINDI_WORDS:
+        return True
+    if word in ENGLISH_WORDS or len(word) < 4 or "'" in word:
+        return False
+    return ngram_log_odds(word) > NGRAM_MARGIN
+
+
+# --- Extraction ---
+
+def line_count(text):
+    return len(_NONEMPTY_LINE.findall(text))
+
+
+def _language(words, hindi):
+    hits = sum(1 for word in words if hindi[word])
+    if hits >= HINGLISH_MIN_WORDS and hits >= HINGLISH_MIN_RATIO * len(words):
+        return "Hinglish"
+    return "English"
+
+
+def extract(text):
+    """{"line_count": ..., "language": ...} for one post."""
+    return extract_corpus([text])[0]
+
+
+def extract_corpus(texts):
+    """extract() for every text, in order, classifying each distinct word only once."""
+    tokenized = [_WORD.findall(text.lower()) for text in texts]
+    hindi = {word: is_hindi_word(word) for word in set().union(*tokenized)}
+    return [{"line_count": line_count(text), "language": _language(words, hindi)}
+            for text, words in zip(texts, tokenized)]
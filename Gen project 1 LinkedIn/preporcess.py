@@ -1,61 +1,495 @@
+import hashlib
+import itertools
 import json
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
-from llm_hleper import llm
+from llm_hleper import chat_model, client, llm
+from llm_client import LLM_RETRIES, OPEN, CircuitOpenError, LLMUnavailable
+from rate_limit import RateLimiter
+import json_stream
+import local_metadata
 
-def process_posts(raw_file_path, processed_file_path="processed_post.json"):
-    enriched_posts = []
+# --- Extraction settings (override through the environment / .env) ---
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", 8))      # Posts extracted at once
+EXTRACT_PARSE_RETRIES = int(os.getenv("EXTRACT_PARSE_RETRIES", 2))  # Re-asks after an unparsable reply
+EXTRACT_LLM_RETRIES = LLM_RETRIES                                    # Re-sends after a failed call (see _invoke)
+LLM_RPM = int(os.getenv("LLM_RPM", 30))                             # Provider caps; 0 = no limit
+LLM_TPM = int(os.getenv("LLM_TPM", 6000))
+EXTRACT_REPLY_TOKENS = 30                                            # Budgeted for each tags reply
+EXTRACT_BATCH_TOKENS = int(os.getenv("EXTRACT_BATCH_TOKENS", 2000))  # Prompt budget per batch; 0 = one post per call
+EXTRACT_BATCH_MAX = int(os.getenv("EXTRACT_BATCH_MAX", 25))          # Posts per batch at most
+PROGRESS_INTERVAL = 2.0                                              # Seconds between progress lines
+STREAM_CHUNK = int(os.getenv("STREAM_CHUNK", 500))                  # Posts enriched, written and checkpointed together
+MANIFEST_SAVE_INTERVAL = 30.0                                        # Seconds between manifest saves during a run
+
+# line_count and language are computed locally (local_metadata.py); the LLM
+# is only asked for the tags.
+METADATA_TEMPLATE = '''
+    You are given a LinkedIn post. You need to extract tags for the post.
+    1. Return a valid JSON. No preamble. 
+    2. JSON object should have exactly one key: tags. 
+    3. tags is an array of text tags. Extract maximum two tags.
     
-    # Read and process the raw file
-    with open(raw_file_path, encoding='utf-8') as file:
-        posts = json.load(file)
-        for post in posts.get("posts", []):  # Ensure posts key exists in JSON
-            metadata = extract_metadata(post["title"])
-            post_with_metadata = {**post, **metadata}  # Use dictionary unpacking for Python >= 3.5
-            enriched_posts.append(post_with_metadata)
-
-    print(f"Debug: Enriched Posts Data: {enriched_posts}")  # Log the enriched posts to check tags
+    Here is the actual post on which you need to perform this task:  
+    {post}
+    '''
+metadata_prompt = PromptTemplate.from_template(METADATA_TEMPLATE)
+
+# Several posts per call: the instructions are sent once per batch instead of
+# once per post. Posts are packed up to EXTRACT_BATCH_TOKENS (see plan_batches).
+BATCH_TEMPLATE = '''
+    You are given {count} LinkedIn posts. Each post starts with a line "### Post <index>". You need to extract tags for every post.
+    1. Return a valid JSON array. No preamble. 
+    2. The array should have one object per post, with exactly two keys: index (the post's number) and tags. 
+    3. tags is an array of text tags. Extract maximum two tags per post.
     
-    unified_tags = get_unified_tags(enriched_posts)
+    Here are the posts on which you need to perform this task:  
+    {posts}
+    '''
+batch_prompt = PromptTemplate.from_template(BATCH_TEMPLATE)
+
+# --- Manifest ---
+# <processed file>.manifest.json remembers, per post, the tags extracted
+# for it (keyed by a SHA-256 of the text sent to the LLM), and every raw tag
+# already mapped to a unified one. A rerun only sends new or edited posts to
+# the LLM and only asks it to unify tags it has not seen. Changing
+# METADATA_TEMPLATE invalidates the stored tags.
+MANIFEST_VERSION = 1
+_TEMPLATE_HASH = hashlib.sha256(METADATA_TEMPLATE.encode("utf-8")).hexdigest()[:16]
+
+
+def manifest_path_for(processed_file_path):
+    return os.path.splitext(processed_file_path)[0] + ".manifest.json"
+
+
+def post_key(post_text):
+    return hashlib.sha256(post_text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path):
+    """The stored manifest, or an empty one if it is missing, unreadable or from another template."""
+    empty = {"version": MANIFEST_VERSION, "template": _TEMPLATE_HASH, "posts": {}, "tag_map": {}}
+    try:
+        with open(path, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable manifest {path}: {e}")
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    if manifest.get("template") != _TEMPLATE_HASH:
+        # Raw tags keep their unified form; only the posts are re-tagged.
+        return dict(empty, tag_map=manifest.get("tag_map", {}))
+    return manifest
+
+
+def save_manifest(path, manifest):
+    # Write-then-rename, so a crash never leaves a half-written manifest behind.
+    temp_path = path + ".tmp"
+    with open(temp_path, encoding="utf-8", mode="w") as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, path)
+
+
+# --- Checkpoint ---
+# process_posts appends to its JSONL output chunk by chunk. After each chunk
+# <processed file>.checkpoint.json records how many input posts are done and
+# how many bytes of output they produced. A run that stops midway is resumed
+# by the next one: the output is cut back to the checkpoint (dropping any
+# half-written chunk) and reading carries on after the posts already done.
+# The checkpoint is removed once the whole input has been processed.
+
+def checkpoint_path_for(processed_file_path):
+    return os.path.splitext(processed_file_path)[0] + ".checkpoint.json"
+
+
+def _source_id(raw_file_path):
+    # A checkpoint only applies to the raw file it was made from.
+    stat = os.stat(raw_file_path)
+    return {"path": os.path.abspath(raw_file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoint(path, raw_file_path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable checkpoint {path}: {e}")
+        return None
+    if checkpoint.get("source") != _source_id(raw_file_path):
+        print("Raw posts changed since the last checkpoint; starting over.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    temp_path = path + ".tmp"
+    with open(temp_path, encoding="utf-8", mode="w") as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_path, path)
+
+
+def read_posts(raw_file_path):
+    """
+    Yield the raw posts one at a time: lines of a .jsonl file, or the items
+    of the "posts" array (or a top-level array) of a JSON file.
+    """
+    with open(raw_file_path, encoding="utf-8") as file:
+        if raw_file_path.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json_stream.iter_items(file, key="posts")
+
+
+def estimate_tokens(text):
+    # Roughly what the provider counts for English text.
+    return max(1, len(text) // 4)
+
+
+def process_posts(raw_file_path, processed_file_path="processed_post.jsonl", concurrency=EXTRACT_CONCURRENCY,
+                  limiter=None, manifest_path=None, chunk_size=STREAM_CHUNK, resume=True):
+    """
+    Enrich the posts of raw_file_path with line_count, language and tags and
+    write them to processed_file_path, one JSON object per line. Posts are
+    read, enriched and appended chunk_size at a time, so memory does not grow
+    with the corpus (apart from the manifest), and each chunk is checkpointed:
+    with resume=True a run that stopped midway picks up where it left off.
+    """
+    manifest_path = manifest_path or manifest_path_for(processed_file_path)
+    manifest = load_manifest(manifest_path)
+    checkpoint_path = checkpoint_path_for(processed_file_path)
+    checkpoint = load_checkpoint(checkpoint_path, raw_file_path) if resume else None
+    if checkpoint and (not os.path.exists(processed_file_path)
+                       or os.path.getsize(processed_file_path) < checkpoint["bytes"]):
+        checkpoint = None  # The output it describes is gone or was cut short
+    limiter = limiter or RateLimiter(rpm=LLM_RPM, tpm=LLM_TPM)
+
+    done = checkpoint["posts"] if checkpoint else 0
+    if checkpoint:
+        print(f"Resuming after {done} posts already written to {processed_file_path}.")
+        outfile = open(processed_file_path, "r+b")
+        outfile.truncate(checkpoint["bytes"])
+        outfile.seek(checkpoint["bytes"])
+    else:
+        outfile = open(processed_file_path, "wb")
+
+    current = {}  # Manifest entries of the posts in this run, to forget removed posts at the end
+    last_save = time.monotonic()
+    totals = {"sent": 0, "untagged": 0}
+    try:
+        # Posts before the checkpoint are still parsed, but cost nothing else.
+        posts = itertools.islice(read_posts(raw_file_path), done, None)
+        while True:
+            chunk = list(itertools.islice(posts, chunk_size))
+            if not chunk:
+                break
+            records = _enrich_chunk(chunk, manifest, current, concurrency, limiter, totals)
+            outfile.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8"))
+            outfile.flush()
+            os.fsync(outfile.fileno())
+            done += len(chunk)
+            save_checkpoint(checkpoint_path, {"source": _source_id(raw_file_path), "posts": done,
+                                              "bytes": outfile.tell()})
+            if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                save_manifest(manifest_path, manifest)
+                last_save = time.monotonic()
+    finally:
+        outfile.close()
+        save_manifest(manifest_path, manifest)
+
+    if not checkpoint:
+        manifest["posts"] = current  # Forget posts no longer in the input (only known after a full pass)
+        save_manifest(manifest_path, manifest)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"Wrote {done} posts to {processed_file_path}; {totals['sent']} sent to the LLM for tags.")
+    if totals["untagged"]:
+        print(f"Warning: {totals['untagged']} post(s) could not be tagged and were saved as Uncategorized; "
+              f"rerun to retry them.")
+
+
+def _enrich_chunk(posts, manifest, current, concurrency, limiter, totals):
+    """The enriched records for one chunk of raw posts, updating the manifest as tags come in."""
+    stored = manifest["posts"]
+    keys = [post_key(post["title"]) for post in posts]
+
+    # Only posts whose text is new or changed go to the LLM, and only for tags.
+    pending = sorted({key: i for i, key in reversed(list(enumerate(keys))) if key not in stored}.values())
+    if pending:
+        totals["sent"] += len(pending)
+        results = extract_all_tags([posts[i]["title"] for i in pending], concurrency=concurrency, limiter=limiter)
+        for i, tags in zip(pending, results):
+            if tags is not None:
+                stored[keys[i]] = {"tags": tags}
+
+    enriched_posts = []
+    local = local_metadata.extract_corpus([post["title"] for post in posts])
+    for post, key, metadata in zip(posts, keys, local):
+        if key in stored:
+            current[key] = stored[key]
+            tags = list(stored[key]["tags"])
+        else:
+            totals["untagged"] += 1
+            tags = []  # The LLM could not tag it; keep the post with its local metadata
+        enriched_posts.append({**post, **metadata, "tags": tags})  # Use dictionary unpacking for Python >= 3.5
+
+    tag_map = manifest["tag_map"]
+    new_tags = sorted({tag for post in enriched_posts for tag in post["tags"]} - set(tag_map))
+    if new_tags:
+        tag_map.update(_unify_new_tags(new_tags, known_tags=sorted(set(tag_map.values()))))
     for post in enriched_posts:
         current_tags = post['tags']
-        new_tags = {unified_tags.get(tag, tag) for tag in current_tags}
+        new_tags = {tag_map.get(tag, tag) for tag in current_tags}
         post['tags'] = list(new_tags)
 
         # Handle posts without tags
         if not post.get('tags'):
             post['tags'] = ["Uncategorized"]  # Assign default tag if none exist
+    return enriched_posts
 
-    with open(processed_file_path, encoding='utf-8', mode="w") as outfile:
-        json.dump(enriched_posts, outfile, indent=4)
 
-def extract_metadata(post_title):
-    template = '''
-    You are given a LinkedIn post. You need to extract number of lines, language of the post and tags.
-    1. Return a valid JSON. No preamble. 
-    2. JSON object should have exactly three keys: line_count, language and tags. 
-    3. tags is an array of text tags. Extract maximum two tags.
-    4. Language should be English or Hinglish (Hinglish means hindi + english)
-    
-    Here is the actual post on which you need to perform this task:  
-    {post}
-    '''
+def extract_all(post_texts, concurrency=EXTRACT_CONCURRENCY, limiter=None, retries=EXTRACT_PARSE_RETRIES):
+    """
+    Metadata for every post, in input order. line_count and language come
+    from local_metadata; tags from the LLM, or [] for a post it could not tag.
+    """
+    tags = extract_all_tags(post_texts, concurrency=concurrency, limiter=limiter, retries=retries)
+    return [{**metadata, "tags": post_tags or []}
+            for metadata, post_tags in zip(local_metadata.extract_corpus(post_texts), tags)]
+
+
+def extract_all_tags(post_texts, concurrency=EXTRACT_CONCURRENCY, limiter=None, retries=EXTRACT_PARSE_RETRIES,
+                     batch_tokens=EXTRACT_BATCH_TOKENS, batch_max=EXTRACT_BATCH_MAX):
+    """
+    Tags for every post, extracted `concurrency` calls at a time under the
+    LLM_RPM / LLM_TPM rate limits, with progress lines on stderr. Posts are
+    sent in batches of up to `batch_tokens` prompt tokens (see plan_batches);
+    batch_tokens=0 sends one post per call.
+
+    Returns a list in input order: the tags, or None for a post whose
+    extraction still failed after its retries.
+    """
+    limiter = limiter or RateLimiter(rpm=LLM_RPM, tpm=LLM_TPM)
+    results = [None] * len(post_texts)
+    progress = _Progress(len(post_texts))
+    if batch_tokens > 0:
+        batches = plan_batches(post_texts, batch_tokens, batch_max)
+    else:
+        batches = [[index] for index in range(len(post_texts))]
+
+    def extract(batch):
+        try:
+            _extract_batch(post_texts, batch, results, limiter, retries)
+        except Exception as e:
+            print(f"Error: tag extraction failed for post(s) {', '.join(str(i + 1) for i in batch)}: {e}")
+        failures = sum(results[index] is None for index in batch)
+        progress.done(len(batch), failures)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="extract") as executor:
+        list(executor.map(extract, batches))
+    progress.finish(limiter)
+    return results
+
+
+def plan_batches(post_texts, batch_tokens=EXTRACT_BATCH_TOKENS, batch_max=EXTRACT_BATCH_MAX):
+    """
+    Split post indices into consecutive batches whose prompt stays within
+    `batch_tokens` (instructions, posts and the expected reply) and holds at
+    most `batch_max` posts. A post too big for any batch goes on its own.
+    """
+    overhead = estimate_tokens(BATCH_TEMPLATE)
+    batches, batch, used = [], [], overhead
+    for index, text in enumerate(post_texts):
+        cost = estimate_tokens(text) + EXTRACT_REPLY_TOKENS + 4  # + the "### Post n" line
+        if batch and (used + cost > batch_tokens or len(batch) >= batch_max):
+            batches.append(batch)
+            batch, used = [], overhead
+        batch.append(index)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
 
-    pt = PromptTemplate.from_template(template)
-    chain = pt | llm
-    response = chain.invoke(input={"post": post_title})
 
+def _extract_batch(post_texts, batch, results, limiter, retries):
+    """
+    Store into `results` the tags of the posts at `batch` indices. A
+    malformed reply splits the batch in two and retries each half; posts a
+    valid reply left out are retried as their own batch. A single post falls
+    back to extract_tags. LLM errors (unavailable, breaker open) propagate.
+    """
+    if len(batch) == 1:
+        results[batch[0]] = extract_tags(post_texts[batch[0]], limiter=limiter, retries=retries)
+        return
     try:
-        json_parser = JsonOutputParser()
-        res = json_parser.parse(response.content)
-        print(f"Debug: Extracted metadata: {res}")  # Log the metadata extracted
-    except OutputParserException:
-        print(f"Error: Failed to parse LLM response: {response.content}")
-        raise OutputParserException("Context too big. Unable to parse jobs.")
-    
-    return res
+        found = extract_tags_batch([post_texts[index] for index in batch], limiter=limiter)
+        if not found:
+            raise OutputParserException("The reply tagged none of the posts.")
+    except OutputParserException as e:
+        print(f"Error: malformed batch reply for {len(batch)} posts, splitting the batch: {e}")
+        middle = len(batch) // 2
+        _extract_batch(post_texts, batch[:middle], results, limiter, retries)
+        _extract_batch(post_texts, batch[middle:], results, limiter, retries)
+        return
+    for number, tags in found.items():
+        results[batch[number - 1]] = tags
+    missing = [batch[number - 1] for number in range(1, len(batch) + 1) if number not in found]
+    if missing:
+        _extract_batch(post_texts, missing, results, limiter, retries)
+
+
+def extract_tags_batch(post_texts, limiter=None):
+    """
+    Ask the LLM for the tags of several posts in one call. Returns
+    {post number (1-based): tags} for the posts the reply covered; raises
+    OutputParserException when the reply is not a JSON array of
+    {"index", "tags"} objects.
+    """
+    posts = "\n".join(f"### Post {number}\n{text}" for number, text in enumerate(post_texts, 1))
+    prompt = batch_prompt.format(count=len(post_texts), posts=posts)
+    response = _invoke(prompt, limiter, tokens=estimate_tokens(prompt) + EXTRACT_REPLY_TOKENS * len(post_texts))
+    reply = JsonOutputParser().parse(response.content)
+    if not isinstance(reply, list):
+        raise OutputParserException(f"Expected a JSON array, got: {response.content[:200]}")
+    found = {}
+    for item in reply:
+        try:
+            number, tags = int(item["index"]), item["tags"]
+        except (KeyError, TypeError, ValueError):
+            raise OutputParserException(f"Malformed batch item: {item!r}")
+        tags = _tag_list(tags)
+        if 1 <= number <= len(post_texts) and tags is not None:
+            found[number] = tags
+    return found
+
+
+class _Progress:
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.failures = 0
+        self.started = time.monotonic()
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def done(self, count=1, failures=0):
+        with self._lock:
+            self.completed += count
+            self.failures += failures
+            now = time.monotonic()
+            if now - self._last < PROGRESS_INTERVAL and self.completed < self.total:
+                return
+            self._last = now
+            elapsed = now - self.started
+            rate = self.completed / elapsed if elapsed else 0.0
+            eta = (self.total - self.completed) / rate if rate else 0.0
+            print(f"Tagged {self.completed}/{self.total} posts ({100 * self.completed / self.total:.0f}%), "
+                  f"{rate:.1f} posts/s, {self.failures} failed, ETA {eta:.0f}s", file=sys.stderr)
+
+    def finish(self, limiter):
+        elapsed = time.monotonic() - self.started
+        print(f"Tag extraction: {self.completed - self.failures}/{self.total} posts in {elapsed:.1f}s "
+              f"(workers spent {limiter.waited:.1f}s waiting on rate limits)", file=sys.stderr)
+
+
+def extract_metadata(post_title, limiter=None, retries=EXTRACT_PARSE_RETRIES):
+    """
+    line_count, language and tags of one post. Only the tags need the LLM;
+    when it is unavailable the post gets the local fields and no tags.
+    """
+    metadata = local_metadata.extract(post_title)
+    try:
+        metadata["tags"] = extract_tags(post_title, limiter=limiter, retries=retries)
+    except Exception as e:
+        print(f"Error: tag extraction failed, using local metadata only: {e}")
+        metadata["tags"] = []
+    return metadata
+
+
+def extract_tags(post_title, limiter=None, retries=EXTRACT_PARSE_RETRIES):
+    """
+    Ask the LLM for the tags of one post. An unparsable reply is re-asked up
+    to `retries` times before OutputParserException.
+    """
+    prompt = metadata_prompt.format(post=post_title)
+    json_parser = JsonOutputParser()
+    for attempt in range(retries + 1):
+        response = _invoke(prompt, limiter, tokens=estimate_tokens(prompt) + EXTRACT_REPLY_TOKENS)
+        try:
+            tags = _tag_list(json_parser.parse(response.content)["tags"])
+        except (OutputParserException, KeyError, TypeError):
+            tags = None
+        if tags is not None:
+            return tags
+        print(f"Error: Failed to parse LLM response (attempt {attempt + 1}/{retries + 1}): {response.content}")
+    raise OutputParserException("Context too big. Unable to parse jobs.")
+
+
+def _tag_list(tags):
+    """A reply's tags as a list: a lone string is one tag (not a list of characters); None if unusable."""
+    if isinstance(tags, str):
+        return [tags] if tags.strip() else []
+    if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+        return tags
+    return None
+
+
+def _invoke(prompt, limiter=None, tokens=0, retries=EXTRACT_LLM_RETRIES):
+    """
+    One LLM request for the extraction pipeline, with every attempt charged to
+    the limiter. The client's own retries are turned off for these calls
+    (they would go out without passing the RPM/TPM buckets); a call that
+    fails retryably is re-sent here after a jittered backoff instead.
+    """
+    for attempt in range(retries + 1):
+        if client.breaker.state == OPEN:
+            # Fail before waiting on the rate limiter for a call that would be rejected.
+            raise CircuitOpenError("LLM circuit breaker open, not tagging")
+        if limiter is not None:
+            limiter.acquire(tokens=tokens)
+        try:
+            return client.call(chat_model.invoke, prompt, retries=0)
+        except CircuitOpenError:
+            raise
+        except LLMUnavailable as e:
+            if attempt >= retries:
+                raise
+            delay = random.uniform(0, min(client.retry_max, client.retry_base * 2 ** attempt))
+            print(f"Warning: LLM call failed (attempt {attempt + 1}/{retries + 1}), retrying in {delay:.2f}s: {e}")
+            time.sleep(delay)
+
+
+def _unify_new_tags(new_tags, known_tags):
+    """
+    unify_tags for a chunk of the pipeline, which must not stop it: if the
+    LLM fails or its reply is not a tag -> tag mapping, the raw tags are kept
+    for now (and not recorded, so a later run tries to unify them again).
+    Tags a valid reply leaves out map to themselves, so an unchanged corpus
+    never sends them to the LLM again.
+    """
+    try:
+        unified = unify_tags(new_tags, known_tags=known_tags)
+        if not isinstance(unified, dict):
+            raise OutputParserException(f"Expected a JSON object, got {type(unified).__name__}")
+    except Exception as e:
+        print(f"Warning: could not unify {len(new_tags)} tag(s), keeping them as they are: {e}")
+        return {}
+    return {tag: unified[tag] if isinstance(unified.get(tag), str) and unified[tag].strip() else tag
+            for tag in new_tags}
+
 
 def get_unified_tags(posts_with_metadata):
     unique_tags = set()
@@ -70,10 +504,10 @@ def get_unified_tags(posts_with_metadata):
     if not unique_tags:
         raise ValueError("No tags found in posts. Unable to unify tags.")
 
-    unique_tags_list = ','.join(unique_tags)
-    print(f"Debug: Unique Tags List: {unique_tags_list}")  # Log tags being passed to LLM
+    return unify_tags(sorted(unique_tags))
+
 
-    template = '''I will give you a list of tags. You need to unify tags with the following requirements,
+UNIFY_TEMPLATE = '''I will give you a list of tags. You need to unify tags with the following requirements,
     1. Tags are unified and merged to create a shorter list. 
        Example 1: "Jobseekers", "Job Hunting" can be all merged into a single tag "Job Search". 
        Example 2: "Motivation", "Inspiration", "Drive" can be mapped to "Motivation"
@@ -81,17 +515,30 @@ def get_unified_tags(posts_with_metadata):
        Example 4: "Scam Alert", "Job Scam" etc. can be mapped to "Scams"
     2. Each tag should follow title case convention. Example: "Motivation", "Job Search".
     3. Output should be a JSON object, with mappings of original tag and the unified tag. 
-       For example: {"Jobseekers": "Job Search",  "Job Hunting": "Job Search", "Motivation": "Motivation"}
-    
+       For example: {{"Jobseekers": "Job Search",  "Job Hunting": "Job Search", "Motivation": "Motivation"}}
+    {known}
     Here is the list of tags: 
     {tags}
     '''
+unify_prompt = PromptTemplate.from_template(UNIFY_TEMPLATE)
+
 
-    pt = PromptTemplate.from_template(template)
-    chain = pt | llm
+def unify_tags(tags, known_tags=()):
+    """
+    Map each raw tag to a unified one. known_tags are unified tags already in
+    use; the LLM is asked to reuse them, so an incremental run extends the
+    existing mapping instead of inventing a parallel one.
+    """
+    unique_tags_list = ','.join(tags)
+    print(f"Debug: Unifying {len(tags)} new tag(s)")  # Log how many tags are passed to LLM
+    known = ""
+    if known_tags:
+        known = ("4. These unified tags already exist. Map a tag to one of them when it means the same thing: "
+                 + ", ".join(known_tags) + "\n")
+    prompt = unify_prompt.format(tags=unique_tags_list, known=known)
 
     try:
-        response = chain.invoke(input={"tags": unique_tags_list})
+        response = llm.invoke(prompt)
         json_parser = JsonOutputParser()
         res = json_parser.parse(response.content)
     except OutputParserException:
@@ -103,7 +550,7 @@ def get_unified_tags(posts_with_metadata):
 if __name__ == "__main__":
     # Use raw strings or double backslashes for file paths on Windows
     raw_file_path = r"C:\Python Program\PYTHON\Gen AI\post.json"
-    processed_file_path = r"C:\Python Program\PYTHON\Gen AI\processed_post.json"
+    processed_file_path = r"C:\Python Program\PYTHON\Gen AI\processed_post.jsonl"
     
     # Ensure paths exist before processing
     if os.path.exists(raw_file_path):
@@ -0,0 +1,63 @@
+# rate_limit.py - Token buckets for the provider's requests- and tokens-per-minute caps
+#
+#   limiter = RateLimiter(rpm=30, tpm=6000)
+#   limiter.acquire(tokens=450)   # blocks until one request and 450 tokens are free
+#
+# Each bucket holds up to a minute's allowance and refills continuously, so
+# a burst can use what accumulated while idle but the average stays under the
+# cap. A cap of 0 disables that bucket.
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # Refill per second
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` is available (0 if it is now)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)  # A request larger than the cap waits for a full bucket
+        return 0.0 if self._level >= amount else (amount - self._level) / self.rate
+
+    def take(self, amount):
+        if self.rate:
+            self._level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets, shared by all worker threads."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Total seconds callers spent throttled
+        self.requests = 0  # Requests and tokens granted so far
+        self.tokens = 0
+
+    def acquire(self, tokens=0):
+        """Block until one request and `tokens` tokens fit under both caps, then take them."""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+                if delay <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    self.waited += now - started
+                    self.requests += 1
+                    self.tokens += tokens
+                    return
+            time.sleep(delay)
@@ -0,0 +1,46 @@
+# test_json_stream.py - json_stream.iter_items against json.load
+#
+#   python -m unittest test_json_stream
+#
+# Every document is read with every chunk size from 1 up to its full length,
+# so each value gets cut at every possible chunk boundary.
+
+import io
+import json
+import unittest
+
+import json_stream
+
+DOCUMENTS = [
+    '[12.5, 3]',
+    '[1e5, -2E-3, 0.25e+10, -0, 7]',
+    '{"posts": [{"title": "a ]}, \\"b\\"", "engagement": 12.75}, {"title": "\\u00e9 x", "n": 1e2}]}',
+    '{"meta": {"a": [1, 2, {"x": "]"}]}, "n": 12345.5, "posts": [1, [2, [3.5]], "s", null, true], "after": 1}',
+    ' \n [ ] ',
+    '{"other": 1}',
+]
+
+
+def expected(document):
+    data = json.loads(document)
+    return data.get("posts", []) if isinstance(data, dict) else data
+
+
+class IterItemsTest(unittest.TestCase):
+    def test_every_chunk_size_matches_json_load(self):
+        for document in DOCUMENTS:
+            for chunk_size in range(1, len(document) + 1):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    items = list(json_stream.iter_items(io.StringIO(document), key="posts", chunk_size=chunk_size))
+                    self.assertEqual(items, expected(document))
+
+    def test_truncated_document_raises(self):
+        for document in ('{"posts": [1, 2', '[12.', '[{"title": "x"'):
+            for chunk_size in (1, 3, 64):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        list(json_stream.iter_items(io.StringIO(document), key="posts", chunk_size=chunk_size))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,13 +5,23 @@ import json
 import logging
 import secrets # For generating secure tokens
 from datetime import datetime, timedelta # For token expiration
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
-from werkzeug.security import generate_password_hash, check_password_hash # For password hashing
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, flash, stream_with_context
 
 # --- Import your custom modules ---
 try:
     import llm1
+    import llm_client
     import dict as dict_logic
+    import responses
+    import user_store
+    import password_hashing # Runs the password KDF on a bounded process pool
+    import metrics
+    import mysql_helpers
+    import fast_intent
+    import prompt_builder
+    import view_cache
+    import pagination
+    from intent import IntentPlan
     # from old_mysql import Hospital # Assuming this might be used elsewhere or by dict_logic
     # import mysql_helpers         # Assuming this might be used elsewhere or by dict_logic
 except ImportError as e:
@@ -25,47 +35,77 @@ app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev_secret_key_replace_me_1
 if app.secret_key == 'dev_secret_key_replace_me_123!':
     print("WARNING: Using default development secret key. Set FLASK_SECRET_KEY environment variable for production.")
 
+# Signed "more" tokens for paged listings (see pagination.py).
+continuations = pagination.Continuations(app.secret_key)
+NOTHING_MORE = "ℹ️ There is nothing more to show."
+
 # --- Logging Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 app.logger.setLevel(logging.INFO)
 
 # --- Global Variables / Constants ---
-OUTPUT_JSON_PATH = 'output.json'
 # Token validity duration (e.g., 1 hour)
 PASSWORD_RESET_TIMEOUT = timedelta(hours=1)
 
-# --- Placeholder User Data Store ---
-# !!! WARNING: Storing data like this is INSECURE and NOT for production !!!
-# Use a proper database (SQLAlchemy, etc.) in a real application.
-# Structure: { 'username': {'password_hash': '...', 'role': '...', 'email': '...',
-#                           'reset_token': '...', 'reset_token_expiry': datetime_object } }
-users_db = {
-    # Add initial admin/user with hashed passwords
+# --- User Data Store ---
+# Accounts live in user_store (in-memory by default; USER_STORE_BACKEND=sqlite
+# persists them and shares them between workers). Records look like:
+#   {'password_hash': '...', 'role': '...', 'email': '...',
+#    'reset_token': '...', 'reset_token_expiry': datetime_object}
+users_db = user_store.create_user_store()
+
+# Initial admin/user accounts; only created if the username is not taken yet.
+# Hashes are precomputed (werkzeug scrypt, passwords adminpass / doctor /
+# password) so startup does not run the KDF.
+SEED_USERS = {
     "admin": {
-        "password_hash": generate_password_hash("adminpass"), # Hash the password
+        "password_hash": "scrypt:32768:8:1$9dSW0bALkGlkEaxB$884149f04133255c85bb29f73f6fb38806442bf67f08dc7b7424288a674b8ab9159f773e835b45cfb67be8ffcc18faf662980d8f95010ddab0c2c8266f978cfd",
         "role": "admin",
-        "email": "admin@example.com", # Add email
-        "reset_token": None,
-        "reset_token_expiry": None
+        "email": "admin@example.com",
     },
     "doctor": {
-        "password_hash": generate_password_hash("doctor"), # Hash the password
+        "password_hash": "scrypt:32768:8:1$OKX9VLeIwBAW4Pv4$fced432426cd37229ff0676e0c27a095adabf0a2fa6122199a42154947dab308e8ed3ca82164ce2100f61efda2a074c250426cf5ad6c78e4b7f562b1a12b4974",
         "role": "doctor",
-        "email": "doctor@example.com", # Add email
-        "reset_token": None,
-        "reset_token_expiry": None
+        "email": "doctor@example.com",
     },
     "user": {
-        "password_hash": generate_password_hash("password"), # Hash the password
+        "password_hash": "scrypt:32768:8:1$Uo1ASbwUUiqivvK2$06b9f149058f11147c4c37788df2a5e4ee76370c725bf8af9c1493896315fc99a814f1d6d82f0ec610313357724df7f77a7146fdd62c80285522ffbfd1638dd9",
         "role": "non-admin", # Changed from 'standard_user' to 'non-admin' to match your register route default
-        "email": "user@example.com", # Add email
-        "reset_token": None,
-        "reset_token_expiry": None
+        "email": "user@example.com",
     }
 }
+for _username, _user in SEED_USERS.items():
+    users_db.add(_username, _user["password_hash"], _user["role"], _user["email"]) # No-op if it already exists
+
+# --- Metrics ---
+# Counters the modules keep themselves, exported alongside the stage timings.
+metrics.register_collector("db_pool", lambda: mysql_helpers.get_pool().stats(),
+                           counters=("connects", "checkouts", "reused", "health_failures", "idle_evictions",
+                                     "waits", "exhausted", "discarded"))
+metrics.register_collector("intent_cache", llm1.intent_cache.stats,
+                           counters=("hits", "misses", "stores", "rejected", "expired", "evictions"))
+metrics.register_collector("fast_intent", fast_intent.stats, counters=("hits", "misses"))
+metrics.register_collector("llm_client", llm1.client.stats,
+                           counters=("calls", "successes", "failures", "attempts", "retries", "hedges", "hedge_wins",
+                                     "timeouts", "rejected", "breaker_opens"))
+metrics.register_collector("prompt_builder", prompt_builder.stats,
+                           counters=("routed", "full_schema", "prompts", "prompt_tokens_estimated", "schema_chars_saved",
+                                     "routed_patient", "routed_doctor", "routed_appointment", "routed_bill"))
+metrics.register_collector("view_cache", view_cache.cache.stats,
+                           counters=("hits", "misses", "stores", "skipped", "invalidations", "invalidated_entries",
+                                     "errors", "evictions", "expired"))
+metrics.register_collector("password_hashing", lambda: password_hashing.get_hasher().stats(),
+                           counters=("hashed", "verified", "rejected", "timeouts"))
 
 # --- Authentication Routes ---
 
+@app.errorhandler(password_hashing.HashingBusyError)
+def hashing_busy(e):
+    """Login bursts that saturate the hashing pool get a fast 503 instead of queueing."""
+    app.logger.warning(f"Rejected {request.path}: {e}")
+    return "The server is busy right now. Please try again in a moment.", 503, {"Retry-After": "1"}
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Handles user login, checking hashed passwords."""
@@ -79,7 +119,7 @@ def login():
         user_data = users_db.get(username)
 
         # 1. Check user exists and password hash matches
-        if user_data and check_password_hash(user_data.get('password_hash', ''), password):
+        if user_data and password_hashing.verify_password(user_data.get('password_hash', ''), password):
             # Password matches
             user_actual_role = user_data.get('role') # Get the user's role from the database
 
@@ -126,18 +166,16 @@ def register():
             flash("Username already exists. Please choose another.", "error")
             return redirect(url_for('register'))
 
-        if any(user['email'] == email for user in users_db.values()):
+        if users_db.get_by_email(email)[0] is not None:
              flash("Email address already registered.", "error")
              return redirect(url_for('register'))
 
-        # --- Create User (in placeholder DB) ---
-        users_db[username] = {
-            "password_hash": generate_password_hash(password),
-            "role": role,
-            "email": email,
-            "reset_token": None,
-            "reset_token_expiry": None
-        }
+        # --- Create User ---
+        # add() re-checks both keys atomically, so a concurrent registration
+        # that took the name or email in the meantime is still rejected.
+        if not users_db.add(username, password_hashing.hash_password(password), role, email):
+            flash("Username or email address already registered.", "error")
+            return redirect(url_for('register'))
         app.logger.info(f"New user registered: username='{username}', email='{email}', role='{role}'")
         flash("Registration successful! Please login.", "success")
         return redirect(url_for('login'))
@@ -155,19 +193,12 @@ def forgot_password():
             flash("Email address is required.", "error")
             return redirect(url_for('forgot_password'))
 
-        user_to_reset = None
-        username_to_reset = None
-        for uname, udata in users_db.items():
-            if udata.get('email') == email:
-                user_to_reset = udata
-                username_to_reset = uname
-                break
+        username_to_reset, user_to_reset = users_db.get_by_email(email)
 
         if user_to_reset:
             token = secrets.token_urlsafe(32)
             expiry_time = datetime.utcnow() + PASSWORD_RESET_TIMEOUT
-            user_to_reset['reset_token'] = token
-            user_to_reset['reset_token_expiry'] = expiry_time
+            users_db.set_reset_token(username_to_reset, token, expiry_time)
             app.logger.info(f"Password reset token generated for user '{username_to_reset}' (email: {email})")
             reset_url = url_for('reset_password', token=token, _external=True)
             print("------------------------------------------------------")
@@ -186,24 +217,15 @@ def forgot_password():
 @app.route('/reset_password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     """Handles the actual password reset using a token."""
-    user_to_update = None
-    username_to_update = None
-    is_token_valid = False
-
-    for uname, udata in users_db.items():
-        if udata.get('reset_token') == token:
-            expiry = udata.get('reset_token_expiry')
-            if expiry and expiry > datetime.utcnow():
-                user_to_update = udata
-                username_to_update = uname
-                is_token_valid = True
-                break
-            else:
-                app.logger.warning(f"Expired password reset token used: {token}")
-                flash("Password reset link has expired. Please request a new one.", "error")
-                return redirect(url_for('forgot_password'))
-
-    if not is_token_valid:
+    username_to_update, user_to_update = users_db.get_by_reset_token(token)
+
+    if user_to_update:
+        expiry = user_to_update.get('reset_token_expiry')
+        if not expiry or expiry <= datetime.utcnow():
+            app.logger.warning(f"Expired password reset token used: {token}")
+            flash("Password reset link has expired. Please request a new one.", "error")
+            return redirect(url_for('forgot_password'))
+    else:
         app.logger.warning(f"Invalid or unknown password reset token used: {token}")
         flash("Invalid or expired password reset link.", "error")
         return redirect(url_for('forgot_password'))
@@ -219,9 +241,7 @@ def reset_password(token):
             flash("New passwords do not match.", "error")
             return render_template('reset_password.html', token=token)
 
-        user_to_update['password_hash'] = generate_password_hash(password)
-        user_to_update['reset_token'] = None
-        user_to_update['reset_token_expiry'] = None
+        users_db.set_password(username_to_update, password_hashing.hash_password(password))
         app.logger.info(f"Password successfully reset for user '{username_to_update}'.")
         flash("Your password has been reset successfully! Please login.", "success")
         return redirect(url_for('login'))
@@ -251,12 +271,41 @@ def index():
     return render_template('index.html', username=username, user_role=user_role)
 
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    """Handles incoming chat messages, processes them, and returns the chatbot response."""
+def check_permission(user_role, table, operation):
+    """Return None if the role may perform the operation, otherwise the denial message."""
+    if user_role == 'admin':
+        return None
+    if user_role == 'doctor':
+        if table in ('doctor', 'appointment'):
+            return None
+        return "Access Denied."
+    if user_role == 'non-admin':
+        if operation == 'view': # Example: non-admin can only view
+            return None
+        return f"Access Denied: Your role ('{user_role}') does not permit the '{operation}' operation. You can only view records."
+    return "Access Denied: Your user role is unrecognized."
+
+
+def check_intent_permission(user_role, intent):
+    """check_permission for every operation an Intent or IntentPlan asks for; the first denial wins."""
+    for step in getattr(intent, "steps", None) or [intent]:
+        denial = check_permission(user_role, step.table, step.operation)
+        if denial is not None:
+            return denial
+    return None
+
+
+def _read_chat_request():
+    """
+    Authenticate and validate a chat request.
+
+    Returns:
+        ((user_message, user_role, username, more_token), None) on success, or
+        (None, (json_response, status)) if the request must be rejected.
+    """
     if not session.get('logged_in'):
         app.logger.warning("Unauthorized chat attempt.")
-        return jsonify({"error": "Not authenticated. Please log in again."}), 401
+        return None, (jsonify({"error": "Not authenticated. Please log in again."}), 401)
 
     user_role = session.get('role', 'non-admin')
     username = session.get('username', 'Unknown')
@@ -266,65 +315,83 @@ def chat():
         data = request.get_json()
         if not data or 'message' not in data:
              app.logger.warning(f"Chat request from '{username}' missing JSON data or 'message' key.")
-             return jsonify({"error": "Invalid request format. 'message' key missing."}), 400
+             return None, (jsonify({"error": "Invalid request format. 'message' key missing."}), 400)
         user_message = data['message'].strip()
         if not user_message:
             app.logger.warning(f"Chat request from '{username}' has empty message.")
-            return jsonify({"error": "Message cannot be empty."}), 400
+            return None, (jsonify({"error": "Message cannot be empty."}), 400)
         app.logger.info(f"User '{username}' ({user_role}) message: '{user_message}'")
     except Exception as e:
         app.logger.error(f"Error parsing request JSON from '{username}': {e}", exc_info=True)
-        return jsonify({"error": "Invalid request format."}), 400
-
-    try:
-        llm_success = llm1.configure_and_generate(user_message) # Assuming llm1.py exists and is setup
-        if not llm_success:
-             app.logger.error(f"LLM processing failed for message from '{username}'. Check {OUTPUT_JSON_PATH} for details.")
-             error_msg = "Sorry, I had trouble understanding the structure of your request."
-             return jsonify({"response": error_msg}), 500
-        app.logger.info(f"LLM successfully processed input from '{username}'.")
-    except Exception as e:
-        app.logger.error(f"Unexpected error during LLM processing for '{username}': {e}", exc_info=True)
-        return jsonify({"response": "Sorry, an unexpected error occurred while analyzing your request."}), 500
-
-    try:
-        table, operation, datas = dict_logic.sql_values() # Assuming dict.py exists and is setup
-        if operation is None or datas is None:
-             app.logger.error(f"Failed to read valid operation/data from {OUTPUT_JSON_PATH} for request from '{username}'.")
-             error_msg = "Sorry, I couldn't determine the specific action or data needed from your request."
-             return jsonify({"response": error_msg}), 500
-        app.logger.info(f"Identified Operation: '{operation}' with Data: {datas} for user '{username}'")
-    except Exception as e:
-        app.logger.error(f"Error reading/parsing {OUTPUT_JSON_PATH} in /chat for '{username}': {e}", exc_info=True)
-        return jsonify({"response": "Sorry, an internal error occurred while retrieving request details."}), 500
-
-    permission_granted = False
-    if user_role == 'admin':
-        permission_granted = True
-    elif user_role == 'doctor':
-        if table == 'doctor':
-            permission_granted = True
-        elif table == 'appoiment':
-            permission_granted = True
-        else:
-            permission_granted = False
-    elif user_role == 'non-admin':
-        if operation == 'view': # Example: non-admin can only view
-            permission_granted = True
-        else:
-            permission_granted = False
-            app.logger.warning(f"ACCESS DENIED: User '{username}' (role: {user_role}) attempted restricted operation '{operation}'.")
-            return jsonify({"response": f"Access Denied: Your role ('{user_role}') does not permit the '{operation}' operation. You can only view records."}), 403 # 403 Forbidden
+        return None, (jsonify({"error": "Invalid request format."}), 400)
+    return (user_message, user_role, username, data.get('more')), None
+
+
+def chat_events(user_message, user_role, username, more=None):
+    """
+    Run the chat pipeline, yielding (event, payload) pairs as each stage finishes:
+
+        ("intent", {...})  the parsed table/operation/data
+        ("db", {...})      the database result
+        ("token", {...})   a chunk of the final response text
+        ("done", {...}) or ("error", {...}) exactly once, last
+
+    A listing with further pages adds a "more" token to the done payload; a
+    "more" message sent with that token continues the listing.
+
+    Stage timings go to the /metrics histograms and one structured log line per request.
+    """
+    with metrics.trace() as spans:
+        for event, payload in _chat_stages(user_message, user_role, username, more):
+            if event in ("done", "error"):
+                outcome = "done" if event == "done" else f"error_{payload['status']}"
+                metrics.CHAT_REQUESTS.inc(outcome=outcome)
+                app.logger.info(json.dumps({"event": "chat_timings", "user": username, "outcome": outcome, "spans": spans}))
+            yield event, payload
+
+
+def _chat_stages(user_message, user_role, username, more=None):
+    if pagination.is_more_request(user_message):
+        intent = continuations.resume(more)  # The listing to continue, cursor included
+        if intent is None:
+            yield "done", {"response": NOTHING_MORE}
+            return
+        app.logger.info(f"Continuing '{intent.table}' listing for '{username}'.")
+    else:
+        try:
+            intent = llm1.configure_and_generate(user_message) # Parsed Intent, kept in memory for this request
+            if intent is None:
+                 app.logger.error(f"LLM processing failed for message from '{username}': no valid intent extracted.")
+                 error_msg = "Sorry, I had trouble understanding the structure of your request."
+                 yield "error", {"response": error_msg, "status": 500}
+                 return
+            app.logger.info(f"LLM successfully processed input from '{username}'.")
+        except Exception as e:
+            app.logger.error(f"Unexpected error during LLM processing for '{username}': {e}", exc_info=True)
+            yield "error", {"response": "Sorry, an unexpected error occurred while analyzing your request.", "status": 500}
+            return
+
+    if isinstance(intent, IntentPlan):
+        # Several operations from one message: one transaction, one reply.
+        table = ", ".join(dict.fromkeys(step.table for step in intent.steps))
+        operation = " + ".join(step.operation for step in intent.steps)
+        datas = [step.data for step in intent.steps]
     else:
-        app.logger.warning(f"ACCESS DENIED: User '{username}' has unrecognized role '{user_role}'. Denying operation '{operation}'.")
-        return jsonify({"response": "Access Denied: Your user role is unrecognized."}), 403 # 403 Forbidden
+        table, operation, datas = intent.table, intent.operation, intent.data
+    app.logger.info(f"Identified Operation: '{operation}' with Data: {datas} for user '{username}'")
+    yield "intent", intent.to_dict()
 
-    if not permission_granted: # Should be caught above, but as a safeguard
-        return jsonify({"response": "Access Denied."}), 403
+    with metrics.span("permission"):
+        denial = check_intent_permission(user_role, intent)
+    if denial is not None:
+        app.logger.warning(f"ACCESS DENIED: User '{username}' (role: {user_role}) attempted '{operation}' on '{table}'.")
+        yield "error", {"response": denial, "status": 403} # 403 Forbidden
+        return
 
     try:
         app.logger.info(f"Permission granted for user '{username}' to perform '{operation}'. Proceeding with database action.")
-        db_result_string = dict_logic.operations(table, operation, datas)
+        with metrics.span("dispatch"):
+            db_result_string = dict_logic.execute(intent)
         if db_result_string is None:
              app.logger.error(f"Database table '{table}' for operation '{operation}' for user '{username}' returned None.")
              db_result_string = "The requested operation could not be completed due to an internal issue."
@@ -332,15 +399,74 @@ def chat():
              app.logger.info(f"Database table '{table}' for operation '{operation}' for user '{username}' completed. Result: {db_result_string}")
     except Exception as e:
         app.logger.error(f"Error during database table '{table}' for operation operation '{operation}' for user '{username}': {e}", exc_info=True)
-        return jsonify({"response": f"Sorry, an error occurred while trying to perform the '{operation}' operation on the database."}), 500
+        yield "error", {"response": f"Sorry, an error occurred while trying to perform the '{operation}' operation on the database.", "status": 500}
+        return
+    yield "db", {"result": str(db_result_string)}
 
     try:
-        final_response_text = llm1.generate_output_text(str(db_result_string))
+        with metrics.span("render"):
+            template_text = responses.render_intent(intent, db_result_string)
+        # One chunk holding the template text unless LLM_POLISH is set, then the model's chunks as they arrive.
+        chunks = []
+        try:
+            for chunk in llm1.polish_response_stream(template_text):
+                chunks.append(chunk)
+                yield "token", {"text": chunk}
+            final_response_text = "".join(chunks).strip() or template_text.strip()
+        except llm_client.LLMUnavailable as e:
+            app.logger.warning(f"Response polish stopped mid-stream for '{username}': {e}; sending the template text.")
+            final_response_text = template_text.strip()  # done replaces the partial text in the browser
         app.logger.info(f"Final response generated for user '{username}': '{final_response_text}'")
-        return jsonify({"response": final_response_text})
+        done = {"response": final_response_text}
+        more_token = continuations.issue(intent, listing_cursor(db_result_string))
+        if more_token:
+            done["more"] = more_token
+        yield "done", done
     except Exception as e:
         app.logger.error(f"Error generating final response text for user '{username}': {e}", exc_info=True)
-        return jsonify({"response": "Sorry, I encountered an issue while formatting the final response."}), 500
+        yield "error", {"response": "Sorry, I encountered an issue while formatting the final response.", "status": 500}
+
+
+def listing_cursor(db_result):
+    return db_result.get("next_cursor") if isinstance(db_result, dict) else None
+
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    """Handles incoming chat messages, processes them, and returns the chatbot response."""
+    chat_request, rejection = _read_chat_request()
+    if rejection:
+        return rejection
+
+    for event, payload in chat_events(*chat_request):
+        if event == "done":
+            return jsonify(payload)
+        if event == "error":
+            return jsonify({"response": payload["response"]}), payload["status"]
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but streams stage events and response text as Server-Sent Events."""
+    chat_request, rejection = _read_chat_request()
+    if rejection:
+        return rejection
+
+    def generate():
+        for event, payload in chat_events(*chat_request):
+            yield f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Keep proxies from buffering the stream
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+
+@app.route('/metrics')
+def metrics_page():
+    """Prometheus scrape endpoint. Set METRICS_TOKEN to require 'Authorization: Bearer <token>'."""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return "Unauthorized", 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 # --- Main Execution Guard ---
@@ -0,0 +1,255 @@
+# asgi_app.py - asyncio-native front end for the chatbot
+#
+# Serves POST /chat on the event loop and hands every other route to the
+# Flask app (login, register, templates, static files). Run with any ASGI
+# server, e.g.:
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+#
+# The LLM stages await Gemini's async client. Hospital is synchronous
+# (mysql-connector), so the database stage runs on a small executor sized to
+# the connection pool; waiting conversations cost a coroutine, not a thread.
+# Only reads get CHAT_DB_TIMEOUT: an abandoned write could still commit.
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from itsdangerous import BadSignature
+
+import llm1
+import dict as dict_logic
+import responses
+import metrics
+import mysql_helpers
+import pagination
+from app import app as flask_app, check_intent_permission, continuations, NOTHING_MORE, listing_cursor
+from intent import IntentPlan
+
+try:
+    from asgiref.wsgi import WsgiToAsgi  # Installed with flask[async]
+    _flask_asgi = WsgiToAsgi(flask_app)
+except ImportError:
+    _flask_asgi = None
+
+logger = logging.getLogger(__name__)
+
+# --- Per-stage deadlines (seconds) ---
+LLM_TIMEOUT = float(os.environ.get("CHAT_LLM_TIMEOUT", 30))
+DB_TIMEOUT = float(os.environ.get("CHAT_DB_TIMEOUT", 10))
+MAX_BODY_BYTES = 64 * 1024
+
+_db_executor = ThreadPoolExecutor(max_workers=mysql_helpers.POOL_SIZE, thread_name_prefix="chat-db")
+
+
+# --- Chat Pipeline ---
+
+async def run_chat(user_message, user_role, username, more=None):
+    """
+    Same stages and messages as app.chat, without blocking the event loop.
+
+    Returns:
+        (payload, status) tuple for the JSON response.
+    """
+    with metrics.trace() as spans:
+        payload, status = await _run_stages(user_message, user_role, username, more)
+    outcome = "done" if status == 200 else f"error_{status}"
+    metrics.CHAT_REQUESTS.inc(outcome=outcome)
+    logger.info(json.dumps({"event": "chat_timings", "user": username, "outcome": outcome, "spans": spans}))
+    return payload, status
+
+
+async def _run_stages(user_message, user_role, username, more=None):
+    if pagination.is_more_request(user_message):
+        intent = continuations.resume(more)
+        if intent is None:
+            return {"response": NOTHING_MORE}, 200
+    else:
+        try:
+            intent = await asyncio.wait_for(llm1.configure_and_generate_async(user_message), LLM_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"LLM extraction for '{username}' exceeded {LLM_TIMEOUT}s.")
+            return {"response": "Sorry, analyzing your request took too long. Please try again."}, 504
+        except Exception as e:
+            logger.error(f"Unexpected error during LLM processing for '{username}': {e}", exc_info=True)
+            return {"response": "Sorry, an unexpected error occurred while analyzing your request."}, 500
+    if intent is None:
+        logger.error(f"LLM processing failed for message from '{username}': no valid intent extracted.")
+        return {"response": "Sorry, I had trouble understanding the structure of your request."}, 500
+
+    if isinstance(intent, IntentPlan):
+        table = ", ".join(dict.fromkeys(step.table for step in intent.steps))
+        operation = " + ".join(step.operation for step in intent.steps)
+        datas = [step.data for step in intent.steps]
+    else:
+        table, operation, datas = intent.table, intent.operation, intent.data
+    logger.info(f"Identified Operation: '{operation}' with Data: {datas} for user '{username}'")
+
+    with metrics.span("permission"):
+        denial = check_intent_permission(user_role, intent)
+    if denial is not None:
+        logger.warning(f"ACCESS DENIED: User '{username}' (role: {user_role}) attempted '{operation}' on '{table}'.")
+        return {"response": denial}, 403
+
+    loop = asyncio.get_running_loop()
+    # Run in a copy of this context so the SQL spans land on this request's trace.
+    context = contextvars.copy_context()
+    query = loop.run_in_executor(_db_executor, context.run, dict_logic.execute, intent)
+    try:
+        with metrics.span("dispatch"):
+            if is_read_only(intent):
+                db_result = await asyncio.wait_for(query, DB_TIMEOUT)
+            else:
+                # A timeout would not stop the worker thread, which may still
+                # commit; the user must never be told to retry a write that landed.
+                db_result = await query
+    except asyncio.TimeoutError:
+        logger.error(f"Database '{operation}' on '{table}' for '{username}' exceeded {DB_TIMEOUT}s.")
+        return {"response": f"Sorry, the '{operation}' operation took too long. Please try again."}, 504
+    except Exception as e:
+        logger.error(f"Error during database table '{table}' for operation '{operation}' for user '{username}': {e}", exc_info=True)
+        return {"response": f"Sorry, an error occurred while trying to perform the '{operation}' operation on the database."}, 500
+
+    try:
+        with metrics.span("render"):
+            final_response_text = responses.render_intent(intent, db_result)
+        # Opt-in (LLM_POLISH); returns the template text if the model misses its deadline.
+        final_response_text = await llm1.polish_response_async(final_response_text)
+    except Exception as e:
+        logger.error(f"Error generating final response text for user '{username}': {e}", exc_info=True)
+        return {"response": "Sorry, I encountered an issue while formatting the final response."}, 500
+    payload = {"response": final_response_text}
+    more_token = continuations.issue(intent, listing_cursor(db_result))
+    if more_token:
+        payload["more"] = more_token
+    return payload, 200
+
+
+def is_read_only(intent):
+    """True for a single view; inserts, updates and plans change data."""
+    return not isinstance(intent, IntentPlan) and intent.operation == "view"
+
+
+# --- ASGI Plumbing ---
+
+def load_session(scope):
+    """Decode the Flask session cookie so both front ends share one login."""
+    cookie_header = b"; ".join(value for name, value in scope["headers"] if name == b"cookie")
+    cookies = SimpleCookie()
+    try:
+        cookies.load(cookie_header.decode("latin-1"))
+    except Exception:
+        return {}
+    morsel = cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if morsel is None or serializer is None:
+        return {}
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return serializer.loads(morsel.value, max_age=max_age)
+    except BadSignature:
+        return {}
+
+
+class BodyTooLarge(Exception):
+    """The request body is over MAX_BODY_BYTES."""
+
+
+async def read_body(receive):
+    """
+    Read the request body; returns None if the client went away.
+
+    Raises:
+        BodyTooLarge once more than MAX_BODY_BYTES have arrived.
+    """
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise BodyTooLarge(f"Request body over {MAX_BODY_BYTES} bytes")
+        if not message.get("more_body", False):
+            return body
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def send_json(send, payload, status):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def chat_endpoint(scope, receive, send):
+    session = load_session(scope)
+    if not session.get("logged_in"):
+        logger.warning("Unauthorized chat attempt.")
+        return await send_json(send, {"error": "Not authenticated. Please log in again."}, 401)
+    user_role = session.get("role", "non-admin")
+    username = session.get("username", "Unknown")
+
+    try:
+        body = await read_body(receive)
+    except BodyTooLarge:
+        return await send_json(send, {"error": "Request body too large."}, 413)
+    if body is None:
+        return  # Client went away
+    try:
+        data = json.loads(body or b"null")
+        user_message = data["message"].strip() if isinstance(data, dict) and "message" in data else None
+        more = data.get("more") if isinstance(data, dict) else None
+    except (ValueError, AttributeError):
+        return await send_json(send, {"error": "Invalid request format."}, 400)
+    if user_message is None:
+        return await send_json(send, {"error": "Invalid request format. 'message' key missing."}, 400)
+    if not user_message:
+        return await send_json(send, {"error": "Message cannot be empty."}, 400)
+    logger.info(f"User '{username}' ({user_role}) message: '{user_message}'")
+
+    # Run the pipeline while watching the connection; a client that hangs up
+    # cancels whatever stage is in flight.
+    pipeline = asyncio.ensure_future(run_chat(user_message, user_role, username, more))
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    done, _ = await asyncio.wait({pipeline, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    if pipeline not in done:
+        pipeline.cancel()
+        logger.info(f"Client for '{username}' disconnected; chat request cancelled.")
+        return
+    disconnect.cancel()
+    payload, status = pipeline.result()
+    await send_json(send, payload, status)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _db_executor.shutdown(wait=False)
+            mysql_helpers.get_pool().close_all()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http" and scope["path"] == "/chat" and scope["method"] == "POST":
+        return await chat_endpoint(scope, receive, send)
+    if _flask_asgi is not None:
+        return await _flask_asgi(scope, receive, send)
+    await send_json(send, {"error": "Not found. Install asgiref to serve the Flask routes from this app."}, 404)
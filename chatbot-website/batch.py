@@ -0,0 +1,165 @@
+# batch.py - Run a file of utterances through the chatbot pipeline
+#
+# Usage:
+#   python batch.py inputs.txt                       (writes batch_results.jsonl)
+#   python batch.py patients.jsonl --role admin --concurrency 8 --llm-batch 20 --output -
+#
+# Input is either a text file with one utterance per line (numbering, quotes
+# and section headings like "Insert:" are ignored, so inputs.txt / input.txt
+# work as-is) or JSONL with {"message": ..., "id": ..., "role": ...} per line.
+#
+# Each utterance goes through the same stages as /chat: intent extraction,
+# permission check, dict.operations and response formatting. Utterances are
+# processed in windows of --llm-batch; the ones that need the LLM share a
+# single model call per window, and up to --concurrency windows run at once.
+# One JSON result per utterance is written in input order, with per-stage
+# timings in milliseconds.
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import llm1
+import dict as dict_logic
+import responses
+from app import check_intent_permission
+
+
+def read_records(path, default_role):
+    """Yield {"id", "message", "role"} dicts from a text or JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                yield {"id": row.get("id", n), "message": row.get("message") or row.get("text", ""),
+                       "role": row.get("role", default_role)}
+            return
+        for n, line in enumerate(f, 1):
+            text = re.sub(r"^\s*\d+\.\s*", "", line.strip()).strip('"').strip()
+            if len(text.split()) >= 3 and text[0].isalnum() and not text.endswith(":"):
+                yield {"id": n, "message": text, "role": default_role}
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def run_one(record, intent, extract_ms, batch_size):
+    """Permission check, database call and formatting for one extracted utterance."""
+    started = time.perf_counter()
+    result = dict(record, status="ok", extract_batch=batch_size)
+    timings = result["timings_ms"] = {"extract": extract_ms}
+    try:
+        if intent is None:
+            result.update(status="unparsed", response="Sorry, I had trouble understanding the structure of your request.")
+            return result
+        result.update(intent.to_dict())
+
+        stage = time.perf_counter()
+        denial = check_intent_permission(record["role"], intent)
+        timings["permission"] = _ms(stage)
+        if denial is not None:
+            result.update(status="denied", response=denial)
+            return result
+
+        stage = time.perf_counter()
+        db_result = dict_logic.execute(intent)
+        timings["dispatch"] = _ms(stage)
+        result["db_result"] = db_result
+        if db_result is None or (isinstance(db_result, dict) and db_result.get("status") == "error"):
+            result["status"] = "db_error"
+
+        stage = time.perf_counter()
+        result["response"] = llm1.polish_response(responses.render_intent(intent, db_result))
+        timings["render"] = _ms(stage)
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    finally:
+        timings["total"] = round(extract_ms + _ms(started), 2)
+    return result
+
+
+def run_window(window):
+    """Extract a window of utterances with one batched LLM call, then run each."""
+    stage = time.perf_counter()
+    try:
+        intents = llm1.configure_and_generate_batch([r["message"] for r in window], max_batch=len(window))
+    except Exception as e:
+        print(f"Batched extraction failed: {e}", file=sys.stderr)
+        intents = [None] * len(window)
+    extract_ms = _ms(stage)
+    return [run_one(record, intent, extract_ms, len(window)) for record, intent in zip(window, intents)]
+
+
+def _windows(records, size):
+    window = []
+    for record in records:
+        window.append(record)
+        if len(window) == size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def run_batch(records, out, concurrency=4, llm_batch=20):
+    """
+    Process records and write one JSON line per record to `out`, in input order.
+
+    At most 2 * concurrency windows are in flight, so arbitrarily large input
+    files are streamed rather than loaded up front.
+
+    Returns:
+        Counter of result statuses.
+    """
+    statuses = Counter()
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        def drain(limit):
+            while len(in_flight) > limit:
+                for result in in_flight.popleft().result():
+                    statuses[result["status"]] += 1
+                    out.write(json.dumps(result, default=str) + "\n")
+                out.flush()
+
+        for window in _windows(records, llm_batch):
+            in_flight.append(executor.submit(run_window, window))
+            drain(2 * concurrency)
+        drain(0)
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of utterances through the hospital chatbot")
+    parser.add_argument("input", help="Text file (one utterance per line) or .jsonl")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL results file, or - for stdout")
+    parser.add_argument("--role", default="admin", help="Role used for records that do not set one")
+    parser.add_argument("--concurrency", type=int, default=4, help="Windows processed at once")
+    parser.add_argument("--llm-batch", type=int, default=20, help="Utterances per LLM call")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        out = sys.stdout
+        sys.stdout = sys.stderr  # The pipeline reports problems with print(); keep them out of the results
+    else:
+        out = open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        statuses = run_batch(read_records(args.input, args.role), out, args.concurrency, args.llm_batch)
+    finally:
+        if args.output != "-":
+            out.close()
+    elapsed = time.perf_counter() - start
+    total = sum(statuses.values())
+    print(f"{total} utterances in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f}/s): "
+          + ", ".join(f"{status} {count}" for status, count in sorted(statuses.items())), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,644 @@
+# benchmark.py - Micro/throughput benchmarks for the hospital chatbot backend
+#
+# Usage:
+#   python benchmark.py pool [--requests 2000] [--threads 8] [--handshake-ms 5] [--live]
+#   python benchmark.py dispatch [--iterations 200000]
+#   python benchmark.py fastpath [--file inputs.txt] [--iterations 1000]
+#   python benchmark.py users [--users 100000] [--backend memory|sqlite] [--lookups 2000]
+#   python benchmark.py hashing [--methods scrypt:32768:8:1,...] [--burst 64] [--threads 16]
+#   python benchmark.py e2e [--requests 500] [--concurrency 8] [--latency-ms 300] [--failure-rate 0]
+#   python benchmark.py listings [--appointments 1000000] [--samples 200] [--max-p95-ms 25] [--live]
+#
+# Every benchmark prints a small table to stdout. Without --live the database
+# is simulated so the numbers can be reproduced on any machine; e2e runs the
+# real Flask app against the fake LLM backend and a throwaway SQLite database.
+# listings seeds a large dataset, runs the schema.py plan check and exits 1 if
+# any listing page is slower than --max-p95-ms.
+
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import mysql_helpers
+import dict as dict_logic
+import fast_intent
+import user_store
+import password_hashing
+from werkzeug.security import generate_password_hash
+
+
+# --- Simulated MySQL connection ---
+
+class SimulatedConnection:
+    """Stand-in for a mysql.connector connection with a fixed handshake cost."""
+
+    def __init__(self, handshake_s, query_s):
+        time.sleep(handshake_s)  # TCP connect + auth round trips
+        self.query_s = query_s
+        self.open = True
+
+    def cursor(self, **kwargs):
+        return SimulatedCursor(self)
+
+    def is_connected(self):
+        return self.open
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+class SimulatedCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = None
+        self.rowcount = 1
+
+    def execute(self, query, params=()):
+        time.sleep(self.conn.query_s)
+
+    def fetchone(self):
+        return {"PatientID": 1}
+
+    def fetchall(self):
+        return [{"PatientID": 1}]
+
+    def close(self):
+        pass
+
+
+class CountingConnector:
+    """Wraps a connect function and counts physical connections."""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self):
+        with self._lock:
+            self.count += 1
+        return self._connect()
+
+
+# --- Benchmarks ---
+
+def _run_requests(handler, requests, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: handler(), range(requests)))
+    return time.perf_counter() - start
+
+
+def bench_pool(args):
+    """Connects per request and throughput: connect-per-call vs. pooled connections."""
+    if args.live:
+        connect = mysql_helpers.connect_db
+    else:
+        handshake_s = args.handshake_ms / 1000.0
+        query_s = args.query_ms / 1000.0
+        connect = lambda: SimulatedConnection(handshake_s, query_s)
+
+    def query(conn):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT PatientID FROM Patients WHERE PatientID = %s", (1,))
+            cursor.fetchone()
+        finally:
+            cursor.close()
+
+    # Before: what Hospital did originally - open, query, close.
+    direct = CountingConnector(connect)
+
+    def direct_request():
+        conn = direct()
+        try:
+            query(conn)
+        finally:
+            conn.close()
+
+    # After: borrow from a bounded pool.
+    pooled = CountingConnector(connect)
+    pool = mysql_helpers.ConnectionPool(size=args.pool_size, connect=pooled)
+
+    def pooled_request():
+        with pool.connection() as conn:
+            query(conn)
+
+    rows = []
+    for name, handler, counter in (("connect-per-call", direct_request, direct),
+                                   ("pooled", pooled_request, pooled)):
+        elapsed = _run_requests(handler, args.requests, args.threads)
+        rows.append((name, counter.count / args.requests, args.requests / elapsed, elapsed))
+
+    print(f"{args.requests} requests, {args.threads} threads, pool size {args.pool_size}"
+          f"{' (live MySQL)' if args.live else f', handshake {args.handshake_ms}ms, query {args.query_ms}ms'}")
+    print(f"{'mode':<18}{'connects/request':>18}{'requests/s':>14}{'wall (s)':>10}")
+    for name, per_request, rate, elapsed in rows:
+        print(f"{name:<18}{per_request:>18.3f}{rate:>14.1f}{elapsed:>10.2f}")
+    print(f"pool stats: {pool.stats()}")
+    pool.close_all()
+
+
+# --- Dispatch: registry vs. the original if/elif chain ---
+
+class StubHospital:
+    """Hospital look-alike that returns a canned result without touching a database."""
+
+    def __init__(self):
+        result = {"status": "success", "data": []}
+        for name in dir(dict_logic.Hospital):
+            if not name.startswith("_"):
+                setattr(self, name, lambda *args, **kwargs: result)
+
+
+def legacy_operations(hos, table, operation1, datas):
+    """Shape of dict.operations before the registry: nested if/elif with inline checks."""
+    if not operation1 or datas is None:
+        return "Invalid operation or data provided."
+    if table == "patient":
+        if operation1 == "insert":
+            required_keys = ["name", "age", "gender", "contact", "address"]
+            if not all(key in datas for key in required_keys):
+                return f"Missing required fields for insert. Need: {required_keys}"
+            if datas.get("gender") is None:
+                datas["gender"] = "Unknown"
+            return hos.insert_patient(datas.get("name"), datas.get("age"), datas.get("gender"),
+                                      datas.get("contact"), datas.get("address"))
+        elif operation1 == "update":
+            if datas.get("id") is None:
+                return "Missing 'id' for update operation."
+            return hos.update_patient(datas.get("id"), name=datas.get("name"), age=datas.get("age"),
+                                      address=datas.get("address"), contact=datas.get("contact"))
+        elif operation1 == "view":
+            if datas.get("id") is None:
+                return "Missing 'id' for view operation."
+            return str(hos.view_patient(datas.get("id")))
+        return f"Invalid operation '{operation1}' requested."
+    elif table == "doctor":
+        if operation1 == "insert":
+            required_keys = ["doctor_id", "name", "specialization", "contact", "schedule"]
+            if not all(key in datas and datas[key] is not None for key in required_keys):
+                return f"Missing required fields for insert. Need: {required_keys}"
+            return hos.add_doctor(datas.get("doctor_id"), datas.get("name"), datas.get("specialization"),
+                                  datas.get("contact"), datas.get("schedule"))
+        elif operation1 == "view":
+            if datas.get("id") is None:
+                return "Missing 'id' for view operation."
+            return str(hos.get_doctor(datas.get("id")))
+        return f"Invalid operation '{operation1}' requested."
+    elif table == "bill":
+        if operation1 == "insert":
+            required_keys = ["patient_id", "appointment_id", "amount", "payment_method", "payment_status"]
+            if not all(key in datas and datas[key] is not None for key in required_keys):
+                return f"Missing required fields for insert. Need: {required_keys}"
+            return hos.create_bill(datas.get("patient_id"), datas.get("appointment_id"), datas.get("amount"),
+                                   datas.get("payment_method"), datas.get("payment_status"))
+        elif operation1 == "update":
+            return hos.update_bill(datas.get("bill_id"), amount=datas.get("amount"),
+                                   payment_method=datas.get("payment_method"),
+                                   payment_status=datas.get("payment_status"),
+                                   billing_date=datas.get("billing_date"))
+        elif operation1 == "view":
+            if datas.get("id") is None:
+                return "Missing 'id' for view operation."
+            response = hos.get_patient_bills(datas.get("id"))
+            if response["status"] == "success" and not response["data"]:
+                return f"No billing records found for patient ID {datas.get('id')}."
+            return str(response)
+        return f"Invalid operation '{operation1}' requested."
+    elif table == "appointment":
+        if operation1 == "insert":
+            required_keys = ["patient_id", "doctor_id", "appointment_date", "appointment_time"]
+            if not all(key in datas and datas[key] is not None for key in required_keys):
+                return f"Missing required fields for insert. Need: {required_keys}"
+            return hos.create_appointment(datas.get("patient_id"), datas.get("doctor_id"),
+                                          datas.get("appointment_date"), datas.get("appointment_time"))
+        elif operation1 == "update":
+            return hos.update_appointment(datas.get("appointment_id"),
+                                          appointment_date=datas.get("appointment_date"),
+                                          appointment_time=datas.get("appointment_time"),
+                                          status=datas.get("appointment_status"))
+        elif operation1 == "view":
+            if datas.get("appointment_id") is None:
+                return "Missing 'id' for view operation."
+            return str(hos.get_appointments(appointment_id=datas.get("appointment_id")))
+        return f"Invalid operation '{operation1}' requested."
+    return f"Invalid operation '{table}' requested."
+
+
+DISPATCH_SAMPLES = [
+    ("patient", "view", {"id": 1}),
+    ("doctor", "view", {"id": 1}),
+    ("appointment", "view", {"appointment_id": 1}),
+    ("bill", "view", {"id": 1}),
+    ("patient", "insert", {"name": "John Doe", "age": 35, "gender": "Male",
+                           "contact": "9876543210", "address": "45 Main Street"}),
+    ("appointment", "update", {"appointment_id": 1, "appointment_time": "12:30:00"}),
+    ("bill", "insert", {"patient_id": 1, "appointment_id": 1, "amount": 2500,
+                        "payment_method": "Online", "payment_status": "Paid"}),
+]
+
+
+def bench_dispatch(args):
+    """Per-call dispatch overhead of dict.operations vs. the original chain (no database)."""
+    hospital = StubHospital()
+    saved_hos = dict_logic.hos
+    dict_logic.hos = hospital
+    try:
+        registry = lambda table, op, datas: dict_logic.operations(table, op, datas)
+        legacy = lambda table, op, datas: legacy_operations(hospital, table, op, datas)
+        print(f"{args.iterations} calls per sample")
+        print(f"{'sample':<22}{'chain (us)':>12}{'registry (us)':>15}")
+        for table, op, datas in DISPATCH_SAMPLES:
+            timings = []
+            for dispatch in (legacy, registry):
+                start = time.perf_counter()
+                for _ in range(args.iterations):
+                    dispatch(table, op, dict(datas))
+                timings.append((time.perf_counter() - start) / args.iterations * 1e6)
+            print(f"{table + '/' + op:<22}{timings[0]:>12.2f}{timings[1]:>15.2f}")
+    finally:
+        dict_logic.hos = saved_hos
+
+
+# --- Rule-based fast path ---
+
+def load_utterances(path):
+    """Utterances from a test file such as inputs.txt/input.txt (one per line, quotes and numbering stripped)."""
+    utterances = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            text = re.sub(r"^\s*\d+\.\s*", "", line.strip()).strip('"').strip()
+            if len(text.split()) >= 3 and text[0].isalnum() and not text.endswith(":"):
+                utterances.append(text)
+    return utterances
+
+
+def bench_fastpath(args):
+    """Hit ratio and parse latency of fast_intent over a file of utterances."""
+    utterances = load_utterances(args.file)
+    latencies = []
+    hits = 0
+    for text in utterances:
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            intent = fast_intent.parse(text)
+        latencies.append((time.perf_counter() - start) / args.iterations * 1e6)
+        hits += intent is not None
+        if args.verbose:
+            print(f"{'HIT ' if intent else 'MISS'} {text[:60]!r} -> {intent.to_dict() if intent else None}")
+    print(f"{len(utterances)} utterances from {args.file}: {hits} handled locally "
+          f"(hit ratio {hits / len(utterances):.0%}), the rest go to the LLM")
+    print(f"parse latency: median {statistics.median(latencies):.1f}us, max {max(latencies):.1f}us")
+
+
+# --- User store ---
+
+def _time_lookups(lookup, keys):
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def _linear_by_email(users, email):
+    # What app.py used to do on every register / forgot_password request.
+    for uname, udata in users.items():
+        if udata.get("email") == email:
+            return uname, udata
+    return None, None
+
+
+def bench_users(args):
+    """Email / reset-token lookup latency as the user count grows."""
+    tmpdir = tempfile.TemporaryDirectory()
+    now = datetime.utcnow()
+    sizes = sorted({min(args.users, n) for n in (1000, 10000, args.users)})
+    print(f"{'users':>8} {'backend':>8} {'by email':>10} {'by token':>10} {'linear scan':>12}  (us/lookup)")
+    for size in sizes:
+        if args.backend == "sqlite":
+            store = user_store.SQLiteUserStore(os.path.join(tmpdir.name, f"users-{size}.sqlite3"))
+        else:
+            store = user_store.InMemoryUserStore()
+        plain = {}
+        for i in range(size):
+            name, email = f"user{i}", f"user{i}@example.com"
+            store.add(name, "hash", "non-admin", email)
+            plain[name] = {"email": email}
+            if i % 10 == 0:
+                store.set_reset_token(name, f"token{i}", now + timedelta(hours=1))
+
+        rng = random.Random(size)
+        emails = [f"user{rng.randrange(size)}@example.com" for _ in range(args.lookups)]
+        tokens = [f"token{rng.randrange(0, size, 10)}" for _ in range(args.lookups)]
+        by_email = _time_lookups(store.get_by_email, emails)
+        by_token = _time_lookups(store.get_by_reset_token, tokens)
+        scan_keys = emails[:max(1, args.lookups * 1000 // size)]  # Keep the O(n) baseline quick
+        linear = _time_lookups(lambda email: _linear_by_email(plain, email), scan_keys)
+        print(f"{size:>8} {args.backend:>8} {by_email:>10.2f} {by_token:>10.2f} {linear:>12.2f}")
+
+    # Expire every token and check eviction empties the token index.
+    evicted = store.evict_expired_tokens(now + timedelta(hours=2))
+    print(f"evicted {evicted} expired reset tokens; "
+          f"token lookup after eviction: {store.get_by_reset_token('token0')}")
+    tmpdir.cleanup()
+
+
+# --- Password hashing ---
+
+HASH_METHODS = "scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:1000000"
+
+
+def _login_burst(login, threads, burst):
+    """
+    Fire `burst` logins at a pool of `threads` request threads, then time how
+    long a trivial request (standing in for /chat) waits for a thread.
+    """
+    outcomes = {"ok": 0, "rejected": 0}
+
+    def attempt():
+        try:
+            login()
+            outcomes["ok"] += 1
+        except password_hashing.HashingBusyError:
+            outcomes["rejected"] += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(attempt) for _ in range(burst)]
+        time.sleep(0.05)  # Let the burst occupy the threads
+        t = time.perf_counter()
+        executor.submit(lambda: None).result()
+        probe_ms = (time.perf_counter() - t) * 1000
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    return outcomes, elapsed, probe_ms
+
+
+def bench_hashing(args):
+    """KDF cost per method, then a login burst inline vs. on the bounded pool."""
+    print(f"{'method':<24} {'hash ms':>8}")
+    for method in args.methods.split(","):
+        samples = []
+        for _ in range(args.samples):
+            start = time.perf_counter()
+            generate_password_hash("correct horse battery staple", method)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{method:<24} {statistics.median(samples):>8.1f}")
+
+    method = args.methods.split(",")[0]
+    stored = generate_password_hash("secret", method)
+    hasher = password_hashing.PasswordHasher(workers=args.workers, queue_depth=args.queue_depth, method=method)
+    hasher.verify(stored, "secret")  # Start the worker processes outside the timing
+    modes = {
+        "inline": lambda: password_hashing.check_password_hash(stored, "secret"),
+        "pool": lambda: hasher.verify(stored, "secret"),
+    }
+    print(f"\n{args.burst} logins on {args.threads} request threads ({method}; pool: "
+          f"{args.workers} workers, queue depth {args.queue_depth})")
+    print(f"{'mode':<8} {'ok':>5} {'503':>5} {'burst s':>8} {'chat wait ms':>13}")
+    for mode, login in modes.items():
+        outcomes, elapsed, probe_ms = _login_burst(login, args.threads, args.burst)
+        print(f"{mode:<8} {outcomes['ok']:>5} {outcomes['rejected']:>5} {elapsed:>8.2f} {probe_ms:>13.1f}")
+    hasher.shutdown()
+
+
+# --- End to end: /chat with the fake LLM and SQLite ---
+
+def _percentiles(samples):
+    if len(samples) < 2:
+        return (samples[0],) * 3 if samples else (0.0, 0.0, 0.0)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def bench_e2e(args):
+    """Throughput and latency percentiles of POST /chat at fixed concurrency, fully offline."""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_TOKENS_PER_S"] = str(args.tokens_per_s)
+    os.environ["FAKE_LLM_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ.setdefault("FAKE_LLM_SEED", "1")
+    tmpdir = tempfile.TemporaryDirectory()
+    mysql_helpers.DB_BACKEND = "sqlite"
+    mysql_helpers.SQLITE_PATH = os.path.join(tmpdir.name, "hospital.sqlite3")
+
+    import app as chat_app  # Imported here so the backends above are picked up
+    import metrics
+
+    # A few rows so the view/update utterances find something.
+    hos = dict_logic.hos
+    hos.bulk_insert_patients({"name": f"Patient {i}", "age": 20 + i % 60, "contact": f"900000{i:04d}"}
+                             for i in range(1, 201))
+    hos.bulk_add_doctors({"doctor_id": str(i), "name": f"Dr. {i}", "specialization": "General", "contact": "1"}
+                         for i in range(1, 21))
+    hos.bulk_create_appointments({"patient_id": i, "doctor_id": str(1 + i % 20), "appointment_date": "2025-05-22",
+                                  "appointment_time": "11:00:00"} for i in range(1, 201))
+    hos.bulk_create_bills({"patient_id": i, "appointment_id": i, "amount": 100.0, "payment_method": "Cash"}
+                          for i in range(1, 201))
+
+    utterances = load_utterances(args.file)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def client(worker):
+        http = chat_app.app.test_client()
+        with http.session_transaction() as session:  # Skip the (deliberately slow) password check
+            session.update(logged_in=True, username="admin", role="admin")
+        for n in range(worker, args.requests, args.concurrency):
+            start = time.perf_counter()
+            response = http.post("/chat", json={"message": utterances[n % len(utterances)]})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    logging.disable(logging.CRITICAL)  # The app logs every stage; keep the report readable
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(client, range(args.concurrency)))
+    wall = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+
+    p50, p95, p99 = _percentiles(latencies)
+    print(f"{args.requests} chats from {args.file}, concurrency {args.concurrency}, fake LLM "
+          f"{args.latency_ms}ms + {args.tokens_per_s} tok/s, failure rate {args.failure_rate}")
+    print(f"throughput {args.requests / wall:.1f} req/s, latency p50 {p50:.1f}ms p95 {p95:.1f}ms p99 {p99:.1f}ms")
+    print(f"status codes: {dict(sorted(statuses.items()))}, LLM calls: {chat_app.llm1.model.calls}")
+    print(f"{'stage':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage in ("intent_local", "llm_extract", "intent_parse", "dispatch", "render"):
+        quantiles = [metrics.STAGE_LATENCY.quantile(q, stage=stage) for q in (0.5, 0.95, 0.99)]
+        if quantiles[0] is not None:
+            print(f"{stage:<24} " + " ".join(f"{q * 1000:>8.2f}" for q in quantiles))
+    mysql_helpers.get_pool().close_all()
+    tmpdir.cleanup()
+
+
+def bench_listings(args):
+    """Seed a large dataset, check query plans, and assert listing page latency."""
+    import schema
+    import view_cache
+    from old_mysql import Hospital
+
+    tmpdir = None
+    if not args.live:
+        tmpdir = tempfile.TemporaryDirectory()
+        mysql_helpers.DB_BACKEND = "sqlite"
+        mysql_helpers.SQLITE_PATH = os.path.join(tmpdir.name, "hospital.sqlite3")
+    else:
+        conn = mysql_helpers.connect_db()
+        schema.migrate(conn, verbose=True)
+        conn.close()
+    view_cache.cache = view_cache.ViewCache(None)  # Measure the database, not the cache
+    hos = Hospital()
+    rng = random.Random(1)
+    patients = max(1, args.appointments // 50)
+    doctors = max(1, args.appointments // 2000)
+    bills = args.appointments // 5
+
+    if args.seed:
+        start = time.perf_counter()
+        hos.bulk_insert_patients(({"name": f"Patient {i}", "age": 20 + i % 60} for i in range(1, patients + 1)),
+                                 chunk_size=2000)
+        hos.bulk_add_doctors(({"doctor_id": f"D{i}", "name": f"Dr. {i}", "specialization": "General", "contact": "1"}
+                              for i in range(1, doctors + 1)), chunk_size=2000)
+        day = datetime(2020, 1, 1)
+        hos.bulk_create_appointments(({"patient_id": rng.randint(1, patients), "doctor_id": f"D{rng.randint(1, doctors)}",
+                                       "appointment_date": (day + timedelta(days=i // 500)).date().isoformat(),
+                                       "appointment_time": "10:00:00"} for i in range(args.appointments)),
+                                     chunk_size=2000)
+        hos.bulk_create_bills(({"patient_id": rng.randint(1, patients), "appointment_id": rng.randint(1, args.appointments),
+                                "amount": 100.0, "payment_method": "Cash"} for _ in range(bills)), chunk_size=2000)
+        print(f"seeded {patients} patients, {doctors} doctors, {args.appointments} appointments, {bills} bills "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    conn = mysql_helpers.connect_db()
+    try:
+        checked, failures = schema.check(conn)
+    finally:
+        conn.close()
+    for label, query, problem in failures:
+        print(f"PLAN FAIL {label}: {problem}")
+    print(f"query plans: {checked} checked, {len(failures)} problem(s)")
+
+    def patient_page2():
+        patient_id = rng.randint(1, patients)
+        return {"patient_id": patient_id, "after": hos.get_appointments(patient_id=patient_id, limit=5).next_cursor or 0}
+
+    def bills_page2():
+        patient_id = rng.randint(1, patients)
+        return {"patient_id": patient_id, "after": hos.get_patient_bills(patient_id, limit=2).next_cursor}
+
+    # (name, method, untimed setup returning the arguments for one sample)
+    cases = [
+        ("patient appointments p1", hos.get_appointments, lambda: {"patient_id": rng.randint(1, patients)}),
+        ("patient appointments p2", hos.get_appointments, patient_page2),
+        ("doctor appointments p1", hos.get_appointments, lambda: {"doctor_id": f"D{rng.randint(1, doctors)}"}),
+        ("doctor appointments deep", hos.get_appointments,
+         lambda: {"doctor_id": f"D{rng.randint(1, doctors)}", "after": rng.randint(1, args.appointments)}),
+        ("all appointments deep", hos.get_appointments, lambda: {"after": rng.randint(1, args.appointments)}),
+        ("patient bills p1", hos.get_patient_bills, lambda: {"patient_id": rng.randint(1, patients)}),
+        ("patient bills p2", hos.get_patient_bills, bills_page2),
+    ]
+    print(f"{'listing page':<26} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    slow = []
+    for name, method, setup in cases:
+        samples = []
+        for _ in range(args.samples):
+            kwargs = setup()
+            start = time.perf_counter()
+            result = method(**kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+            if result.get("status") != "success":
+                raise SystemExit(f"{name}: {result.get('message')}")
+        p50, p95, _ = _percentiles(samples)
+        verdict = "" if p95 <= args.max_p95_ms else f"  FAIL (> {args.max_p95_ms}ms)"
+        if verdict:
+            slow.append(name)
+        print(f"{name:<26} {p50:>8.2f} {p95:>8.2f} {max(samples):>8.2f}{verdict}")
+
+    mysql_helpers.get_pool().close_all()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    if failures or slow:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital chatbot benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p = sub.add_parser("pool", help="Connection pool vs. connect-per-call")
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--pool-size", type=int, default=mysql_helpers.POOL_SIZE)
+    p.add_argument("--handshake-ms", type=float, default=5.0)
+    p.add_argument("--query-ms", type=float, default=0.5)
+    p.add_argument("--live", action="store_true", help="Use the real database from .env")
+    p.set_defaults(func=bench_pool)
+
+    p = sub.add_parser("dispatch", help="dict.operations registry vs. the original if/elif chain")
+    p.add_argument("--iterations", type=int, default=200000)
+    p.set_defaults(func=bench_dispatch)
+
+    p = sub.add_parser("fastpath", help="Rule-based intent parser hit ratio and latency")
+    p.add_argument("--file", default="inputs.txt")
+    p.add_argument("--iterations", type=int, default=1000)
+    p.add_argument("--verbose", action="store_true")
+    p.set_defaults(func=bench_fastpath)
+
+    p = sub.add_parser("users", help="Indexed user store lookups vs. the old linear scan")
+    p.add_argument("--users", type=int, default=100000)
+    p.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    p.add_argument("--lookups", type=int, default=2000)
+    p.set_defaults(func=bench_users)
+
+    p = sub.add_parser("hashing", help="Password KDF cost and login bursts inline vs. on the hashing pool")
+    p.add_argument("--methods", default=HASH_METHODS, help="Comma-separated werkzeug methods; the first is used for the burst")
+    p.add_argument("--samples", type=int, default=5)
+    p.add_argument("--burst", type=int, default=64)
+    p.add_argument("--threads", type=int, default=16)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--queue-depth", type=int, default=4)
+    p.set_defaults(func=bench_hashing)
+
+    p = sub.add_parser("e2e", help="POST /chat end to end with the fake LLM and a SQLite database")
+    p.add_argument("--file", default="input.txt")
+    p.add_argument("--requests", type=int, default=500)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--latency-ms", type=float, default=300)
+    p.add_argument("--tokens-per-s", type=float, default=100)
+    p.add_argument("--failure-rate", type=float, default=0.0)
+    p.set_defaults(func=bench_e2e)
+
+    p = sub.add_parser("listings", help="Listing page latency on a large dataset, with query-plan checks")
+    p.add_argument("--appointments", type=int, default=1000000)
+    p.add_argument("--samples", type=int, default=200)
+    p.add_argument("--max-p95-ms", type=float, default=25.0)
+    p.add_argument("--live", action="store_true", help="Use the real database from .env")
+    p.add_argument("--no-seed", dest="seed", action="store_false", help="Measure the existing data (with --live)")
+    p.set_defaults(func=bench_listings)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bulk_import.py - Stream a CSV/JSONL file into the Hospital bulk inserts
+#
+# Usage:
+#   python bulk_import.py patients roster.csv
+#   python bulk_import.py doctors doctors.jsonl --chunk-size 1000 --all-or-nothing --errors failed.jsonl
+#
+# Column names are matched case-insensitively against the bulk method's
+# field names (name, age, gender, contact, address for patients) or the
+# database column names (PatientName, Age, ...). Unknown columns are ignored.
+# The file is read lazily, so rosters larger than memory import fine.
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+from old_mysql import Hospital, BULK_CHUNK_SIZE, BULK_TABLES
+
+_METHODS = {
+    "patients": "bulk_insert_patients",
+    "doctors": "bulk_add_doctors",
+    "appointments": "bulk_create_appointments",
+    "bills": "bulk_create_bills",
+}
+
+
+def _header_map(kind, header):
+    """Map each input column to a record field name (or None to drop it)."""
+    _, fields = BULK_TABLES[kind]
+    names = {}
+    for field_name, column, _ in fields:
+        names[field_name.lower()] = field_name
+        names[column.lower()] = field_name
+    return {key: names.get(key.strip().lower()) for key in header}
+
+
+def read_records(kind, path):
+    """Yield record dicts from a .csv or .jsonl file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.endswith(".jsonl"):
+            mapping = {}
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for key in row.keys() - mapping.keys():
+                    mapping.update(_header_map(kind, [key]))
+                yield {mapping[key]: value for key, value in row.items() if mapping[key]}
+            return
+        reader = csv.DictReader(f)
+        mapping = _header_map(kind, reader.fieldnames or [])
+        unknown = [key for key, name in mapping.items() if name is None]
+        if unknown:
+            print(f"Ignoring unknown columns: {', '.join(unknown)}", file=sys.stderr)
+        for row in reader:
+            yield {mapping[key]: value for key, value in row.items() if key is not None and mapping.get(key)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import hospital records from CSV or JSONL")
+    parser.add_argument("kind", choices=sorted(_METHODS))
+    parser.add_argument("path", help=".csv (with a header row) or .jsonl file")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Rows per multi-row INSERT")
+    parser.add_argument("--all-or-nothing", action="store_true", help="Roll back everything if any row fails")
+    parser.add_argument("--errors", help="Write per-row errors to this JSONL file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bulk_insert = getattr(Hospital(), _METHODS[args.kind])
+    result = bulk_insert(read_records(args.kind, args.path), chunk_size=args.chunk_size,
+                         all_or_nothing=args.all_or_nothing)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.kind}: {result['inserted']} inserted, {result['failed']} failed "
+          f"in {result['chunks']} chunks, {elapsed:.1f}s ({result['status']})")
+    if result.get("message"):
+        print(result["message"])
+    if args.errors and result["errors"]:
+        with open(args.errors, "w", encoding="utf-8") as f:
+            for error in result["errors"]:
+                f.write(json.dumps(error) + "\n")
+        print(f"Row errors written to {args.errors}")
+    else:
+        for error in result["errors"][:20]:
+            print(f"  row {error['row']}: {error['message']}")
+        if result["failed"] > 20:
+            print(f"  ... {result['failed'] - 20} more (use --errors to save them all)")
+    sys.exit(0 if result["status"] == "success" else 1)
+
+
+if __name__ == "__main__":
+    main()
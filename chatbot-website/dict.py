@@ -1,13 +1,19 @@
-# dict.py (Modified operations function)
+# dict.py (Table-driven operation dispatch)
 import json
+import inspect
+import re
+from dataclasses import dataclass, field
 from old_mysql import Hospital
-import llm1 # Keep this if llm1 is still needed *within* dict.py, otherwise remove
+from hospital_result import HospitalResult
+import mysql_helpers as db_connect
+import metrics
 
 hos = Hospital()
 OUTPUT_JSON_PATH = 'output.json' # Define path consistently
 
 def sql_values():
-    # ... (keep existing code but ensure file path is correct) ...
+    # Reads back the intent debug sink (see llm1.DEBUG_INTENT_PATH). The request
+    # path no longer uses this: app.chat passes the Intent straight to operations().
     try:
         with open(OUTPUT_JSON_PATH, 'r') as file:
             data = json.load(file)
@@ -30,205 +36,211 @@ def sql_values():
         print(f"Unexpected error in sql_values: {e}")
         return None, None, None
 
-def operations(table, operation1, datas):
-    result = None # Initialize result
-    if not operation1 or datas is None:
-         print("Invalid operation or data received in operations function.")
-         return "Invalid operation or data provided." # Return error string
+# --- Result Rendering ---
 
-    try:
-        if table == "patient":
-
-            if operation1 == "insert":
-                # Add checks for missing keys
-                required_keys = [ "name", "age", "gender", "contact", "address"]
-                if not all(key in datas for key in required_keys):
-                    return f"Missing required fields for insert. Need: {required_keys}"
-                
-                if datas.get("gender") is None:
-                    datas["gender"] = "Unknown"
-
-                name = datas.get("name")
-                age = datas.get("age")
-                gender = datas.get("gender")
-                contact = datas.get("contact")
-                address = datas.get("address")
-                result = hos.insert_patient( name, age, gender, contact, address)
-                # llm1.generate_output_text(result) # Remove LLM call from here
-
-
-            elif operation1 == "update":
-                id = datas.get("id")
-                if id is None:
-                    return "Missing 'id' for update operation."
-                # Get other fields safely
-                name = datas.get("name")
-                age = datas.get("age")
-                address = datas.get("address")
-                contact = datas.get("contact")
-                # Pass only non-None values to update_patient
-                result = hos.update_patient(id, name=name, age=age, address=address, contact=contact)
-                # llm1.generate_output_text(result) # Remove
-
-            elif operation1 == "view":
-                id = datas.get("id")
-                if id is None:
-                    return "Missing 'id' for view operation."
-                view_data = hos.view_patient(id)
-                if isinstance(view_data, tuple):
-                    result = f"Record found: ID={view_data[0]}, Name={view_data[1]}, Age={view_data[2]}, Contact={view_data[4]}, Address={view_data[5]}"
-                elif view_data: 
-                    result = str(view_data)
-                else:
-                    result = f"No record found with ID {id}."
+def _render_result(result, datas):
+    """Hand the HospitalResult back unchanged; responses.render turns it into text."""
+    return result
 
-            else:
-                print(f"Invalid operation received: {operation1}")
-                result = f"Invalid operation '{operation1}' requested."
-           
-
-        elif table == "doctor":
-
-            if operation1 == "insert":
-                required_keys = ["doctor_id", "name", "specialization", "contact", "schedule"]
-                if not all(key in datas and datas[key] is not None for key in required_keys):
-                    return f"Missing required fields for insert. Need: {required_keys}"
-                doctor_id = datas.get("id")
-                name = datas.get("name")
-                specialization = datas.get("specialization")
-                contact = datas.get("contact")
-                schedule = datas.get("schedule")
-                result = hos.add_doctor(doctor_id, name, specialization, contact, schedule)
-                
-
-            elif operation1 == "view":
-                id = datas.get("id")
-                if id is None:
-                    return "Missing 'id' for view operation."
-                # view_patient needs to return a user-friendly string or structured data
-                view_data = hos.get_doctor(id)
-                if isinstance(view_data, tuple): # Assuming it returns a tuple on success
-                    # Format the tuple into a readable string
-                    result = f"Record found: ID={view_data[0]}, Name={view_data[1]}, Specialization={view_data[2]}, Contact={view_data[4]}, Schedula={view_data[5]}"
-                elif view_data: # Handle other non-None return values if necessary
-                    result = str(view_data)
-                else:
-                    result = f"No record found with ID {id}."
-                # llm1.generate_output_text(result) # Remove
 
-            else:
-                print(f"Invalid operation received: {operation1}")
-                result = f"Invalid operation '{operation1}' requested."
-
-        elif table == "bill":
-
-            # Implement bill operations here
-            if operation1 == "insert":
-                # Add checks for missing keys
-                required_keys = ["patient_id", "appointment_id", "amount", "payment_method", "payment_status"]
-                if not all(key in datas and datas[key] is not None for key in required_keys):
-                    return f"Missing required fields for insert. Need: {required_keys}"
-                patient_id = datas.get("patient_id")
-                appointment_id = datas.get("appointment_id")
-                amount = datas.get("amount")
-                payment_method = datas.get("payment_method")
-                payment_status = datas.get("payment_status")
-            
-                result = hos.create_bill(patient_id, appointment_id, amount, payment_method, payment_status)
-                # llm1.generate_output_text(result) # Remove LLM call from here
-
-
-            elif operation1 == "update":
-                bill_id = datas.get("bill_id")
-                if id is None:
-                    return "Missing 'id' for update operation."
-                # Get other fields safely
-                amount = datas.get("amount")
-                payment_method = datas.get("payment_method")
-                payment_status = datas.get("payment_status")
-                billing_date = datas.get("billing_date")
-                # Pass only non-None values to update_patient
-                result = hos.update_patient(id,  amount=amount, payment_method = payment_method, payment_status= payment_status, billing_date= billing_date)
-                # llm1.generate_output_text(result) # Remove
-            elif operation1 == "view":
-                patient_id = datas.get("id")  # Better to rename for clarity
-                if patient_id is None:
-                    return "Missing 'id' for view operation."
-    
-                response = hos.get_patient_bills(patient_id)
-
-                if response["status"] == "success":
-                    bills = response["data"]
-                    if bills:
-                        result_lines = ["Billing Records:"]
-                        for bill in bills:
-                            result_lines.append(
-                        f"BillingID: {bill['BillingID']}, Amount: {bill['Amount']}, "
-                        f"PaymentMethod: {bill['PaymentMethod']}, PaymentStatus: {bill['PaymentStatus']}, "
-                        f"BillingDate: {bill['BillingDate']}, AppointmentDate: {bill['AppointmentDate']}, "
-                        f"Doctor: {bill['DoctorName']}"
-                        )
-                        result = "\n".join(result_lines)
-                    else:
-                        result = f"No billing records found for patient ID {patient_id}."
-                else:
-                    result = f"Error fetching bills: {response['message']}"
+# --- Operation Registry ---
 
-            else:
-                print(f"Invalid operation received: {operation1}")
-                result = f"Invalid operation '{operation1}' requested."
-           
-        elif table == "appointment":
-
-            if operation1 == "insert":
-                # Add checks for missing keys
-                required_keys = [ "patient_id", "doctor_id", "appointment_date", "appointment_time"]
-
-                if not all(key in datas and datas[key] is not None for key in required_keys):
-                    return f"Missing required fields for insert. Need: {required_keys}"
-                patient_id = datas.get("patient_id")
-                doctor_id = datas.get("doctor_id")
-                appointment_date = datas.get("appointment_date")
-                appointment_time = datas.get("appointment_time")
-                
-                result = hos.create_appointment( patient_id, doctor_id, appointment_date, appointment_time)
-                # llm1.generate_output_text(result) # Remove LLM call from here
-
-            elif operation1 == "update":
-                appointment_id = datas.get("appointment_id")
-                if id is None:
-                    return "Missing 'id' for update operation."
-                # Get other fields safely
-                appointment_date = datas.get("appointment_date")
-                appointment_time = datas.get("appointment_time")
-                appointment_status = datas.get("appointment_status")
-                # Pass only non-None values to update_patient
-                result = hos.update_appointment(appointment_id, appointment_date=appointment_date, appointment_time=appointment_time, appointment_status=appointment_status)
-                # llm1.generate_output_text(result) # Remove
-
-            elif operation1 == "view":
-                id = datas.get("appointment_id")
-                if id is None:
-                    return "Missing 'id' for view operation."
-                view_data = hos.get_appointments(id)
-                if isinstance(view_data, tuple):
-                    result = f"Record found: ID={view_data[0]}, Name={view_data[1]}, Age={view_data[2]}, Contact={view_data[4]}, Address={view_data[5]}"
-                elif view_data: 
-                    result = str(view_data)
+@dataclass(frozen=True)
+class OperationSpec:
+    """
+    How one (table, operation) pair maps onto a Hospital method.
+
+    args     -- intent fields passed positionally, in order (always required)
+    kwargs   -- intent field -> keyword argument name, passed only when present
+    required -- extra intent fields that must be present and non-null
+    aliases  -- intent field -> alternative keys the LLM may use for it
+    defaults -- value used when a field is missing or null; a field with a
+                default (even None) is never reported missing
+    coerce   -- intent field -> callable applied to the value before the call
+    render   -- (hospital_result, datas) -> value returned to the caller
+    """
+    method: str
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    required: tuple = ()
+    aliases: dict = field(default_factory=dict)
+    defaults: dict = field(default_factory=dict)
+    coerce: dict = field(default_factory=dict)
+    render: object = _render_result
+
+
+OPERATION_REGISTRY = {
+    ("patient", "insert"): OperationSpec(
+        method="insert_patient",
+        args=("name", "age", "gender", "contact", "address"),
+        defaults={"gender": "Unknown", "contact": None, "address": None},  # Stored as NULL
+        coerce={"age": int},
+    ),
+    ("patient", "update"): OperationSpec(
+        method="update_patient",
+        args=("id",),
+        kwargs={"name": "name", "age": "age", "gender": "gender", "address": "address",
+                "contact": "contact", "email": "email"},
+        aliases={"id": ("patient_id",)},
+        coerce={"id": int, "age": int},
+    ),
+    ("patient", "view"): OperationSpec(
+        method="view_patient",
+        args=("id",),
+        aliases={"id": ("patient_id",)},
+        coerce={"id": int},
+    ),
+
+    ("doctor", "insert"): OperationSpec(
+        method="add_doctor",
+        args=("doctor_id", "name", "specialization", "contact", "schedule"),
+        aliases={"doctor_id": ("id",)},
+    ),
+    ("doctor", "update"): OperationSpec(
+        method="update_doctor",
+        args=("doctor_id",),
+        kwargs={"name": "name", "specialization": "specialization", "contact": "contact",
+                "schedule": "schedule"},
+        aliases={"doctor_id": ("id",)},
+    ),
+    ("doctor", "view"): OperationSpec(
+        method="get_doctor",
+        args=("id",),
+        aliases={"id": ("doctor_id",)},
+    ),
+
+    ("appointment", "insert"): OperationSpec(
+        method="create_appointment",
+        args=("patient_id", "doctor_id", "appointment_date", "appointment_time"),
+        coerce={"patient_id": int},
+    ),
+    ("appointment", "update"): OperationSpec(
+        method="update_appointment",
+        args=("appointment_id",),
+        kwargs={"appointment_status": "status", "appointment_date": "appointment_date",
+                "appointment_time": "appointment_time"},
+        aliases={"appointment_id": ("id",), "appointment_status": ("status",)},
+        coerce={"appointment_id": int},
+    ),
+    ("appointment", "view"): OperationSpec(
+        method="get_appointments",
+        kwargs={"appointment_id": "appointment_id", "patient_id": "patient_id", "doctor_id": "doctor_id",
+                "after": "after", "limit": "limit"},
+        aliases={"appointment_id": ("id",)},
+        coerce={"appointment_id": int, "patient_id": int, "after": int, "limit": int},
+    ),
+
+    ("bill", "insert"): OperationSpec(
+        method="create_bill",
+        args=("patient_id", "appointment_id", "amount", "payment_method", "payment_status"),
+        coerce={"patient_id": int, "appointment_id": int, "amount": float},
+    ),
+    ("bill", "update"): OperationSpec(
+        method="update_bill",
+        args=("bill_id",),
+        kwargs={"amount": "amount", "payment_method": "payment_method",
+                "payment_status": "payment_status", "billing_date": "billing_date"},
+        aliases={"bill_id": ("id", "billing_id")},
+        coerce={"bill_id": int, "amount": float},
+    ),
+    ("bill", "view"): OperationSpec(
+        method="get_patient_bills",
+        args=("id",),
+        kwargs={"after": "after", "limit": "limit"},
+        aliases={"id": ("patient_id",)},
+        coerce={"id": int, "limit": int},
+    ),
+}
+
+
+class _CompiledOperation:
+    """An OperationSpec with its lookups and checks resolved once, at import."""
+
+    __slots__ = ("operation", "method", "sql_stage", "fields", "nargs", "kwargs", "required", "coerce", "render")
+
+    def __init__(self, table, operation, spec):
+        method = getattr(Hospital, spec.method, None)
+        if not callable(method):
+            raise TypeError(f"{table}/{operation}: Hospital has no method '{spec.method}'")
+        params = list(inspect.signature(method).parameters)[1:]  # drop 'self'
+        if len(spec.args) > len(params):
+            raise TypeError(f"{table}/{operation}: {spec.method} takes {len(params)} arguments, spec passes {len(spec.args)}")
+        unknown = [kw for kw in spec.kwargs.values() if kw not in params[len(spec.args):]]
+        if unknown:
+            raise TypeError(f"{table}/{operation}: {spec.method} has no keyword argument(s) {unknown}")
+        fields = spec.args + tuple(f for f in spec.kwargs if f not in spec.args)
+        for name in list(spec.aliases) + list(spec.defaults) + list(spec.coerce) + list(spec.required):
+            if name not in fields:
+                raise TypeError(f"{table}/{operation}: '{name}' is not an argument of {spec.method}")
+
+        self.operation = operation
+        self.method = spec.method
+        self.sql_stage = f"sql:{spec.method}"
+        # Everything below is positional: values[i] belongs to fields[i].
+        self.fields = tuple((name, tuple(spec.aliases.get(name, ())), spec.defaults.get(name))
+                            for name in fields)
+        self.nargs = len(spec.args)
+        self.kwargs = tuple((fields.index(name), kw) for name, kw in spec.kwargs.items())
+        self.required = tuple((i, name) for i, name in enumerate(fields)
+                              if (name in spec.args or name in spec.required) and name not in spec.defaults)
+        self.coerce = tuple((fields.index(name), name, convert) for name, convert in spec.coerce.items())
+        self.render = spec.render
+
+    def __call__(self, hospital, datas):
+        values = []
+        for name, aliases, default in self.fields:
+            value = datas.get(name)
+            if value is None:
+                for key in aliases:
+                    value = datas.get(key)
+                    if value is not None:
+                        break
                 else:
-                    result = f"No record found with ID {id}."
+                    value = default
+            values.append(value)
+
+        for i, name in self.required:
+            if values[i] is None:
+                missing = [name for i, name in self.required if values[i] is None]
+                return f"Missing required fields for {self.operation}. Need: {missing}"
+        for i, name, convert in self.coerce:
+            value = values[i]
+            if value is not None and type(value) is not convert:
+                try:
+                    values[i] = convert(value)
+                except (TypeError, ValueError):
+                    return f"Invalid value for '{name}': {value!r}"
 
+        method = getattr(hospital, self.method)
+        with metrics.span(self.sql_stage):
+            if self.kwargs:
+                kwargs = {kw: values[i] for i, kw in self.kwargs if values[i] is not None}
+                result = method(*values[:self.nargs], **kwargs)
             else:
-                print(f"Invalid operation received: {operation1}")
-                result = f"Invalid operation '{operation1}' requested."
+                result = method(*values)
+        return self.render(result, datas)
 
-        else:
 
-            print(f"Invalid operation received: {table}")
-            result = f"Invalid operation '{table}' requested."
+# Validated once at import: a bad spec fails loudly here, not on a user request.
+_DISPATCH = {key: _CompiledOperation(*key, spec) for key, spec in OPERATION_REGISTRY.items()}
+_TABLES = frozenset(table for table, _ in _DISPATCH)
 
-        return result # RETURN the result string
 
+def operations(table, operation1, datas):
+    if not operation1 or datas is None:
+         print("Invalid operation or data received in operations function.")
+         return "Invalid operation or data provided." # Return error string
+
+    handler = _DISPATCH.get((table, operation1))
+    if handler is None:
+        if table not in _TABLES:
+            print(f"Invalid operation received: {table}")
+            return f"Invalid operation '{table}' requested."
+        print(f"Invalid operation received: {operation1}")
+        return f"Invalid operation '{operation1}' requested."
+
+    try:
+        return handler(hos, datas) # RETURN the result string
     except Exception as e:
         print(f"Error during database operation '{operation1}': {e}")
         import traceback
@@ -236,9 +248,81 @@ def operations(table, operation1, datas):
         return f"An error occurred while performing the '{operation1}' operation."
 
 
-# Remove the __main__ block if it calls functions directly,
-# as app.py will now orchestrate the calls.
-# if __name__ == "__main__":
-#     operation1, datas = sql_values()
-#     if operation1 and datas:
-#        operations(operation1, datas)
\ No newline at end of file
+# --- Multi-Operation Plans ---
+
+MAX_PLAN_STEPS = 10
+_REFERENCE_RE = re.compile(r"^\$(\d+)(?:\.(\w+))?$")
+
+
+class _PlanAborted(Exception):
+    pass
+
+
+def _resolve(value, done):
+    """Replace a "$N.field" reference with that field of step N's result (or request)."""
+    match = _REFERENCE_RE.match(value.strip()) if isinstance(value, str) else None
+    if not match:
+        return value
+    n, name = int(match.group(1)), match.group(2)
+    if not 1 <= n <= len(done):
+        raise _PlanAborted(f"it refers to step {n}, which has not run before it")
+    step = done[n - 1]
+    result, data = step["result"], step["data"]
+    if name in (None, "id", f"{step['table']}_id"):
+        # The id the step created; doctors' ids are chosen by the caller, not the driver.
+        candidates = (result.new_id, data.get("id"), data.get(f"{step['table']}_id"))
+    else:
+        row = result.rows[0] if result.rows else {}
+        candidates = (result.get(name), data.get(name), row.get(name))
+    resolved = next((c for c in candidates if c not in (None, 0, "")), None)
+    if resolved is None:
+        raise _PlanAborted(f"step {n} has no '{name or 'id'}' to use")
+    return resolved
+
+
+def operations_plan(steps):
+    """
+    Run several intents (an IntentPlan's steps) in order as one database
+    transaction on one connection. A data value "$N.field" is replaced by that
+    field of step N's result, e.g. "$1.patient_id" for the patient step 1
+    added; "$N" alone is the id step N created.
+
+    Returns a HospitalResult: on success, steps=[{"table", "operation",
+    "data", "result"}, ...] with each step's resolved data and result; if any
+    step fails, an error naming it, and nothing is saved.
+    """
+    if not steps:
+        return "No operations requested."
+    if len(steps) > MAX_PLAN_STEPS:
+        return f"Too many operations in one request ({len(steps)}; at most {MAX_PLAN_STEPS})."
+    done = []
+    try:
+        with db_connect.transaction():
+            for n, step in enumerate(steps, 1):
+                label = f"Step {n} ({step.operation} {step.table})"
+                try:
+                    datas = {key: _resolve(value, done) for key, value in step.data.items()}
+                except _PlanAborted as e:
+                    raise _PlanAborted(f"{label} failed: {e}")
+                result = operations(step.table, step.operation, datas)
+                if isinstance(result, str) or result is None:
+                    raise _PlanAborted(f"{label} failed: {result or 'no result'}")
+                result = HospitalResult(result)
+                if not result.ok:
+                    raise _PlanAborted(f"{label} failed: {result.message}")
+                done.append({"table": step.table, "operation": step.operation, "data": datas, "result": result})
+    except _PlanAborted as e:
+        print(f"Plan rolled back: {e}")
+        return HospitalResult.error(f"{e}. Nothing was saved.")
+    except db_connect.DB_ERRORS as e:
+        print(f"Database Error (plan commit): {e}")
+        return HospitalResult.error(f"The changes could not be saved: {e}")
+    return HospitalResult.success(steps=done)
+
+
+def execute(intent):
+    """Run an Intent with operations(), or an IntentPlan's steps with operations_plan()."""
+    steps = getattr(intent, "steps", None)
+    if steps is not None:
+        return operations_plan(steps)
+    return operations(intent.table, intent.operation, intent.data)
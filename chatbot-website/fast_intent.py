@@ -0,0 +1,345 @@
+# fast_intent.py - Deterministic intent parser that runs before the LLM
+#
+# Handles the common, simply-phrased requests ("Show the profile of doctor 1",
+# "Change the contact number of patient ID 1 to 2165897") with regular
+# expressions. It only answers when every part of the message is accounted
+# for and every field the operation needs was found; anything else returns
+# None so the caller falls back to the LLM.
+
+import re
+import threading
+from datetime import datetime
+
+from intent import Intent
+from dict import OPERATION_REGISTRY
+
+# --- Vocabulary ---
+
+_VERB_RE = re.compile(
+    r"\b(?:(?P<view>show|view|get|display|extract|fetch|find|see|look\s+up|info(?:rmation)?\s+(?:about|on|for))"
+    r"|(?P<insert>add|insert|create|register|schedule|book|generate|enter)"
+    r"|(?P<update>update|change|modify|edit|set|correct))\b",
+    re.IGNORECASE)
+
+_TABLE_RE = re.compile(r"\b(?P<table>patient|doctor|appointment|bill(?:ing)?|invoice)s?\b", re.IGNORECASE)
+_TABLE_NAMES = {"patient": "patient", "doctor": "doctor", "appointment": "appointment",
+                "bill": "bill", "billing": "bill", "invoice": "bill"}
+
+# Words that carry no information once verb, table and values are extracted.
+_FILLER = frozenset("""
+    a an the me my i we want would like to please can could you kindly just now
+    details detail info information about profile record records data entry
+    of for with and on at by in is are its his her their whose who which that
+    id no number new existing all this
+""".split())
+
+_NUMBER_RE = re.compile(r"\d+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# --- Field Grammar ---
+# Free-text values run until the next comma or the end of the sentence.
+_TEXT = r"(?P<v>[^,]+?)(?=\s*,|\s*\.?\s*$)"
+_CAPITALISED = r"(?P<v>[A-Z][\w.']*(?:\s+[A-Z][\w.']*)*)"
+_PHONE = r"(?P<v>\+?\d[\d -]{4,}\d)"
+_DATE = r"(?P<v>\d{4}-\d{2}-\d{2})"
+_TIME = r"(?P<v>\d{1,2}(?::\d{2}){1,2}(?:\s*[ap]\.?m\.?)?|\d{1,2}\s*[ap]\.?m\.?)"
+
+
+def _field(pattern, case_sensitive=False):
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+
+_NAME = _field(r"\b(?i:name(?:d)?|called)\s*(?i:is\s+|:\s*)?" + _CAPITALISED, case_sensitive=True)
+_CONTACT = _field(r"\b(?:contact|phone|mobile)(?:\s*(?:number|no\.?))?\s*(?:is\s+|:\s*)?" + _PHONE)
+
+INSERT_FIELDS = {
+    "patient": {
+        "id": [_field(r"\b(?:patient\s+)?id\s*(?:is\s+|:\s*)?(?P<v>\d+)\b")],
+        "name": [_NAME],
+        "age": [_field(r"\bage(?:d)?\s*(?:is\s+|of\s+|:\s*)?(?P<v>\d{1,3})\b(?:\s*(?:years?|yrs?)(?:\s*old)?)?"),
+                _field(r"\b(?P<v>\d{1,3})\s*(?:years?|yrs?)\s*old\b")],
+        "gender": [_field(r"\b(?:gender\s*(?:is\s+|:\s*)?)?(?P<v>male|female)\b")],
+        "contact": [_CONTACT],
+        "address": [_field(r"\b(?:living\s+at|lives\s+at|residing\s+at|located\s+at|address(?:\s+is)?\s*:?)\s*" + _TEXT)],
+    },
+    "doctor": {
+        "doctor_id": [_field(r"\b(?:doctor\s+)?id\s*(?:is\s+|:\s*)?(?P<v>\d+)\b")],
+        "name": [_NAME],
+        "specialization": [_field(r"\bspeciali[sz](?:ation|ed|es|t)?\s*(?:is\s+|in\s+|:\s*)?" + _TEXT)],
+        "contact": [_CONTACT],
+        "schedule": [_field(r"\b(?:schedule|available|works|timings?)\s*(?:is\s+|on\s+|:\s*)?" + _TEXT)],
+    },
+    "appointment": {
+        "appointment_id": [_field(r"\b(?:appointment\s+)?(?:with\s+)?id\s*(?P<v>\d+)\b")],
+        "appointment_date": [_field(r"\b(?:on\s+)?" + _DATE)],
+        "appointment_time": [_field(r"\b(?:at\s+)?" + _TIME)],
+        "patient_id": [_field(r"\bpatient\s*(?:id\s*)?(?P<v>\d+)\b")],
+        "doctor_id": [_field(r"\bdoctor\s*(?:id\s*)?(?P<v>\d+)\b")],
+    },
+    "bill": {
+        "patient_id": [_field(r"\bpatient\s*(?:id\s*)?(?P<v>\d+)\b")],
+        "appointment_id": [_field(r"\bappointment\s*(?:id\s*)?(?P<v>\d+)\b")],
+        "amount": [_field(r"\b(?:amount|total)\s*(?:is\s+|of\s+|:\s*)?(?:rs\.?|inr|\$)?\s*(?P<v>\d+(?:\.\d+)?)\b")],
+        "payment_method": [_field(r"\b(?:payment(?:\s+method)?\s*(?:is\s+|:\s*|via\s+|by\s+)?|paid\s+(?:by\s+|via\s+)?)"
+                                  r"(?P<v>online|offline|cash|card|upi|insurance)\b")],
+        "payment_status": [_field(r"\b(?:(?:payment\s+)?status\s*(?:is\s+|:\s*)?)?(?P<v>paid|pending|unpaid)\b")],
+    },
+}
+
+# Update phrasing: "<verb> [the] <field> of <table> [id] <n> to <value>"
+_UPDATE_RE = re.compile(
+    r"^\s*(?:update|change|modify|edit|set|correct)\s+(?:the\s+)?(?P<field>[a-z ]+?)\s+(?:of|for)\s+(?:the\s+)?"
+    r"(?:(?P<table>patient|doctor|appointment|bill(?:ing)?|invoice)\s+)?(?:with\s+)?(?:id\s*|#\s*|no\.?\s*)?"
+    r"(?P<id>\d+)\s+(?:to|as)\s+(?P<value>.+?)\s*\.?\s*$",
+    re.IGNORECASE)
+
+# Field phrase -> intent key, per table, for updates.
+UPDATE_FIELDS = {
+    "patient": {"name": "name", "age": "age", "gender": "gender", "contact": "contact",
+                "contact number": "contact", "phone": "contact", "phone number": "contact",
+                "mobile": "contact", "mobile number": "contact", "address": "address", "email": "email"},
+    "doctor": {"name": "name", "specialization": "specialization", "specialisation": "specialization",
+               "contact": "contact", "contact number": "contact", "phone": "contact", "phone number": "contact",
+               "schedule": "schedule", "timing": "schedule", "timings": "schedule", "availability": "schedule"},
+    "appointment": {"date": "appointment_date", "time": "appointment_time", "status": "appointment_status"},
+    "bill": {"amount": "amount", "payment method": "payment_method", "method": "payment_method",
+             "payment status": "payment_status", "status": "payment_status",
+             "billing date": "billing_date", "date": "billing_date"},
+}
+
+# "..., and age to 40" inside an update value means a second field change.
+_SECOND_UPDATE_RE = {
+    table: re.compile(r"(?:,|\band\b|\balso\b)\s*(?:the\s+|his\s+|her\s+|its\s+)?(?:"
+                      + "|".join(sorted(map(re.escape, phrases), key=len, reverse=True)) + r")\b",
+                      re.IGNORECASE)
+    for table, phrases in UPDATE_FIELDS.items()
+}
+
+# Key that carries the record id for each table's update.
+_UPDATE_ID_KEY = {"patient": "id", "doctor": "doctor_id", "appointment": "appointment_id", "bill": "bill_id"}
+
+# The update value runs to the end of the message, so it must look like a
+# value of its field and nothing more: "to Bob and delete doctor 2" is a
+# second request, not a name, and goes to the LLM.
+_STATUSES = {
+    "appointment_status": ("scheduled", "confirmed", "completed", "cancelled", "canceled", "rescheduled",
+                           "pending", "no-show", "missed"),
+    "payment_status": ("paid", "pending", "unpaid"),
+    "payment_method": ("online", "offline", "cash", "card", "upi", "insurance"),
+    "gender": ("male", "female", "other"),
+}
+_UPDATE_VALUE_RE = {
+    "name": re.compile(r"(?:Dr\.?\s+)?[A-Za-z][A-Za-z'-]*\.?(?:\s+[A-Za-z][A-Za-z'-]*\.?){0,4}"),
+    "email": re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    "specialization": re.compile(r"[A-Za-z][A-Za-z &/-]*"),
+}
+# Words that start another clause or request inside a value.
+_CLAUSE_WORDS = re.compile(r"\b(?:and|or|but|then|also|not|plus)\b", re.IGNORECASE)
+# Fields whose values may contain digits of their own ("12 MG Road", "Mon-Fri 9-5").
+_DIGITS_ALLOWED = frozenset(("address", "schedule"))
+
+
+# --- Value Normalisation ---
+
+def _normalise_time(text):
+    text = text.strip().lower().replace(".", "").replace(" ", "")
+    for fmt in ("%I:%M:%S%p", "%I:%M%p", "%I%p", "%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(text, fmt).strftime("%H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def _normalise_date(text):
+    try:
+        return datetime.strptime(text.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _normalise_contact(text):
+    digits = re.sub(r"[\s-]", "", text)
+    return digits if re.fullmatch(r"\+?\d{5,15}", digits) else None
+
+
+def _normalise_int(text):
+    return int(text) if text.strip().isdigit() else None
+
+
+_NORMALISERS = {
+    "id": _normalise_int, "age": _normalise_int, "patient_id": _normalise_int, "doctor_id": _normalise_int,
+    "appointment_id": _normalise_int, "amount": lambda v: float(v) if re.fullmatch(r"\d+(?:\.\d+)?", v) else None,
+    "contact": _normalise_contact, "appointment_date": _normalise_date, "billing_date": _normalise_date,
+    "appointment_time": _normalise_time,
+    "gender": lambda v: v.capitalize() if v.lower() in ("male", "female", "other") else None,
+    "payment_method": lambda v: v.strip().capitalize(),
+    "payment_status": lambda v: v.strip().capitalize(),
+    "appointment_status": lambda v: v.strip().capitalize(),
+}
+
+
+def _normalise(key, value):
+    value = value.strip()
+    if not value:
+        return None
+    normalise = _NORMALISERS.get(key)
+    return normalise(value) if normalise else value
+
+
+# --- Metrics ---
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_ratio": self.hits / total if total else 0.0}
+
+
+_counters = _Counters()
+
+
+def stats():
+    """Fast-path hit/miss counts and hit ratio since start-up."""
+    return _counters.stats()
+
+
+# --- Parser ---
+
+def _has_required(table, operation, data):
+    spec = OPERATION_REGISTRY.get((table, operation))
+    if spec is None:
+        return False
+    for name in spec.args + spec.required:
+        if name in spec.defaults:
+            continue
+        keys = (name,) + tuple(spec.aliases.get(name, ()))
+        if all(data.get(key) is None for key in keys):
+            return False
+    return True
+
+
+def _leftover_words(text, spans):
+    """Words not covered by any matched span and not filler."""
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    return [w for w in _WORD_RE.findall("".join(chars).lower()) if w not in _FILLER]
+
+
+def _parse_view(text, table, spans):
+    numbers = _NUMBER_RE.findall(text)
+    if len(numbers) != 1:
+        return None
+    match = re.search(r"(?<![\w-])" + numbers[0] + r"(?![\w-])", text)
+    if not match:  # id glued to letters, e.g. "D201": leave it to the LLM
+        return None
+    spans.append(match.span())
+    return {"id": int(numbers[0])}
+
+
+def _parse_insert(text, table, spans):
+    data = {}
+    for key, patterns in INSERT_FIELDS[table].items():
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                value = _normalise(key, match.group("v"))
+                if value is None:
+                    return None
+                data[key] = value
+                spans.append(match.span())
+                break
+    return data
+
+
+def _parse_update(text, table, spans):
+    match = _UPDATE_RE.match(text)
+    if not match:
+        return None
+    field_words = _TABLE_RE.sub("", match.group("field")).split()
+    # "... of patient 1 to Bob and delete doctor 2" names two tables: not a simple update.
+    if len({_TABLE_NAMES[m.lower()] for m in _TABLE_RE.findall(text)}) != 1:
+        return None
+    key = UPDATE_FIELDS[table].get(" ".join(w.lower() for w in field_words))
+    if key is None:
+        return None
+    raw_value = match.group("value")
+    if _SECOND_UPDATE_RE[table].search(raw_value) or not _plausible_value(key, raw_value):
+        return None
+    value = _normalise(key, raw_value)
+    if value is None:
+        return None
+    spans.append(match.span())
+    return {_UPDATE_ID_KEY[table]: int(match.group("id")), key: value}
+
+
+def _plausible_value(key, raw_value):
+    """Whether an update value holds just one value for `key`, with no trailing clause."""
+    value = raw_value.strip()
+    if key in _STATUSES:
+        return value.lower() in _STATUSES[key]
+    if key in _NORMALISERS:  # Numbers, dates, times, contacts: their normaliser parses the whole value
+        return True
+    if _CLAUSE_WORDS.search(value) or _VERB_RE.search(value) or _TABLE_RE.search(value):
+        return False
+    if key not in _DIGITS_ALLOWED and _NUMBER_RE.search(value):
+        return False
+    pattern = _UPDATE_VALUE_RE.get(key)
+    return pattern is None or pattern.fullmatch(value) is not None
+
+
+_PARSERS = {"view": _parse_view, "insert": _parse_insert, "update": _parse_update}
+
+
+def parse(user_text, lenient=False):
+    """
+    Parse a simple request without the LLM.
+
+    lenient=True accepts a message even if some of its words were not
+    understood, as long as the operation's required fields were found. It is
+    the fallback for when the LLM is unavailable (see llm1._llm_intent).
+
+    Returns:
+        Intent if the message was understood (completely, unless lenient), otherwise None.
+    """
+    intent = _parse(user_text or "", lenient)
+    _counters.record(intent is not None)
+    return intent
+
+
+def _parse(text, lenient=False):
+    text = text.strip()
+    verb = _VERB_RE.search(text)
+    table_match = _TABLE_RE.search(text)
+    if not verb or not table_match:
+        return None
+    operation = verb.lastgroup
+    table = _TABLE_NAMES[table_match.group("table").lower()]
+    spans = [verb.span(), table_match.span()]
+
+    # Views name exactly one record, so a second table ("bills for patient 5")
+    # means a relationship the rule grammar does not model.
+    if operation == "view" and len({_TABLE_NAMES[t.lower()] for t in _TABLE_RE.findall(text)}) > 1:
+        return None
+
+    data = _PARSERS[operation](text, table, spans)
+    if not data or not _has_required(table, operation, data):
+        return None
+    # Every remaining word must be filler, otherwise something was not understood.
+    if not lenient and _leftover_words(text, spans):
+        return None
+    return Intent(table=table, operation=operation, data=data)
@@ -0,0 +1,59 @@
+# hospital_result.py - Typed return value of the single-record Hospital methods
+#
+#   result = Hospital().view_patient(7)
+#   if result.ok:
+#       print(result.rows[0]["PatientName"])
+#
+# HospitalResult is still a dict ({"status": "success", "data": ...} or
+# {"status": "error", "message": ...}), so code that indexes result["status"]
+# or JSON-encodes it keeps working. The properties give the response
+# templates in responses.py one shape to read instead of guessing keys.
+
+
+class HospitalResult(dict):
+    """Outcome of one Hospital call: status plus data, message or the new row's id."""
+
+    @classmethod
+    def success(cls, **fields):
+        return cls(status="success", **fields)
+
+    @classmethod
+    def error(cls, message):
+        return cls(status="error", message=str(message))
+
+    @property
+    def status(self):
+        return self.get("status")
+
+    @property
+    def ok(self):
+        return self.get("status") == "success"
+
+    @property
+    def message(self):
+        return self.get("message")
+
+    @property
+    def data(self):
+        return self.get("data")
+
+    @property
+    def rows(self):
+        """The returned records as a list (empty for writes and errors)."""
+        data = self.get("data")
+        if data is None:
+            return []
+        return data if isinstance(data, list) else [data]
+
+    @property
+    def next_cursor(self):
+        """Where the next page of a listing starts, or None on the last page."""
+        return self.get("next_cursor")
+
+    @property
+    def new_id(self):
+        """Id of the row an insert created (patient_id, bill_id, ...), or None."""
+        for key, value in self.items():
+            if key.endswith("_id"):
+                return value
+        return None
@@ -0,0 +1,100 @@
+# intent.py - Typed representation of a parsed user request
+import json
+import re
+from dataclasses import dataclass, field
+
+_JSON_OBJECT_RE = re.compile(r"\{[\s\S]*\}")
+_JSON_ARRAY_RE = re.compile(r"\[[\s\S]*\]")
+
+
+def _json_object(response_text):
+    match = _JSON_OBJECT_RE.search(response_text or "")
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+@dataclass
+class Intent:
+    """One database action extracted from a user message."""
+    table: str
+    operation: str
+    data: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, payload):
+        """Build an Intent from the extraction JSON, or return None if it is incomplete."""
+        if not isinstance(payload, dict):
+            return None
+        table = payload.get("table")
+        operation = payload.get("operation")
+        data = payload.get("data")
+        if not table or not operation or not isinstance(data, dict):
+            return None
+        return cls(table=str(table).lower(), operation=str(operation).lower(), data=data)
+
+    @classmethod
+    def from_response_text(cls, response_text):
+        """Pull the first JSON object out of an LLM reply and parse it."""
+        return cls.from_dict(_json_object(response_text))
+
+    @classmethod
+    def list_from_response_text(cls, response_text, expected):
+        """
+        Parse a reply to a batched prompt: a JSON array with one extraction per
+        input, in order. Returns a list of Intent-or-None, or None if the reply
+        is not an array of exactly `expected` items.
+        """
+        match = _JSON_ARRAY_RE.search(response_text or "")
+        if not match:
+            return None
+        try:
+            payload = json.loads(match.group())
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(payload, list) or len(payload) != expected:
+            return None
+        return [cls.from_dict(item) for item in payload]
+
+    def to_dict(self):
+        return {"operation": self.operation, "table": self.table, "data": self.data}
+
+
+@dataclass
+class IntentPlan:
+    """
+    Several database actions extracted from one message, run in order as one
+    transaction (see dict.operations_plan). A data value "$N.field" refers to
+    the result of step N, e.g. {"patient_id": "$1.patient_id"}.
+    """
+    steps: list
+
+    @classmethod
+    def from_dict(cls, payload):
+        """Build a plan from {"operations": [...]}, or return None if any step is incomplete."""
+        if not isinstance(payload, dict) or not isinstance(payload.get("operations"), list):
+            return None
+        steps = [Intent.from_dict(item) for item in payload["operations"]]
+        if not steps or None in steps:
+            return None
+        return cls(steps=steps)
+
+    def to_dict(self):
+        return {"operations": [step.to_dict() for step in self.steps]}
+
+
+def parse_reply(response_text):
+    """
+    Parse a reply to the extraction prompt: an Intent for a single operation,
+    an IntentPlan for {"operations": [...]} with more than one, or None.
+    """
+    payload = _json_object(response_text)
+    if isinstance(payload, dict) and "operations" in payload:
+        plan = IntentPlan.from_dict(payload)
+        if plan is not None and len(plan.steps) == 1:
+            return plan.steps[0]
+        return plan
+    return Intent.from_dict(payload)
@@ -0,0 +1,208 @@
+# intent_cache.py - Template cache in front of the LLM intent extraction
+#
+# Messages are normalised into a skeleton with every number replaced by a
+# slot ("show patient 101" -> "show patient <#>"). The cached value is the
+# extracted intent with those numbers replaced by slot references, so
+# "show patient 205" reuses the entry and gets 205 filled in.
+#
+# An entry is only stored when the mapping is unambiguous: every number in
+# the message is used by the intent exactly once and every number in the
+# intent comes from exactly one slot. A value the model derived from the
+# text (e.g. "9 AM" -> "09:00:00") cannot be re-derived for a different
+# message, so such intents are not cached.
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from intent import Intent
+
+CACHE_MAX_ENTRIES = int(os.environ.get("INTENT_CACHE_SIZE", 1024))
+CACHE_TTL = float(os.environ.get("INTENT_CACHE_TTL", 24 * 3600))   # Seconds
+CACHE_PATH = os.environ.get("INTENT_CACHE_PATH")                  # Optional JSON file for persistence
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_SPACE_RE = re.compile(r"\s+")
+_SLOT = "<#>"
+_SLOT_KEY = "$slot"
+
+
+def _clean(user_text):
+    return _SPACE_RE.sub(" ", (user_text or "").strip()).rstrip(" .!?")
+
+
+def normalise(user_text):
+    """Return (skeleton, slot_values) for a message. Case is kept so names stay exact."""
+    text = _clean(user_text)
+    return _NUMBER_RE.sub(_SLOT, text), _NUMBER_RE.findall(text)
+
+
+def _slot_for(candidates, used):
+    """The single slot index a value maps to, or None if zero/several/already used."""
+    if len(candidates) != 1 or candidates[0] in used:
+        return None
+    used.add(candidates[0])
+    return candidates[0]
+
+
+def _templatise(data, text):
+    """
+    Replace slot values in the intent data with references, or return None if
+    any number in the intent cannot be traced to exactly one slot.
+    """
+    matches = list(_NUMBER_RE.finditer(text))
+    slots = [m.group() for m in matches]
+    used = set()
+    template = {}
+    for key, value in data.items():
+        if isinstance(value, bool) or value is None:
+            template[key] = value
+        elif isinstance(value, (int, float)):
+            index = _slot_for([i for i, slot in enumerate(slots) if float(slot) == float(value)], used)
+            if index is None:
+                return None
+            template[key] = {_SLOT_KEY: index, "type": type(value).__name__}
+        elif isinstance(value, str):
+            # Strings may embed numbers ("2025-05-22", "12 Main Street"): keep the
+            # text between them and reference each number's slot. A value copied
+            # verbatim from the message resolves its slots by position.
+            start = text.find(value)
+            verbatim = start >= 0 and text.find(value, start + 1) < 0
+            parts = []
+            last = 0
+            for match in _NUMBER_RE.finditer(value):
+                if verbatim:
+                    candidates = [i for i, m in enumerate(matches) if m.start() == start + match.start()]
+                else:
+                    candidates = [i for i, slot in enumerate(slots) if slot == match.group()]
+                index = _slot_for(candidates, used)
+                if index is None:
+                    return None
+                parts += [value[last:match.start()], index]
+                last = match.end()
+            template[key] = {_SLOT_KEY: parts + [value[last:]], "type": "str"} if parts else value
+        else:
+            return None  # Nested structures are not templated
+    if len(used) != len(slots):
+        return None  # A number in the message the intent did not use
+    return template
+
+
+def _fill(template, slots):
+    data = {}
+    for key, value in template.items():
+        if not (isinstance(value, dict) and _SLOT_KEY in value):
+            data[key] = value
+            continue
+        ref = value[_SLOT_KEY]
+        if isinstance(ref, list):
+            data[key] = "".join(slots[part] if isinstance(part, int) else part for part in ref)
+        elif value["type"] == "int":
+            if not slots[ref].isdigit():
+                return None
+            data[key] = int(slots[ref])
+        elif value["type"] == "float":
+            data[key] = float(slots[ref])
+        else:
+            data[key] = slots[ref]
+    return data
+
+
+class IntentCache:
+    """Thread-safe LRU + TTL cache of intent templates keyed by message skeleton."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, path=CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # skeleton -> (stored_at, table, operation, template, slot_count)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "rejected": 0, "expired": 0, "evictions": 0}
+        if path:
+            self.load()
+
+    def get(self, user_text):
+        """Return a cached Intent for the message with its slots filled in, or None."""
+        skeleton, slots = normalise(user_text)
+        with self._lock:
+            entry = self._entries.get(skeleton)
+            if entry is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[skeleton]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(skeleton)
+            _, table, operation, template, slot_count = entry
+
+        data = _fill(template, slots) if slot_count == len(slots) else None
+        with self._lock:
+            self._stats["hits" if data is not None else "misses"] += 1
+        if data is None:
+            return None
+        return Intent(table=table, operation=operation, data=data)
+
+    def put(self, user_text, intent):
+        """Cache the intent extracted for a message if it can be templated safely."""
+        skeleton, slots = normalise(user_text)
+        template = _templatise(intent.data, _clean(user_text))
+        with self._lock:
+            if template is None:
+                self._stats["rejected"] += 1
+                return False
+            self._entries[skeleton] = (time.time(), intent.table, intent.operation, template, len(slots))
+            self._entries.move_to_end(skeleton)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats, entries=len(self._entries))
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    # --- Persistence ---
+
+    def save(self, path=None):
+        """Write live entries to disk (atomically) so they survive a restart."""
+        path = path or self.path
+        if not path:
+            return
+        now = time.time()
+        with self._lock:
+            rows = [[skeleton, *entry] for skeleton, entry in self._entries.items() if now - entry[0] <= self.ttl]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Load entries written by save(), skipping expired ones."""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: could not load intent cache from {path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for skeleton, stored_at, table, operation, template, slot_count in rows:
+                if now - stored_at <= self.ttl:
+                    self._entries[skeleton] = (stored_at, table, operation, template, slot_count)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,17 +1,35 @@
 import google.generativeai as genai
 import os
-import re
 import json
 import dict
 import logging 
+import threading
+import time
+import atexit
 from Voice import speak_with_selected_voice
 from dotenv import load_dotenv 
+from intent import Intent, parse_reply
+import fast_intent
+import metrics
+import llm_backend
+import llm_client
+import prompt_builder
+from intent_cache import IntentCache
 
 load_dotenv() 
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 OUTPUT_JSON_PATH = 'output.json' # Define path consistently relative to app.py
+# Opt-in debug sink: set DEBUG_INTENT_PATH (e.g. to output.json) to also write
+# every extracted intent to disk. Requests never read it back.
+DEBUG_INTENT_PATH = os.environ.get("DEBUG_INTENT_PATH")
+_debug_sink_lock = threading.Lock()
+
+# Intent template cache (size/TTL/persistence via INTENT_CACHE_* env vars).
+intent_cache = IntentCache()
+if intent_cache.path:
+    atexit.register(intent_cache.save)
 
 # --- API Key Setup ---
 # It's best practice to load API keys from environment variables.
@@ -25,7 +43,7 @@ try:
 
     genai.configure(api_key=API_KEY)
     # Initialize the specific model you want to use
-    MODEL = genai.GenerativeModel('gemini-2.5-flash') # Or other suitable model
+    MODEL = llm_backend.create_model('gemini-2.5-flash') # Or other suitable model
     logging.info("Google Generative AI configured successfully.")
 
 except ValueError as ve:
@@ -38,14 +56,138 @@ except Exception as e:
 
 os.environ["GEMINI_API_KEY"] = "YOUR_API_KEY"
 genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-model = genai.GenerativeModel('gemini-1.5-flash')
+# LLM_BACKEND=fake swaps Gemini for the offline stand-in in llm_backend.py.
+model = llm_backend.create_model('gemini-1.5-flash')
+
+# Every model call goes through this client: per-call deadline, jittered
+# retries, optional hedging and a circuit breaker (LLM_* env vars, see
+# llm_client.py). While the model is unavailable, extraction falls back to
+# the lenient rule-based parser and replies to the template text.
+client = llm_client.LLMClient("gemini")
 
 
 def configure_and_generate(user_text):
-    prompt = generate_prompt(user_text)
-    response = model.generate_content(prompt)
-    save_response_json(response.text)
-    return response
+    """
+    Extract the database intent from a user message.
+
+    Returns:
+        Intent: the parsed request, an IntentPlan if it asks for several
+        operations, or None if the model reply held no usable JSON.
+    """
+    with metrics.span("intent_local"):
+        intent = _local_intent(user_text)
+    if intent is not None:
+        return intent
+    return _llm_intent(user_text)
+
+
+def _llm_intent(user_text):
+    try:
+        with metrics.span("llm_extract"):
+            response = client.call(model.generate_content, generate_prompt(user_text))
+    except llm_client.LLMUnavailable as e:
+        return _degraded_intent(user_text, e)
+    metrics.record_llm_usage(response, "extract")
+    with metrics.span("intent_parse"):
+        return _intent_from_reply(user_text, response.text)
+
+
+async def configure_and_generate_async(user_text):
+    """Async variant of configure_and_generate; the Gemini call does not block the event loop."""
+    with metrics.span("intent_local"):
+        intent = _local_intent(user_text)
+    if intent is not None:
+        return intent
+    try:
+        with metrics.span("llm_extract"):
+            response = await client.call_async(model.generate_content_async, generate_prompt(user_text))
+    except llm_client.LLMUnavailable as e:
+        return _degraded_intent(user_text, e)
+    metrics.record_llm_usage(response, "extract")
+    with metrics.span("intent_parse"):
+        return _intent_from_reply(user_text, response.text)
+
+
+def _local_intent(user_text):
+    """Answer from the rule-based fast path or the template cache; None means the LLM is needed."""
+    # Rule-based fast path: simple, fully-understood requests skip the model.
+    intent = fast_intent.parse(user_text)
+    source = "Fast-path"
+    if intent is None:
+        # Template cache: same phrasing with different numbers as an earlier request.
+        intent = intent_cache.get(user_text)
+        source = "Cached"
+    if intent is not None:
+        logging.info(f"{source} intent for {user_text!r}: {intent}")
+        if DEBUG_INTENT_PATH:
+            save_response_json(intent, DEBUG_INTENT_PATH)
+    return intent
+
+
+def _degraded_intent(user_text, error):
+    """Best-effort rule-based parse for when the model cannot answer; None if even that fails."""
+    logging.warning(f"LLM unavailable ({error}); falling back to the lenient rule-based parser.")
+    metrics.LLM_FALLBACKS.inc(purpose="extract")
+    with metrics.span("intent_degraded"):
+        return fast_intent.parse(user_text, lenient=True)
+
+
+def _intent_from_reply(user_text, reply_text):
+    intent = parse_reply(reply_text)
+    if intent is None:
+        logging.warning(f"No valid intent JSON in LLM response: {reply_text!r}")
+        return None
+    _remember(user_text, intent)
+    return intent
+
+
+def _remember(user_text, intent):
+    if isinstance(intent, Intent):  # Plans are not templated
+        intent_cache.put(user_text, intent)
+    if DEBUG_INTENT_PATH:
+        save_response_json(intent, DEBUG_INTENT_PATH)
+
+
+def configure_and_generate_batch(user_texts, max_batch=20):
+    """
+    Extract intents for several messages with as few model calls as possible.
+
+    Messages the fast path or the template cache can answer never reach the
+    model; the rest are sent `max_batch` at a time in a single prompt. If a
+    batched reply cannot be lined up with its inputs, those messages are
+    retried one call each.
+
+    Returns:
+        list: an Intent (or None) per message, in input order.
+    """
+    with metrics.span("intent_local"):
+        intents = [_local_intent(text) for text in user_texts]
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+    for start in range(0, len(pending), max_batch):
+        chunk = pending[start:start + max_batch]
+        texts = [user_texts[i] for i in chunk]
+        batch = None
+        if len(chunk) > 1:
+            try:
+                with metrics.span("llm_extract_batch"):
+                    response = client.call(model.generate_content, generate_batch_prompt(texts))
+            except llm_client.LLMUnavailable as e:
+                batch = [_degraded_intent(text, e) for text in texts]  # Not cached: best-effort parses
+            else:
+                metrics.record_llm_usage(response, "extract_batch")
+                with metrics.span("intent_parse"):
+                    batch = Intent.list_from_response_text(response.text, len(chunk))
+                if batch is None:
+                    logging.warning(f"Batched extraction of {len(chunk)} messages did not line up; retrying one by one.")
+                else:
+                    for text, intent in zip(texts, batch):
+                        if intent is not None:
+                            _remember(text, intent)
+        if batch is None:
+            batch = [_llm_intent(text) for text in texts]
+        for i, intent in zip(chunk, batch):
+            intents[i] = intent
+    return intents
 
 def generate_output_text(output_text, model=None):
     """
@@ -60,27 +202,16 @@ def generate_output_text(output_text, model=None):
     """
     prompt = generate_output(output_text)
     
-    # Check for already user-friendly formats
-    if isinstance(prompt, str) and any(prompt.startswith(emoji) for emoji in ("✅", "❌", "ℹ️", "🔹")):
-        return prompt
-    
-    # Skip LLM enhancement if no model provided
-    if model is None:
+    # Skip LLM enhancement if no model provided or the text is already user-friendly
+    if model is None or _is_user_friendly(prompt):
         return prompt
     
     # Otherwise use LLM to reword it nicely
     try:
-        response = model.generate_content(prompt)
-        final_text = ""
-        
-        if hasattr(response, "parts") and response.parts:
-            final_text = "".join(part.text for part in response.parts)
-        elif hasattr(response, 'text'):
-            final_text = response.text
-        else:
-            final_text = prompt
-            
-        return final_text.strip()
+        with metrics.span("llm_render"):
+            response = client.call(model.generate_content, prompt)
+        metrics.record_llm_usage(response, "render")
+        return _response_text(response, prompt)
     
     except Exception as e:
         # Fallback to original prompt if LLM fails
@@ -88,6 +219,146 @@ def generate_output_text(output_text, model=None):
         return prompt
 
 
+def _is_user_friendly(prompt):
+    # Check for already user-friendly formats
+    return isinstance(prompt, str) and any(prompt.startswith(emoji) for emoji in ("✅", "❌", "ℹ️", "🔹"))
+
+
+def _response_text(response, fallback):
+    if hasattr(response, "parts") and response.parts:
+        final_text = "".join(part.text for part in response.parts)
+    elif hasattr(response, 'text'):
+        final_text = response.text
+    else:
+        final_text = fallback
+    return final_text.strip()
+
+
+# --- Response Polish (opt-in) ---
+# Chat replies come from the local templates in responses.py. With
+# LLM_POLISH=1 the model is also asked to reword them, but only gets
+# LLM_POLISH_TIMEOUT seconds and no retries; on timeout or error (or while the
+# circuit breaker is open) the template text is sent.
+POLISH_ENABLED = os.environ.get("LLM_POLISH", "0").lower() in ("1", "true", "yes")
+POLISH_TIMEOUT = float(os.environ.get("LLM_POLISH_TIMEOUT", 1.5))
+
+
+def generate_polish_prompt(text):
+    return ("Reword this hospital assistant reply so it reads naturally and stays concise. "
+            "Keep every name, number, date, status and ID exactly as written and add nothing. "
+            "Reply with the reworded text only.\n\n"
+            f"Text to reword:\n{text}")
+
+
+def polish_response(text, model=None, timeout=None):
+    """
+    Reword template text with the LLM if LLM_POLISH is on, never waiting past
+    the deadline. The call runs on the client's worker pool so a slow model
+    only costs a pool thread, not the request.
+    """
+    model = model or MODEL
+    if not POLISH_ENABLED or model is None or not text:
+        return text
+    timeout = POLISH_TIMEOUT if timeout is None else timeout
+    try:
+        with metrics.span("llm_polish"):
+            response = client.call(model.generate_content, generate_polish_prompt(text), deadline=timeout, retries=0)
+        metrics.record_llm_usage(response, "polish")
+        return _response_text(response, text) or text
+    except llm_client.DeadlineExceeded:
+        logging.warning(f"Response polish exceeded {timeout}s; sending the template text.")
+    except Exception as e:
+        logging.warning(f"Response polish failed: {e}")
+    return text
+
+
+def _open_polish_stream(model, prompt):
+    # Runs on the client's pool: the request and its first chunk count against the deadline.
+    chunks = iter(model.generate_content(prompt, stream=True))
+    return next(chunks, None), chunks
+
+
+def _next_chunk(chunks):
+    # Also on the pool, so a stream that stalls between chunks still hits the deadline.
+    return next(chunks, None)
+
+
+def _chunk_text(chunk):
+    if getattr(chunk, "parts", None):
+        return "".join(part.text for part in chunk.parts)
+    return getattr(chunk, "text", "") or ""
+
+
+def polish_response_stream(text, model=None, timeout=None):
+    """
+    polish_response, yielding the reworded reply chunk by chunk as the model
+    produces it; with LLM_POLISH off the template text is the only chunk.
+    Every chunk is fetched on the client pool, so the whole stream keeps to
+    the polish deadline even if the model stalls mid-reply.
+    If the model fails or times out before its first chunk, the template text
+    is yielded instead. A failure after that cannot take back the chunks
+    already yielded, so it raises llm_client.LLMUnavailable and the caller
+    sends the template text as the final reply.
+    """
+    model = model or MODEL
+    if not POLISH_ENABLED or model is None or not text:
+        yield text
+        return
+    timeout = POLISH_TIMEOUT if timeout is None else timeout
+    end = time.monotonic() + timeout
+    try:
+        with metrics.span("llm_polish"):
+            first, chunks = client.call(_open_polish_stream, model, generate_polish_prompt(text),
+                                        deadline=timeout, retries=0, hedge=False)
+    except llm_client.DeadlineExceeded:
+        logging.warning(f"Response polish exceeded {timeout}s; sending the template text.")
+        first = None
+    except Exception as e:
+        logging.warning(f"Response polish failed: {e}")
+        first = None
+    if first is None or not _chunk_text(first).strip():
+        yield text
+        return
+    last = first
+    yield _chunk_text(first)
+    try:
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise llm_client.DeadlineExceeded(f"Response polish exceeded {timeout}s")
+            # hedge=False: a second next() on the same stream would fail, not race.
+            chunk = client.call(_next_chunk, chunks, deadline=remaining, retries=0, hedge=False)
+            if chunk is None:
+                break
+            last = chunk
+            yield _chunk_text(chunk)
+    except llm_client.LLMUnavailable:
+        raise
+    except Exception as e:
+        raise llm_client.LLMUnavailable(f"Response polish stream failed: {e}") from e
+    finally:
+        metrics.record_llm_usage(last, "polish")  # The last chunk carries the totals
+
+
+async def polish_response_async(text, model=None, timeout=None):
+    """Async variant of polish_response; the model call is cancelled at the deadline."""
+    model = model or MODEL
+    if not POLISH_ENABLED or model is None or not text:
+        return text
+    timeout = POLISH_TIMEOUT if timeout is None else timeout
+    try:
+        with metrics.span("llm_polish"):
+            response = await client.call_async(model.generate_content_async, generate_polish_prompt(text),
+                                               deadline=timeout, retries=0)
+        metrics.record_llm_usage(response, "polish")
+        return _response_text(response, text) or text
+    except llm_client.DeadlineExceeded:
+        logging.warning(f"Response polish exceeded {timeout}s; sending the template text.")
+    except Exception as e:
+        logging.warning(f"Response polish failed: {e}")
+    return text
+
+
 def generate_output(output_text):
     """
     Generate a concise, user-friendly output message from various response types.
@@ -104,96 +375,32 @@ def generate_output(output_text):
     return str(output_text).strip()
 
 
-def generate_prompt(user_text): 
+def generate_prompt(user_text):
     """
-    First identify the SQL table from the text: patient, doctor, appointment, or bill.
-    Then identify the operation: insert (also appears as add), update (also appears as change), view (also appears as show, extract, info about).
-
-    Only one operation should be extracted per request.
-
-    Extract the relevant information and return it as JSON based on the table and operation:
-
-    For table: patient
-    - Insert: { "operation": "insert", "table": "patient", "data": { "id": ..., "name": ..., "age": ..., "gender": ..., "address": ..., "contact": ... } }    
-    For patient insert operations, ensure all required fields (name, age, gender, contact, address)  
-    have non-null values. If gender is unspecified, use 'Unknown' as default
-    - Update: { "operation": "update", "table": "patient", "data": {"id": ..., {"field"}: {"value"}... } }
-    - View:   { "operation": "view", "table": "patient","data": { "id": ... }}
-
-
-    For table: doctor
-    - Insert: { "operation": "insert", "table": "doctor", "data": { "doctor_id": ..., "name": ..., "specialization": ..., "schedule": ..., "contact": ... } }
-    - Update: { "operation": "update", "table": "doctor", "data": {"doctor_id": ..., {"field"}: {"value"}... } }
-    - View:   { "operation": "view", "table": "doctor", "data": {"id": ... }}
+    Extraction prompt for one message. Only the schema of the table the
+    message is about is included when prompt_builder can tell which one it is.
+    """
+    return prompt_builder.build_prompt(user_text)
 
-    For table: appointment
-    - Insert: { "operation": "insert", "table": "appointment", "data": { "appointment_id": ..., "appointment_date": ..., "appointment_time": ..., "patient_id": ..., "doctor_id": ... } }
-    - Update: { "operation": "update", "table": "appointment",  "data": { {"field"}: {"appointment_id": ...,"value"}... } }
-    - View:   { "operation": "view", "table": "appointment", "data": {"id": ... }}
 
-    For table: bill
-    - Insert: { "operation": "insert", "table": "bill", "data": { "bill_id": ..., "amount": ..., "payment_method": ..., "payment_status": ..., "billing_date": ..., "patient_id": ..., "appointment_id": ... } }
-    - Update: { "operation": "update", "table": "bill", "data": { "bill_id": ..., {"field"}: {"value"}... } }
-    - View:   { "operation": "view", "table": "bill","data": {"id": ... }}
+def generate_batch_prompt(user_texts):
+    """Prompt asking for one extraction per numbered input, returned as a JSON array."""
+    return prompt_builder.build_batch_prompt(user_texts)
 
-    Return the output strictly in the above JSON format.
 
-    User input: {user_text}
-    """
-    return f"""
-First identify the SQL table from the text: patient, doctor, appointment, or bill.
-Then identify the operation: insert (also appears as add), update (also appears as change), view (also appears as show, extract, info about).
-
-Only one operation should be extracted per request.
-
-Extract the relevant information and return it as JSON based on the table and operation:
-
-For table: patient
-- Insert: {{ "operation": "insert", "table": "patient", "data": {{ "id": ..., "name": ..., "age": ..., "gender": ..., "address": ..., "contact": ... }} }}
-- Update: {{ "operation": "update", "table": "patient", "data": {{"id": ..., {"field"}: {"value"}... }} }}
-- View:   {{ "operation": "view", "table": "patient","data": {{ "id": ... }} }}
-
-For table: doctor
-- Insert: {{ "operation": "insert", "table": "doctor", "data": {{ "doctor_id": ..., "name": ..., "specialization": ..., "schedule": ..., "contact": ... }} }}
-- Update: {{ "operation": "update", "table": "doctor",  "data": {{ "doctor_id": ..., {"field"}: {"value"}... }} }}
-- View:   {{ "operation": "view", "table": "doctor","data": {{"id": ... }} }}
-
-For table: appointment
-- Insert: {{ "operation": "insert", "table": "appointment", "data": {{ "appointment_id": ..., "appointment_date": ..., "appointment_time": ..., "patient_id": ..., "doctor_id": ... }} }}
-- Update: {{ "operation": "update", "table": "appointment", "data": {{ "appointment_id": ..., {"field"}: {"value"}... }} }}
-- View:   {{ "operation": "view", "table": "appointment","data": {{"id": ... }} }}
-
-For table: bill
-- Insert: {{ "operation": "insert", "table": "bill", "data": {{ "bill_id": ..., "amount": ..., "payment_method": ..., "payment_status": ..., "billing_date": ..., "patient_id": ..., "appointment_id": ... }} }}
-- Update: {{ "operation": "update", "table": "bill", "data": {{ "bill_id": ..., {"field"}: {"value"}... }} }}
-- View:   {{ "operation": "view", "table": "bill","data":{{"id": ... }} }}
-
-Return the output strictly in the above JSON format.
-
-User input: {user_text}
-"""
-
-
-def save_response_json(response_text):
-    match = re.search(r"\{[\s\S]*\}", response_text)
-    if match:
-        try:
-            data = json.loads(match.group())
-            with open("output.json", "w") as file:
-                json.dump(data, file, indent=4)
-            print("\nParsed and saved JSON to 'output.json'")
-            print(data)
-            
-        except json.JSONDecodeError as e:
-            print("JSON parsing error:", e)
-    else:
-        print("No valid JSON found in response.")
+def save_response_json(intent, path=OUTPUT_JSON_PATH):
+    """Debug sink: write the extracted intent to disk (enabled by DEBUG_INTENT_PATH)."""
+    try:
+        with _debug_sink_lock, open(path, "w") as file:
+            json.dump(intent.to_dict(), file, indent=4)
+    except OSError as e:
+        logging.warning(f"Could not write intent debug file '{path}': {e}")
 
 
 if __name__ == "__main__":
-    response = configure_and_generate("Add a doctor with ID D201, name Dr. Smith, specialization is Cardiology, works on weekdays from 10 AM to 5 PM, and contact number is 9123456789.")
-    print(response.text)
-    table, operation1, datas = dict.sql_values()
-    dict.operations(operation1, datas)
+    intent = configure_and_generate("Add a doctor with ID D201, name Dr. Smith, specialization is Cardiology, works on weekdays from 10 AM to 5 PM, and contact number is 9123456789.")
+    print(intent)
+    if intent:
+        print(dict.operations(intent.table, intent.operation, intent.data))
 
 
@@ -0,0 +1,153 @@
+# llm_backend.py - Pluggable model backend for llm1
+#
+#   LLM_BACKEND=gemini  (default) google.generativeai.GenerativeModel
+#   LLM_BACKEND=fake    in-process stand-in, no network or API key needed
+#
+# Both backends expose what llm1 uses: generate_content(prompt, stream=False)
+# and generate_content_async(prompt), returning objects with .text, .parts
+# and .usage_metadata. The fake answers the hospital extraction prompts
+# (single and batched) with schema-correct JSON, returns the text of polish
+# requests unchanged and echoes anything else, after a delay that models a
+# real endpoint:
+#
+#   FAKE_LLM_LATENCY_MS      fixed time to first token (default 300)
+#   FAKE_LLM_TOKENS_PER_S    output rate; adds tokens / rate seconds (default 100, 0 = instant)
+#   FAKE_LLM_FAILURE_RATE    fraction of calls that raise FakeLLMError (default 0)
+#   FAKE_LLM_SEED            seed for failure injection, for reproducible runs
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini")
+FAKE_LLM_LATENCY_MS = float(os.environ.get("FAKE_LLM_LATENCY_MS", 300))
+FAKE_LLM_TOKENS_PER_S = float(os.environ.get("FAKE_LLM_TOKENS_PER_S", 100))
+FAKE_LLM_FAILURE_RATE = float(os.environ.get("FAKE_LLM_FAILURE_RATE", 0))
+FAKE_LLM_SEED = os.environ.get("FAKE_LLM_SEED")
+
+
+def create_model(model_name):
+    """Return the model object llm1 should call, according to LLM_BACKEND."""
+    if LLM_BACKEND == "gemini":
+        import google.generativeai as genai
+        return genai.GenerativeModel(model_name)
+    if LLM_BACKEND == "fake":
+        return FakeModel(model_name)
+    raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}' (expected 'gemini' or 'fake')")
+
+
+# --- Fake Backend ---
+
+class FakeLLMError(Exception):
+    """Injected failure (FAKE_LLM_FAILURE_RATE)."""
+
+
+@dataclass
+class FakeUsage:
+    prompt_token_count: int
+    candidates_token_count: int
+
+
+@dataclass
+class FakePart:
+    text: str
+
+
+@dataclass
+class FakeResponse:
+    text: str
+    usage_metadata: FakeUsage
+    parts: list = field(default_factory=list)
+
+
+def _tokens(text):
+    # Roughly what Gemini reports for English text.
+    return max(1, len(text) // 4)
+
+
+_TABLE_WORDS = {"patient": "patient", "doctor": "doctor", "appointment": "appointment",
+                "bill": "bill", "billing": "bill", "invoice": "bill"}
+_OPERATION_WORDS = (("update", ("update", "change", "modify", "edit", "set")),
+                    ("insert", ("add", "insert", "create", "register", "schedule", "book", "new")),
+                    ("view", ()))
+
+
+def fake_intent(user_text):
+    """Schema-correct extraction JSON for one message."""
+    import fast_intent
+    intent = fast_intent.parse(user_text)
+    if intent is not None:
+        return intent.to_dict()
+    words = re.findall(r"[a-z]+", user_text.lower())
+    table = next((_TABLE_WORDS[w.rstrip("s")] for w in words if w.rstrip("s") in _TABLE_WORDS), "patient")
+    operation = next(op for op, verbs in _OPERATION_WORDS if not verbs or any(v in words for v in verbs))
+    numbers = re.findall(r"\d+", user_text)
+    data = {"id": int(numbers[0])} if numbers else {}
+    return {"operation": operation, "table": table, "data": data}
+
+
+def fake_reply(prompt):
+    """What the stand-in answers for a prompt built by llm1."""
+    batch = re.search(r"User inputs:\n(.*)\Z", prompt, re.S)
+    if batch:
+        lines = [re.sub(r"^\d+\.\s*", "", line) for line in batch.group(1).strip().splitlines()]
+        return json.dumps([fake_intent(line) for line in lines])
+    single = re.search(r"User input: (.*?)\s*\Z", prompt, re.S)
+    if single:
+        return json.dumps(fake_intent(single.group(1)))
+    polish = re.search(r"Text to reword:\n(.*)\Z", prompt, re.S)
+    if polish:
+        return polish.group(1).strip()  # Response polish: hand the template text back
+    return prompt.strip()  # Anything else is echoed
+
+
+class FakeModel:
+    """Drop-in for GenerativeModel with configurable latency, token rate and failures."""
+
+    def __init__(self, model_name="fake", latency_ms=None, tokens_per_s=None, failure_rate=None, seed=None):
+        self.model_name = model_name
+        self.latency_s = (FAKE_LLM_LATENCY_MS if latency_ms is None else latency_ms) / 1000.0
+        self.tokens_per_s = FAKE_LLM_TOKENS_PER_S if tokens_per_s is None else tokens_per_s
+        self.failure_rate = FAKE_LLM_FAILURE_RATE if failure_rate is None else failure_rate
+        seed = FAKE_LLM_SEED if seed is None else seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _prepare(self, prompt):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise FakeLLMError("Injected fake LLM failure")
+        text = fake_reply(str(prompt))
+        output_tokens = _tokens(text)
+        duration = self.latency_s + (output_tokens / self.tokens_per_s if self.tokens_per_s else 0)
+        usage = FakeUsage(prompt_token_count=_tokens(str(prompt)), candidates_token_count=output_tokens)
+        return text, usage, duration
+
+    def generate_content(self, prompt, stream=False):
+        text, usage, duration = self._prepare(prompt)
+        if stream:
+            return self._stream(text, usage)
+        time.sleep(duration)
+        return FakeResponse(text=text, usage_metadata=usage, parts=[FakePart(text)])
+
+    async def generate_content_async(self, prompt):
+        text, usage, duration = self._prepare(prompt)
+        await asyncio.sleep(duration)
+        return FakeResponse(text=text, usage_metadata=usage, parts=[FakePart(text)])
+
+    def _stream(self, text, usage):
+        time.sleep(self.latency_s)
+        words = re.findall(r"\S+\s*", text) or [text]
+        for i in range(0, len(words), 8):
+            chunk = "".join(words[i:i + 8])
+            if self.tokens_per_s:
+                time.sleep(_tokens(chunk) / self.tokens_per_s)
+            yield FakeResponse(text=chunk, usage_metadata=usage, parts=[FakePart(chunk)])
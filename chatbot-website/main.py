@@ -2,6 +2,8 @@
 import llm1
 import input as cli_input # Renamed to avoid conflict with built-in input
 import dict as dict_logic # Renamed to avoid conflict
+import responses
+from intent import IntentPlan
 
 # This main.py is a Command Line Interface (CLI) test script.
 # It does not run the Flask web application.
@@ -40,31 +42,30 @@ def run_cli_test():
         return
 
     print("\nStep 1: LLM extracting operation/data...")
-    llm_extraction_success = llm1.configure_and_generate(user_text_query)
+    intent = llm1.configure_and_generate(user_text_query)
 
-    if not llm_extraction_success:
-        print(f"LLM data extraction failed. Check '{llm1.OUTPUT_JSON_PATH}' for error details from LLM.")
+    if intent is None:
+        print("LLM data extraction failed: the model reply did not contain a valid intent.")
         # Try to get a user-friendly message from the LLM if possible for this failure
         error_explanation = llm1.generate_output_text(f"LLM failed to understand the query structure. Raw query: {user_text_query}")
         print(f"Bot says: {error_explanation}")
         return
     print("LLM extraction seems successful.")
 
-    # 2. Read extracted operation and data
-    print("\nStep 2: Reading extracted data...")
-    table, operation, datas = dict_logic.sql_values()
-
-    if operation is None or datas is None:
-        print(f"Failed to read valid operation/data from '{llm1.OUTPUT_JSON_PATH}'.")
-        error_content = "Could not determine the action or data from the LLM's output."
-        if llm1.OUTPUT_JSON_PATH:
-            try:
-                with open(llm1.OUTPUT_JSON_PATH, 'r') as f_err:
-                    error_content += f" Contents of {llm1.OUTPUT_JSON_PATH}: {f_err.read()}"
-            except Exception:
-                pass # Ignore if reading error file also fails
-        print(f"Bot says: {llm1.generate_output_text(error_content)}")
+    if isinstance(intent, IntentPlan):
+        # Several operations in one message run as one transaction (admin only in the CLI).
+        print(f"\nExtracted {len(intent.steps)} operations: {intent.to_dict()}")
+        if user_role != 'admin':
+            print(f"Access Denied (CLI): Role '{user_role}' cannot run multi-operation requests.")
+            return
+        db_result = dict_logic.operations_plan(intent.steps)
+        print(f"DB operation result: {db_result}")
+        print(f"Bot's final response: {llm1.polish_response(responses.render_plan(db_result))}")
         return
+
+    # 2. Unpack the extracted operation and data
+    print("\nStep 2: Reading extracted data...")
+    table, operation, datas = intent.table, intent.operation, intent.data
     print(f"Operation: '{operation}', Data: {datas}")
 
     # 3. CLI Role-Based Access Control (simplified for CLI)
@@ -103,9 +104,9 @@ def run_cli_test():
     db_result_string = dict_logic.operations(table,operation, datas)
     print(f"DB operation result: {db_result_string}")
 
-    # 5. LLM generates final friendly response
-    print("\nStep 5: LLM generating final response...")
-    final_response = llm1.generate_output_text(db_result_string)
+    # 5. Template renders the final response (LLM polish only if LLM_POLISH is set)
+    print("\nStep 5: Rendering final response...")
+    final_response = llm1.polish_response(responses.render(table, operation, db_result_string, datas))
     print(f"\n---------------------------------")
     print(f"Bot's final response: {final_response}")
     print(f"---------------------------------")
@@ -0,0 +1,243 @@
+# metrics.py - Stage timings, counters and the Prometheus /metrics page
+#
+#   with metrics.span("llm_extract"):
+#       response = model.generate_content(prompt)
+#
+# Every span is recorded in the stage_latency_seconds histogram (labelled by
+# stage), and, when a request trace is open (see trace()), appended to that
+# request's list of timings so app.py can log one structured line per chat.
+# Modules that already keep their own counters (connection pool, intent
+# cache, fast path, hashing pool) are exported through collectors, so they
+# do not need to import this module.
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (25, 50, 100, 200, 300, 400, 600, 800, 1200, 1600, 3200, 6400)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally split by labels.
+
+    Quantiles (p50/p95/p99) are estimated from the buckets by linear
+    interpolation, the same way Prometheus' histogram_quantile() does.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def quantile(self, q, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            counts = list(series[0]) if series else None
+        return self._quantile(q, counts) if counts else None
+
+    def _quantile(self, q, counts):
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Above the last bucket: best we can say
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self):
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        quantile_lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+            for q in QUANTILES:
+                estimate = self._quantile(q, counts)
+                quantile_lines.append(f"{self.name}_quantile{_label_text(self.labelnames, key, [('quantile', q)])} {estimate}")
+        if quantile_lines:
+            lines += [f"# HELP {self.name}_quantile Estimated quantiles of {self.name}",
+                      f"# TYPE {self.name}_quantile gauge"] + quantile_lines
+        return lines
+
+
+# --- Registry ---
+
+STAGE_LATENCY = Histogram("stage_latency_seconds", "Time spent in each chat pipeline stage", ("stage",))
+LLM_TOKENS = Counter("llm_tokens_total", "Gemini tokens used", ("purpose", "kind"))
+LLM_CALLS = Counter("llm_calls_total", "Gemini calls made", ("purpose",))
+LLM_CALL_TOKENS = Histogram("llm_call_tokens", "Gemini tokens per call", ("purpose", "kind"), buckets=TOKEN_BUCKETS)
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Answers given without the LLM because it was unavailable", ("purpose",))
+CHAT_REQUESTS = Counter("chat_requests_total", "Chat requests by outcome", ("outcome",))
+
+_metrics = [STAGE_LATENCY, LLM_TOKENS, LLM_CALLS, LLM_CALL_TOKENS, LLM_FALLBACKS, CHAT_REQUESTS]
+_collectors = []
+_collectors_lock = threading.Lock()
+
+
+def register_collector(prefix, stats_fn, counters=()):
+    """
+    Export a stats() dict as gauges named <prefix>_<key>; keys listed in
+    `counters` are exported as <prefix>_<key>_total counters instead.
+    Non-numeric values are skipped.
+    """
+    with _collectors_lock:
+        _collectors.append((prefix, stats_fn, frozenset(counters)))
+
+
+def _render_collector(prefix, stats_fn, counters):
+    try:
+        stats = stats_fn()
+    except Exception as e:
+        return [f"# {prefix} collector failed: {e}"]
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            name = f"{prefix}_{key}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        else:
+            name = f"{prefix}_{key}"
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return lines
+
+
+def render():
+    """Everything in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    with _collectors_lock:
+        collectors = list(_collectors)
+    for collector in collectors:
+        lines += _render_collector(*collector)
+    return "\n".join(lines) + "\n"
+
+
+# --- Spans ---
+
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+@contextmanager
+def trace():
+    """
+    Collect the spans of one request; yields the list of {"stage", "ms"} dicts.
+    Each LLM call also adds a {"llm", "prompt_tokens", "response_tokens"} entry.
+    """
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        try:
+            _trace.reset(token)
+        except ValueError:
+            # A generator resumed from another context (e.g. a streamed response).
+            _trace.set(None)
+
+
+@contextmanager
+def span(stage, **attrs):
+    """Time a block as `stage`; extra attributes are kept on the trace entry."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start, **attrs)
+
+
+def record_span(stage, seconds, **attrs):
+    """Record a stage timing measured by the caller."""
+    STAGE_LATENCY.observe(seconds, stage=stage)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append(dict(attrs, stage=stage, ms=round(seconds * 1000, 2)))
+
+
+def record_llm_usage(response, purpose):
+    """
+    Count one Gemini call and the tokens it reports in usage_metadata, if any,
+    both in the running totals and per call (llm_call_tokens, and the request
+    trace when one is open).
+    """
+    LLM_CALLS.inc(purpose=purpose)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    counts = {}
+    for kind, attr in (("prompt", "prompt_token_count"), ("response", "candidates_token_count")):
+        count = getattr(usage, attr, None)
+        if isinstance(count, int):
+            LLM_TOKENS.inc(count, purpose=purpose, kind=kind)
+            LLM_CALL_TOKENS.observe(count, purpose=purpose, kind=kind)
+            counts[f"{kind}_tokens"] = count
+    spans = _trace.get()
+    if spans is not None and counts:
+        spans.append(dict(counts, llm=purpose))
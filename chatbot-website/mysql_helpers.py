@@ -1,11 +1,34 @@
 # mysql_helpers.py
 import mysql.connector
 import os
+import sqlite3
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv() # Load variables from .env file
 
+# --- Pool Configuration (override through the environment / .env) ---
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))                      # Max open connections
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))    # Seconds to wait for a free connection
+POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", 300))          # Seconds before an idle connection is evicted
+
+# --- Backend ---
+# DB_BACKEND=sqlite runs Hospital against a local SQLite file with the same
+# schema (see sqlite_backend.py), for offline development and benchmarks.
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("DB_SQLITE_PATH", "hospital.sqlite3")
+
+# Errors a Hospital query can raise, whichever backend is active.
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+
+
 def connect_db():
+    if DB_BACKEND == "sqlite":
+        import sqlite_backend
+        return sqlite_backend.connect(SQLITE_PATH)
     try:
         return mysql.connector.connect(
             host=os.environ.get("DB_HOST", "localhost"),
@@ -19,5 +42,280 @@ def connect_db():
         # or handle it more gracefully (e.g., return None and check in caller)
         raise # Re-raise the error to be caught by the calling function
 
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+
+    Connections are opened lazily up to `size`. On checkout an idle connection
+    is health-checked (and replaced if it went away); connections idle for
+    longer than `max_idle` seconds are closed instead of being handed out.
+    Callers that find the pool exhausted wait up to `timeout` seconds.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_CHECKOUT_TIMEOUT,
+                 max_idle=POOL_MAX_IDLE, connect=connect_db):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._connect = connect
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._open = 0        # Connections currently open (idle + checked out)
+        self._cond = threading.Condition()
+        self._stats = {
+            "connects": 0,        # Physical connections opened
+            "checkouts": 0,
+            "reused": 0,          # Checkouts served by an idle connection
+            "health_failures": 0, # Idle connections found dead on checkout
+            "idle_evictions": 0,
+            "waits": 0,           # Checkouts that had to wait for a free connection
+            "exhausted": 0,       # Checkouts that timed out waiting
+            "discarded": 0,       # Connections dropped on release (broken or rejected)
+        }
+
+    # --- Checkout / Release ---
+
+    def acquire(self, timeout=None):
+        """Check out a healthy connection, opening a new one if there is room."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            conn = None
+            with self._cond:
+                self._evict_idle_locked()
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["exhausted"] += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available within {timeout}s (pool size {self.size})")
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                    self._evict_idle_locked()
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                else:
+                    self._open += 1  # Reserve the slot before connecting outside the lock
+
+            if conn is None:
+                break
+            # Health check happens outside the lock since it round-trips to the server.
+            if self._is_healthy(conn):
+                with self._cond:
+                    self._stats["checkouts"] += 1
+                    self._stats["reused"] += 1
+                return conn
+            with self._cond:
+                self._stats["health_failures"] += 1
+                self._close_locked(conn)
+                self._cond.notify()
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["connects"] += 1
+            self._stats["checkouts"] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is no longer usable."""
+        if conn is None:
+            return
+        if not discard:
+            try:
+                # End any open transaction so the next borrower does not
+                # inherit uncommitted writes or a stale read snapshot.
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard:
+                self._stats["discarded"] += 1
+                self._close_locked(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # --- Housekeeping ---
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones are closed on release)."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_locked(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Snapshot of the pool counters plus current occupancy."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            })
+        return snapshot
+
+    def _evict_idle_locked(self):
+        # Oldest connections sit on the left of the deque.
+        cutoff = time.monotonic() - self.max_idle
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            self._stats["idle_evictions"] += 1
+            self._close_locked(conn)
+
+    def _close_locked(self, conn):
+        self._open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+
+# --- Shared Pool ---
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+# --- Transactions ---
+# Hospital methods each borrow a connection and commit on their own. Inside a
+# transaction() block they all run on the block's connection instead, their
+# commit() calls are deferred, and the block commits (or rolls back) once.
+_local = threading.local()
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+        self.view = _TransactionConnection(conn)
+        self.after_commit = []
+
+
+class _TransactionConnection:
+    """The transaction's connection as the code inside the block sees it: commit() is a no-op."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        pass  # The transaction() block commits once, at the end
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def in_transaction():
+    """True inside a transaction() block on this thread."""
+    return getattr(_local, "transaction", None) is not None
+
+
+def after_commit(callback):
+    """Run callback once the current transaction commits (dropped on rollback); now if there is none."""
+    tx = getattr(_local, "transaction", None)
+    if tx is None:
+        callback()
+    else:
+        tx.after_commit.append(callback)
+
+
+@contextmanager
+def transaction():
+    """
+    Run every pooled_cursor() opened on this thread inside the block on one
+    pooled connection, as a single transaction. It commits when the block
+    exits normally and rolls back if it raises. A nested block joins the
+    outer transaction.
+
+    Usage:
+        with transaction():
+            hospital.insert_patient(...)
+            hospital.create_appointment(...)
+    """
+    if in_transaction():
+        yield _local.transaction.view
+        return
+    with get_pool().connection() as conn:
+        tx = _local.transaction = _Transaction(conn)
+        try:
+            yield tx.view
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            _local.transaction = None
+    for callback in tx.after_commit:
+        callback()
+
+
+@contextmanager
+def pooled_cursor(**cursor_kwargs):
+    """
+    Borrow a pooled connection and a cursor on it.
+
+    Usage:
+        with pooled_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(...)
+    The cursor is closed and the connection returned to the pool on exit.
+    Inside a transaction() block the cursor is opened on the transaction's
+    connection, and conn.commit() waits for the end of the block.
+    """
+    tx = getattr(_local, "transaction", None)
+    if tx is not None:
+        cursor = tx.conn.cursor(**cursor_kwargs)
+        try:
+            yield tx.view, cursor
+        finally:
+            cursor.close()
+        return
+    with get_pool().connection() as conn:
+        cursor = conn.cursor(**cursor_kwargs)
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+
 # Remove the connect_db() call from the global scope of this file
-# connect_db()
\ No newline at end of file
+# connect_db()
@@ -1,326 +1,625 @@
 # old_mysql.py (Updated for HospitalDB schema)
+import os
+from itertools import islice
 import mysql_helpers as db_connect
+from hospital_result import HospitalResult
+import view_cache
+from view_cache import cached, invalidates
+
+# --- Bulk Insert Configuration ---
+BULK_CHUNK_SIZE = int(os.environ.get("DB_BULK_CHUNK_SIZE", 500))   # Rows per multi-row INSERT
+BULK_MAX_REPORTED_ERRORS = 1000                                    # Per-row errors kept in the result
+
+# --- Listing Configuration ---
+PAGE_SIZE = int(os.environ.get("DB_PAGE_SIZE", 20))                # Rows per listing page
+MAX_PAGE_SIZE = int(os.environ.get("DB_MAX_PAGE_SIZE", 200))       # Cap on a caller-supplied limit
+STREAM_BATCH_SIZE = int(os.environ.get("DB_STREAM_BATCH_SIZE", 500))  # Rows fetched per round trip when streaming
+
+_REQUIRED = object()
+
+# Record field -> column (and default) for each bulk insert; the fields match
+# the arguments of the single-row method for the same table.
+BULK_TABLES = {
+    "patients": ("Patients", (("name", "PatientName", _REQUIRED), ("age", "Age", _REQUIRED),
+                              ("gender", "Gender", None), ("contact", "Contact", None),
+                              ("address", "Address", None))),
+    "doctors": ("Doctors", (("doctor_id", "DoctorID", _REQUIRED), ("name", "DoctorName", _REQUIRED),
+                            ("specialization", "Specialization", _REQUIRED),
+                            ("contact", "Contact", _REQUIRED), ("schedule", "Scheduled", None))),
+    "appointments": ("Appointments", (("patient_id", "PatientID", _REQUIRED), ("doctor_id", "DoctorID", _REQUIRED),
+                                      ("appointment_date", "AppointmentDate", _REQUIRED),
+                                      ("appointment_time", "AppointmentTime", _REQUIRED),
+                                      ("status", "AppointmentStatus", "Scheduled"))),
+    "bills": ("Billing", (("patient_id", "PatientID", _REQUIRED), ("appointment_id", "AppointmentID", _REQUIRED),
+                          ("amount", "Amount", _REQUIRED), ("payment_method", "PaymentMethod", _REQUIRED),
+                          ("payment_status", "PaymentStatus", "Pending"))),
+}
+
+
+def _bulk_row(fields, record):
+    """Turn one record (dict or sequence in argument order) into a row tuple, or raise ValueError."""
+    if not isinstance(record, dict):
+        record = dict(zip((name for name, _, _ in fields), record))
+    row = []
+    for name, _, default in fields:
+        value = record.get(name)
+        if value is None or value == "":
+            if default is _REQUIRED:
+                raise ValueError(f"Missing required field '{name}'")
+            value = default
+        row.append(value)
+    return tuple(row)
+
+
+# --- Listing Queries ---
+
+def _page_size(limit):
+    if not limit or limit < 1:
+        return PAGE_SIZE
+    return min(int(limit), MAX_PAGE_SIZE)
+
+
+def _appointments_query(patient_id, doctor_id, appointment_id, after):
+    """SELECT for get_appointments / iter_appointments, ordered by AppointmentID."""
+    query = """
+        SELECT a.AppointmentID, a.AppointmentDate, a.AppointmentTime, a.AppointmentStatus,
+               a.PatientID, a.DoctorID, p.PatientName, d.DoctorName, d.Specialization
+        FROM Appointments a
+        JOIN Patients p ON a.PatientID = p.PatientID
+        JOIN Doctors d ON a.DoctorID = d.DoctorID
+    """
+    conditions = []
+    params = []
+    if patient_id:
+        conditions.append("a.PatientID = %s")
+        params.append(patient_id)
+    if doctor_id:
+        conditions.append("a.DoctorID = %s")
+        params.append(doctor_id)
+    if appointment_id:
+        conditions.append("a.AppointmentID = %s")
+        params.append(appointment_id)
+    if after is not None:
+        conditions.append("a.AppointmentID > %s")
+        params.append(after)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY a.AppointmentID", params
+
+
+def _bills_query(patient_id, after):
+    """SELECT for get_patient_bills / iter_patient_bills, newest first."""
+    query = """
+        SELECT b.BillingID, b.Amount, b.PaymentMethod, b.PaymentStatus, b.BillingDate,
+               b.AppointmentID, a.AppointmentDate, a.DoctorID, d.DoctorName AS DoctorName
+        FROM Billing b
+        LEFT JOIN Appointments a ON b.AppointmentID = a.AppointmentID
+        LEFT JOIN Doctors d ON a.DoctorID = d.DoctorID
+        WHERE b.PatientID = %s
+    """
+    params = [patient_id]
+    if after is not None:
+        # BillingDate is nullable. NULL sorts below every date on both backends,
+        # so undated bills come last and a NULL cursor pages through only them.
+        billing_date, billing_id = after
+        if billing_date is None:
+            query += " AND b.BillingDate IS NULL AND b.BillingID < %s"
+            params += [billing_id]
+        else:
+            query += (" AND (b.BillingDate < %s OR (b.BillingDate = %s AND b.BillingID < %s)"
+                      " OR b.BillingDate IS NULL)")
+            params += [billing_date, billing_date, billing_id]
+    return query + " ORDER BY b.BillingDate DESC, b.BillingID DESC", params
+
+
+def _stream_rows(cursor, batch_size):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+# --- View Cache Tags ---
+# What each cached view depends on and what each write changes (see view_cache).
+
+def _appointment_tags(result, patient_id=None, doctor_id=None, appointment_id=None, after=None, limit=None):
+    tags = []
+    if patient_id:
+        tags.append(("patient_appointments", patient_id))
+    if doctor_id:
+        tags.append(("doctor_appointments", doctor_id))
+    if not (patient_id or doctor_id) and not (appointment_id and result.rows):
+        # Unfiltered lists and empty by-id lookups can be changed by any new appointment.
+        tags.append(("appointments", "all"))
+    for row in result.rows:
+        tags += [("appointment", row["AppointmentID"]), ("patient", row["PatientID"]), ("doctor", row["DoctorID"])]
+    return tags
+
+
+def _bill_tags(result, patient_id, after=None, limit=None):
+    tags = [("patient_bills", patient_id)]
+    for row in result.rows:
+        tags.append(("bill", row["BillingID"]))
+        if row.get("AppointmentID") is not None:
+            tags.append(("appointment", row["AppointmentID"]))
+        if row.get("DoctorID") is not None:
+            tags.append(("doctor", row["DoctorID"]))
+    return tags
+
+
+def _new_appointment_tags(result, patient_id, doctor_id, **_):
+    return [("patient_appointments", patient_id), ("doctor_appointments", doctor_id), ("appointments", "all")]
+
+
+def _bulk_tags(kind, row):
+    """View cache tags a bulk-inserted row (in BULK_TABLES field order) invalidates."""
+    if kind == "appointments":
+        return _new_appointment_tags(None, row[0], row[1])
+    if kind == "bills":
+        return [("patient_bills", row[0])]
+    return []
+
 
 class Hospital:
     def insert_patient(self,  name, age, gender=None, contact=None, address=None):
         """Insert a new patient record"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
-            query = """
-                INSERT INTO Patients 
-                (PatientName, Age, Gender, Contact, Address) 
-                VALUES ( %s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, ( name, age, gender, contact, address))
-            conn.commit()
-            patient_id = cursor.lastrowid
-            return {"status": "success", "patient_id": patient_id}
+            with db_connect.pooled_cursor() as (conn, cursor):
+                query = """
+                    INSERT INTO Patients 
+                    (PatientName, Age, Gender, Contact, Address) 
+                    VALUES ( %s, %s, %s, %s, %s)
+                """
+                cursor.execute(query, ( name, age, gender, contact, address))
+                conn.commit()
+                patient_id = cursor.lastrowid
+                return HospitalResult.success(patient_id=patient_id)
         except Exception as e:
             print(f"Database Error (insert_patient): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
 
 
+    @invalidates(lambda result, PatientID, **_: [("patient", PatientID)])
     def update_patient(self, PatientID, name=None, age=None, gender=None, 
                       contact=None, address=None, email=None):
         """Update patient information"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
+            with db_connect.pooled_cursor() as (conn, cursor):
             
-            updates = []
-            params = []
+                updates = []
+                params = []
             
-            if name is not None:
-                updates.append("Name = %s")
-                params.append(name)
-            if age is not None:
-                updates.append("Age = %s")
-                params.append(age)
-            if gender is not None:
-                updates.append("Gender = %s")
-                params.append(gender)
-            if contact is not None:
-                updates.append("Contact = %s")
-                params.append(contact)
-            if address is not None:
-                updates.append("Address = %s")
-                params.append(address)
-            if email is not None:
-                updates.append("Email = %s")
-                params.append(email)
+                if name is not None:
+                    updates.append("PatientName = %s")
+                    params.append(name)
+                if age is not None:
+                    updates.append("Age = %s")
+                    params.append(age)
+                if gender is not None:
+                    updates.append("Gender = %s")
+                    params.append(gender)
+                if contact is not None:
+                    updates.append("Contact = %s")
+                    params.append(contact)
+                if address is not None:
+                    updates.append("Address = %s")
+                    params.append(address)
+                if email is not None:
+                    updates.append("Email = %s")
+                    params.append(email)
                 
-            if not updates:
-                return {"status": "error", "message": "No fields to update"}
+                if not updates:
+                    return HospitalResult.error("No fields to update")
                 
-            params.append(PatientID)
-            query = f"UPDATE Patients SET {', '.join(updates)} WHERE PatientID = %s"
-            cursor.execute(query, tuple(params))
-            conn.commit()
+                params.append(PatientID)
+                query = f"UPDATE Patients SET {', '.join(updates)} WHERE PatientID = %s"
+                cursor.execute(query, tuple(params))
+                conn.commit()
             
-            if cursor.rowcount > 0:
-                return {"status": "success", "message": f"Updated patient {PatientID}"}
-            return {"status": "error", "message": "Patient not found"}
+                if cursor.rowcount > 0:
+                    return HospitalResult.success(message=f"Updated patient {PatientID}")
+                return HospitalResult.error("Patient not found")
         except Exception as e:
             print(f"Database Error (update_patient): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
 
+    @cached("patient", tags=lambda result, patient_id: [("patient", patient_id)])
     def view_patient(self, patient_id):
         """Get patient details by ID"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor(dictionary=True)
-            query = """
-                SELECT PatientID, PatientName, Age, Gender, Contact, Address
-                FROM Patients WHERE PatientID = %s
-            """
-            cursor.execute(query, (patient_id,))
-            patient = cursor.fetchone()
+            with db_connect.pooled_cursor(dictionary=True) as (conn, cursor):
+                query = """
+                    SELECT PatientID, PatientName, Age, Gender, Contact, Address
+                    FROM Patients WHERE PatientID = %s
+                """
+                cursor.execute(query, (patient_id,))
+                patient = cursor.fetchone()
             
-            if patient:
-                return {"status": "success", "data": patient}
-            return {"status": "error", "message": "Patient not found"}
+                if patient:
+                    return HospitalResult.success(data=patient)
+                return HospitalResult.error("Patient not found")
         except Exception as e:
             print(f"Database Error (view_patient): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
 
+    @invalidates(_new_appointment_tags)
     def create_appointment(self, patient_id, doctor_id, appointment_date, 
                          appointment_time, status="Scheduled"):
         """Create a new appointment"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
-            query = """
-                INSERT INTO Appointments 
-                ( PatientID, DoctorID, AppointmentDate, AppointmentTime, AppointmentStatus) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (patient_id, doctor_id, appointment_date, 
-                                appointment_time, status))
-            conn.commit()
-            appointment_id = cursor.lastrowid
-            return {"status": "success", "appointment_id": appointment_id}
+            with db_connect.pooled_cursor() as (conn, cursor):
+                query = """
+                    INSERT INTO Appointments 
+                    ( PatientID, DoctorID, AppointmentDate, AppointmentTime, AppointmentStatus) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                cursor.execute(query, (patient_id, doctor_id, appointment_date, 
+                                    appointment_time, status))
+                conn.commit()
+                appointment_id = cursor.lastrowid
+                return HospitalResult.success(appointment_id=appointment_id)
         except Exception as e:
             print(f"Database Error (create_appointment): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
 
+    @invalidates(lambda result, appointment_id, **_: [("appointment", appointment_id)])
     def update_appointment(self, appointment_id, status=None, appointment_date=None,appointment_time=None):
         """Update appointment details"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
+            with db_connect.pooled_cursor() as (conn, cursor):
             
-            updates = []
-            params = []
+                updates = []
+                params = []
             
-            if status is not None:
-                updates.append("AppointmentStatus = %s")
-                params.append(status)
-            if appointment_date is not None:
-                updates.append("AppointmentDate = %s")
-                params.append(appointment_date)
-            if appointment_time is not None:
-                updates.append("AppointmentTime = %s")
-                params.append(appointment_time)
+                if status is not None:
+                    updates.append("AppointmentStatus = %s")
+                    params.append(status)
+                if appointment_date is not None:
+                    updates.append("AppointmentDate = %s")
+                    params.append(appointment_date)
+                if appointment_time is not None:
+                    updates.append("AppointmentTime = %s")
+                    params.append(appointment_time)
                 
-            if not updates:
-                return {"status": "error", "message": "No fields to update"}
+                if not updates:
+                    return HospitalResult.error("No fields to update")
                 
-            params.append(appointment_id)
-            query = f"UPDATE Appointments SET {', '.join(updates)} WHERE AppointmentID = %s"
-            cursor.execute(query, tuple(params))
-            conn.commit()
+                params.append(appointment_id)
+                query = f"UPDATE Appointments SET {', '.join(updates)} WHERE AppointmentID = %s"
+                cursor.execute(query, tuple(params))
+                conn.commit()
             
-            if cursor.rowcount > 0:
-                return {"status": "success", "message": f"Updated appointment {appointment_id}"}
-            return {"status": "error", "message": "Appointment not found"}
+                if cursor.rowcount > 0:
+                    return HospitalResult.success(message=f"Updated appointment {appointment_id}")
+                return HospitalResult.error("Appointment not found")
         except Exception as e:
             print(f"Database Error (update_appointment): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
-
-    def get_appointments(self, patient_id=None, doctor_id=None, appointment_id=None):
-        """Get appointments with optional filters"""
-        conn = None
+            return HospitalResult.error(e)
+
+    @cached("appointments", tags=_appointment_tags)
+    def get_appointments(self, patient_id=None, doctor_id=None, appointment_id=None, after=None, limit=None):
+        """
+        Get one page of appointments with optional filters, oldest first.
+
+        Keyset pagination: pass the previous page's next_cursor as `after`.
+        next_cursor is None on the last page.
+        """
+        limit = _page_size(limit)
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor(dictionary=True)
-            
-            query = """
-                SELECT a.AppointmentID, a.AppointmentDate, a.AppointmentTime, a.AppointmentStatus,
-                       p.PatientName, d.DoctorName, d.Specialization
-                FROM Appointments a
-                JOIN Patients p ON a.PatientID = p.PatientID
-                JOIN Doctors d ON a.DoctorID = d.DoctorID
-            """
-            conditions = []
-            params = []
-            
-            if patient_id:
-                conditions.append("a.PatientID = %s")
-                params.append(patient_id)
-            if doctor_id:
-                conditions.append("a.DoctorID = %s")
-                params.append(doctor_id)
-            if appointment_id:
-                conditions.append("a.AppointmentID = %s")
-                params.append(appointment_id)
-                
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-                
-            cursor.execute(query, tuple(params))
-            appointments = cursor.fetchall()
-            return {"status": "success", "data": appointments}
+            with db_connect.pooled_cursor(dictionary=True) as (conn, cursor):
+                query, params = _appointments_query(patient_id, doctor_id, appointment_id, after)
+                cursor.execute(query + " LIMIT %s", tuple(params) + (limit + 1,))
+                appointments = cursor.fetchall()
+                next_cursor = None
+                if len(appointments) > limit:
+                    appointments = appointments[:limit]
+                    next_cursor = appointments[-1]["AppointmentID"]
+                return HospitalResult.success(data=appointments, next_cursor=next_cursor)
         except Exception as e:
             print(f"Database Error (get_appointments): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
+
+    def iter_appointments(self, patient_id=None, doctor_id=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Yield every matching appointment row, oldest first, without loading
+        them all: the rows come off an unbuffered (server-side) cursor
+        `batch_size` at a time. Holds a pooled connection until exhausted or closed.
+        """
+        query, params = _appointments_query(patient_id, doctor_id, None, None)
+        with db_connect.pooled_cursor(dictionary=True, buffered=False) as (conn, cursor):
+            cursor.execute(query, tuple(params))
+            yield from _stream_rows(cursor, batch_size)
 
       # DOCTOR OPERATIONS
     def add_doctor(self, doctor_id, name, specialization, contact, schedule=None):
         """Add a new doctor to the system"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
-            query = """
-                INSERT INTO Doctors 
-                (DoctorID, DoctorName, Specialization, Contact, Scheduled) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (doctor_id, name, specialization, contact, schedule))
-            conn.commit()
-            doctor_id = cursor.lastrowid
-            return {"status": "success", "doctor_id": doctor_id}
+            with db_connect.pooled_cursor() as (conn, cursor):
+                query = """
+                    INSERT INTO Doctors 
+                    (DoctorID, DoctorName, Specialization, Contact, Scheduled) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                cursor.execute(query, (doctor_id, name, specialization, contact, schedule))
+                conn.commit()
+                doctor_id = cursor.lastrowid
+                return HospitalResult.success(doctor_id=doctor_id)
         except Exception as e:
             print(f"Database Error (add_doctor): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
 
+    @cached("doctor", tags=lambda result, doctor_id: [("doctor", doctor_id)])
     def get_doctor(self, doctor_id):
         """Get doctor details by ID"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor(dictionary=True)
-            query = """
-                SELECT DoctorID, DoctorName, Specialization, Contact, Scheduled
-                FROM Doctors WHERE DoctorID = %s
-            """
-            cursor.execute(query, (doctor_id,))
-            doctor = cursor.fetchone()
-            if doctor:
-                return {"status": "success", "data": doctor}
-            return {"status": "error", "message": "Doctor not found"}
+            with db_connect.pooled_cursor(dictionary=True) as (conn, cursor):
+                query = """
+                    SELECT DoctorID, DoctorName, Specialization, Contact, Scheduled
+                    FROM Doctors WHERE DoctorID = %s
+                """
+                cursor.execute(query, (doctor_id,))
+                doctor = cursor.fetchone()
+                if doctor:
+                    return HospitalResult.success(data=doctor)
+                return HospitalResult.error("Doctor not found")
         except Exception as e:
             print(f"Database Error (get_doctor): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
+
+    @invalidates(lambda result, doctor_id, **_: [("doctor", doctor_id)])
+    def update_doctor(self, doctor_id, name=None, specialization=None, contact=None, schedule=None):
+        """Update doctor details"""
+        try:
+            with db_connect.pooled_cursor() as (conn, cursor):
+
+                updates = []
+                params = []
+
+                if name is not None:
+                    updates.append("DoctorName = %s")
+                    params.append(name)
+                if specialization is not None:
+                    updates.append("Specialization = %s")
+                    params.append(specialization)
+                if contact is not None:
+                    updates.append("Contact = %s")
+                    params.append(contact)
+                if schedule is not None:
+                    updates.append("Scheduled = %s")
+                    params.append(schedule)
+
+                if not updates:
+                    return HospitalResult.error("No fields to update")
+
+                params.append(doctor_id)
+                query = f"UPDATE Doctors SET {', '.join(updates)} WHERE DoctorID = %s"
+                cursor.execute(query, tuple(params))
+                conn.commit()
+
+                if cursor.rowcount > 0:
+                    return HospitalResult.success(message=f"Updated doctor {doctor_id}")
+                return HospitalResult.error("Doctor not found")
+        except Exception as e:
+            print(f"Database Error (update_doctor): {e}")
+            return HospitalResult.error(e)
 
     # BILLING OPERATIONS
+    @invalidates(lambda result, patient_id, **_: [("patient_bills", patient_id)])
     def create_bill(self, patient_id, appointment_id, amount, 
                    payment_method, payment_status="Pending"):
         """Create a new billing record"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
-            query = """
-                INSERT INTO Billing 
-                (PatientID, AppointmentID, Amount, PaymentMethod, PaymentStatus) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (patient_id, appointment_id, amount, 
-                                payment_method, payment_status))
-            conn.commit()
-            bill_id = cursor.lastrowid
-            return {"status": "success", "bill_id": bill_id}
+            with db_connect.pooled_cursor() as (conn, cursor):
+                query = """
+                    INSERT INTO Billing 
+                    (PatientID, AppointmentID, Amount, PaymentMethod, PaymentStatus) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                cursor.execute(query, (patient_id, appointment_id, amount, 
+                                    payment_method, payment_status))
+                conn.commit()
+                bill_id = cursor.lastrowid
+                return HospitalResult.success(bill_id=bill_id)
         except Exception as e:
             print(f"Database Error (create_bill): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
-
-    def get_patient_bills(self, patient_id):
-        """Get all bills for a specific patient"""
-        conn = None
+            return HospitalResult.error(e)
+
+    @cached("bills", tags=_bill_tags)
+    def get_patient_bills(self, patient_id, after=None, limit=None):
+        """
+        Get one page of a patient's bills, newest first.
+
+        Keyset pagination on (BillingDate, BillingID): pass the previous page's
+        next_cursor as `after`. next_cursor is None on the last page. Bills
+        with no BillingDate come after all dated ones.
+        """
+        limit = _page_size(limit)
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor(dictionary=True)
-            query = """
-    SELECT b.BillingID, b.Amount, b.PaymentMethod, b.PaymentStatus, b.BillingDate,
-           a.AppointmentDate, d.DoctorName AS DoctorName
-    FROM Billing b
-    LEFT JOIN Appointments a ON b.AppointmentID = a.AppointmentID
-    LEFT JOIN Doctors d ON a.DoctorID = d.DoctorID
-    WHERE b.PatientID = %s
-    ORDER BY b.BillingDate DESC
-"""
-
-            cursor.execute(query, (patient_id,))
-            bills = cursor.fetchall()
-            return {"status": "success", "data": bills}
+            with db_connect.pooled_cursor(dictionary=True) as (conn, cursor):
+                query, params = _bills_query(patient_id, after)
+                cursor.execute(query + " LIMIT %s", tuple(params) + (limit + 1,))
+                bills = cursor.fetchall()
+                next_cursor = None
+                if len(bills) > limit:
+                    bills = bills[:limit]
+                    last_date = bills[-1]["BillingDate"]
+                    next_cursor = [None if last_date is None else str(last_date), bills[-1]["BillingID"]]
+                return HospitalResult.success(data=bills, next_cursor=next_cursor)
         except Exception as e:
             print(f"Database Error (get_patient_bills): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
+
+    def iter_patient_bills(self, patient_id, batch_size=STREAM_BATCH_SIZE):
+        """Yield all of a patient's bills, newest first, streamed like iter_appointments."""
+        query, params = _bills_query(patient_id, None)
+        with db_connect.pooled_cursor(dictionary=True, buffered=False) as (conn, cursor):
+            cursor.execute(query, tuple(params))
+            yield from _stream_rows(cursor, batch_size)
+
+    @invalidates(lambda result, bill_id, **_: [("bill", bill_id)])
+    def update_bill(self, bill_id, amount=None, payment_method=None, payment_status=None, billing_date=None):
+        """Update billing details"""
+        try:
+            with db_connect.pooled_cursor() as (conn, cursor):
+
+                updates = []
+                params = []
+
+                if amount is not None:
+                    updates.append("Amount = %s")
+                    params.append(amount)
+                if payment_method is not None:
+                    updates.append("PaymentMethod = %s")
+                    params.append(payment_method)
+                if payment_status is not None:
+                    updates.append("PaymentStatus = %s")
+                    params.append(payment_status)
+                if billing_date is not None:
+                    updates.append("BillingDate = %s")
+                    params.append(billing_date)
+
+                if not updates:
+                    return HospitalResult.error("No fields to update")
 
+                params.append(bill_id)
+                query = f"UPDATE Billing SET {', '.join(updates)} WHERE BillingID = %s"
+                cursor.execute(query, tuple(params))
+                conn.commit()
+
+                if cursor.rowcount > 0:
+                    return HospitalResult.success(message=f"Updated bill {bill_id}")
+                return HospitalResult.error("Bill not found")
+        except Exception as e:
+            print(f"Database Error (update_bill): {e}")
+            return HospitalResult.error(e)
+
+    @invalidates(lambda result, bill_id, **_: [("bill", bill_id)])
     def update_bill_status(self, bill_id, new_status,new_date):
         """Update payment status of a bill"""
-        conn = None
         try:
-            conn = db_connect.connect_db()
-            cursor = conn.cursor()
-            query = "UPDATE Billing SET PaymentStatus = %s , BillingDate = %s WHERE BillingID = %s"
-            cursor.execute(query, (new_status, new_date, bill_id))
-            conn.commit()
+            with db_connect.pooled_cursor() as (conn, cursor):
+                query = "UPDATE Billing SET PaymentStatus = %s , BillingDate = %s WHERE BillingID = %s"
+                cursor.execute(query, (new_status, new_date, bill_id))
+                conn.commit()
             
-            if cursor.rowcount > 0:
-                return {"status": "success", "message": "Bill status updated"}
-            return {"status": "error", "message": "Bill not found"}
+                if cursor.rowcount > 0:
+                    return HospitalResult.success(message="Bill status updated")
+                return HospitalResult.error("Bill not found")
         except Exception as e:
             print(f"Database Error (update_bill_status): {e}")
-            return {"status": "error", "message": str(e)}
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            return HospitalResult.error(e)
+
+    # BULK OPERATIONS
+    def bulk_insert_patients(self, records, chunk_size=BULK_CHUNK_SIZE, all_or_nothing=False):
+        """Insert many patients (dicts with insert_patient's argument names)"""
+        return self._bulk_insert("patients", records, chunk_size, all_or_nothing)
+
+    def bulk_add_doctors(self, records, chunk_size=BULK_CHUNK_SIZE, all_or_nothing=False):
+        """Insert many doctors (dicts with add_doctor's argument names)"""
+        return self._bulk_insert("doctors", records, chunk_size, all_or_nothing)
+
+    def bulk_create_appointments(self, records, chunk_size=BULK_CHUNK_SIZE, all_or_nothing=False):
+        """Insert many appointments (dicts with create_appointment's argument names)"""
+        return self._bulk_insert("appointments", records, chunk_size, all_or_nothing)
+
+    def bulk_create_bills(self, records, chunk_size=BULK_CHUNK_SIZE, all_or_nothing=False):
+        """Insert many billing records (dicts with create_bill's argument names)"""
+        return self._bulk_insert("bills", records, chunk_size, all_or_nothing)
+
+    def _bulk_insert(self, kind, records, chunk_size, all_or_nothing):
+        """
+        Stream records into one table inside a single transaction.
+
+        Each chunk of `chunk_size` valid rows goes in as one multi-row INSERT.
+        If a chunk is rejected (duplicate key, bad foreign key, ...) it is rolled
+        back to a savepoint and retried row by row, so only the offending rows
+        are reported. Rows are numbered from 1 in input order.
+
+        With all_or_nothing=True any failed row rolls back the whole import.
+        Inside a transaction() block the import only rolls back to its own
+        savepoint, leaving the block's earlier writes alone, and commits (and
+        drops cached views) with the block.
+        """
+        table, fields = BULK_TABLES[kind]
+        columns = ", ".join(column for _, column, _ in fields)
+        row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        single_query = f"INSERT INTO {table} ({columns}) VALUES {row_sql}"
+        result = {"status": "success", "inserted": 0, "failed": 0, "chunks": 0, "errors": []}
+        touched = set()  # View cache tags of the rows sent to the database
+
+        def fail(row_number, message):
+            result["failed"] += 1
+            if len(result["errors"]) < BULK_MAX_REPORTED_ERRORS:
+                result["errors"].append({"row": row_number, "message": message})
+
+        try:
+            with db_connect.pooled_cursor() as (conn, cursor):
+                nested = db_connect.in_transaction()
+
+                def undo():
+                    if nested:  # Only this import, not the enclosing block's writes
+                        cursor.execute("ROLLBACK TO SAVEPOINT bulk_import")
+                    else:
+                        conn.rollback()
+
+                if nested:
+                    cursor.execute("SAVEPOINT bulk_import")
+                try:
+                    numbered = enumerate(records, 1)
+                    while True:
+                        batch = list(islice(numbered, chunk_size))
+                        if not batch:
+                            break
+                        rows = []
+                        for row_number, record in batch:
+                            try:
+                                row = _bulk_row(fields, record)
+                            except (ValueError, TypeError, AttributeError) as e:
+                                fail(row_number, str(e))
+                                continue
+                            rows.append((row_number, row))
+                            touched.update(_bulk_tags(kind, row))
+                        if all_or_nothing and result["failed"]:
+                            break
+                        if not rows:
+                            continue
+
+                        result["chunks"] += 1
+                        cursor.execute("SAVEPOINT bulk_chunk")
+                        try:
+                            query = f"INSERT INTO {table} ({columns}) VALUES " + ", ".join([row_sql] * len(rows))
+                            cursor.execute(query, tuple(value for _, row in rows for value in row))
+                            result["inserted"] += len(rows)
+                        except db_connect.DB_ERRORS:
+                            cursor.execute("ROLLBACK TO SAVEPOINT bulk_chunk")
+                            for row_number, row in rows:
+                                cursor.execute("SAVEPOINT bulk_row")
+                                try:
+                                    cursor.execute(single_query, row)
+                                    result["inserted"] += 1
+                                except db_connect.DB_ERRORS as e:
+                                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+                                    fail(row_number, str(e))
+                        if all_or_nothing and result["failed"]:
+                            break
+                except Exception:  # Also a bad record from the iterator: nothing of the import may stay
+                    undo()
+                    raise
+
+                if all_or_nothing and result["failed"]:
+                    undo()
+                    result["inserted"] = 0
+                    result["status"] = "error"
+                    result["message"] = "Import rolled back: some rows failed"
+                    return result
+                conn.commit()
+        except Exception as e:
+            print(f"Database Error (bulk insert {kind}): {e}")
+            return dict(result, status="error", inserted=0, message=str(e))
+
+        if touched and result["inserted"]:
+            db_connect.after_commit(lambda: view_cache.cache.invalidate(touched))
+        if result["failed"]:
+            result["status"] = "partial" if result["inserted"] else "error"
+        return result
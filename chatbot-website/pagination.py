@@ -0,0 +1,49 @@
+# pagination.py - "more" continuation tokens for paged chat listings
+#
+# A listing reply (appointments, bills) shows one page. When there are more
+# rows, the chat response carries a "more" token; the client sends it back
+# with the next message, and a message like "more" / "next page" resumes the
+# listing from the token instead of going through intent extraction.
+#
+# The token is the listing's intent with its keyset cursor filled in, signed
+# with the app's secret key so it cannot be edited, and it expires after
+# CHAT_MORE_TOKEN_TTL seconds. Permission checks still run on every page.
+
+import os
+import re
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from intent import Intent
+
+MORE_TOKEN_TTL = int(os.environ.get("CHAT_MORE_TOKEN_TTL", 3600))   # Seconds
+
+_MORE_RE = re.compile(r"^\s*(?:show\s+)?(?:me\s+)?(?:more|next(?:\s+page)?)(?:\s+please)?\s*[.!]?\s*$", re.I)
+
+
+def is_more_request(message):
+    return bool(_MORE_RE.match(message or ""))
+
+
+class Continuations:
+    """Issues and checks continuation tokens."""
+
+    def __init__(self, secret_key, max_age=MORE_TOKEN_TTL):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="chat-more")
+        self.max_age = max_age
+
+    def issue(self, intent, next_cursor):
+        """Token for the page after next_cursor, or None if there is none."""
+        if next_cursor is None:
+            return None
+        data = dict(intent.data, after=next_cursor)
+        return self._serializer.dumps({"table": intent.table, "operation": intent.operation, "data": data})
+
+    def resume(self, token):
+        """The Intent for the next page, or None if the token is missing, forged or expired."""
+        if not token or not isinstance(token, str):
+            return None
+        try:
+            return Intent.from_dict(self._serializer.loads(token, max_age=self.max_age))
+        except BadSignature:  # Includes SignatureExpired
+            return None
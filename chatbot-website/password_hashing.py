@@ -0,0 +1,156 @@
+# password_hashing.py - Password hashing off the request threads
+#
+# werkzeug's generate_password_hash / check_password_hash run a deliberately
+# slow KDF. Called inline, a burst of logins ties up every request thread and
+# the chat endpoint stalls behind them. Here they run on a small process pool
+# instead, with a cap on how many hashes may be queued: once the cap is hit
+# callers get HashingBusyError straight away (app.py turns it into a 503)
+# rather than piling up behind the KDF. If a worker dies (OOM kill, segfault)
+# the pool is broken for good, so it is replaced and the hash retried once.
+#
+# Configuration (environment / .env):
+#   PASSWORD_HASH_METHOD  werkzeug method string for new hashes, e.g.
+#                         "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+#                         Existing hashes carry their own parameters, so
+#                         changing this never breaks stored passwords.
+#   HASH_WORKERS          worker processes (default: CPU count)
+#   HASH_QUEUE_DEPTH      hashes allowed to wait for a worker (default: 4 per worker)
+#   HASH_TIMEOUT          seconds a caller waits for its result
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 2))
+HASH_QUEUE_DEPTH = int(os.environ.get("HASH_QUEUE_DEPTH", 4 * HASH_WORKERS))
+HASH_TIMEOUT = float(os.environ.get("HASH_TIMEOUT", 10))
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool is saturated and the request should be retried later."""
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for password hashing.
+
+    At most `workers + queue_depth` hashes are in flight; further calls are
+    rejected immediately with HashingBusyError instead of waiting.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_depth=HASH_QUEUE_DEPTH,
+                 method=PASSWORD_HASH_METHOD, timeout=HASH_TIMEOUT):
+        if workers < 1:
+            raise ValueError("Hashing pool needs at least one worker")
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.method = method
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {"hashed": 0, "verified": 0, "rejected": 0, "timeouts": 0, "in_flight": 0,
+                       "pool_restarts": 0}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Started lazily so importing app.py does not fork workers.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _replace_pool(self, broken):
+        with self._lock:
+            if self._executor is not broken:
+                return  # Another caller already replaced it
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._stats["pool_restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, stat, fn, *args):
+        executor = self._pool()
+        try:
+            return self._submit(executor, stat, fn, *args)
+        except BrokenProcessPool:
+            self._replace_pool(executor)
+        executor = self._pool()
+        try:
+            return self._submit(executor, stat, fn, *args)
+        except BrokenProcessPool as e:
+            self._replace_pool(executor)
+            raise HashingBusyError("Password hashing pool failed; try again shortly.") from e
+
+    def _submit(self, executor, stat, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HashingBusyError("Password hashing is saturated; try again shortly.")
+        with self._lock:
+            self._stats["in_flight"] += 1
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        # The slot is freed when the worker finishes, not when the caller gives
+        # up, so a timed-out hash still counts against the queue until it ends.
+        future.add_done_callback(self._done)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise HashingBusyError("Password hashing timed out; try again shortly.")
+        with self._lock:
+            self._stats[stat] += 1
+        return result
+
+    def _done(self, future):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+        self._slots.release()
+
+    def hash(self, password):
+        """Hash a new password with the configured method."""
+        return self._run("hashed", generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash (any werkzeug method)."""
+        if not password_hash or password is None:
+            return False
+        return self._run("verified", check_password_hash, password_hash, password)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=self.workers, queue_depth=self.queue_depth, method=self.method)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """Return the process-wide PasswordHasher, creating it on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    return get_hasher().verify(password_hash, password)
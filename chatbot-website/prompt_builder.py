@@ -0,0 +1,179 @@
+# prompt_builder.py - Extraction prompts that carry only the schema they need
+#
+#   prompt = prompt_builder.build_prompt("Show the bills of patient 7")
+#
+# The extraction prompt used to describe all four tables on every call. A
+# keyword classifier now routes the message to its likely table first, and
+# the prompt only includes that table's JSON shapes (about a quarter of the
+# schema text). A message that names several tables without a clear owner,
+# or none at all, gets the full schema as before, so a wrong guess costs
+# tokens, never a wrong table. So does a message asking for several
+# operations ("add patient X and book her with doctor 3"), which the model
+# returns as one {"operations": [...]} plan.
+#
+# Routing counts and the estimated prompt sizes are exported through stats()
+# (see the collector in app.py); actual token usage is counted per call by
+# metrics.record_llm_usage.
+
+import re
+import threading
+
+# --- Schema ---
+
+TABLE_SCHEMAS = {
+    "patient": """For table: patient
+- Insert: { "operation": "insert", "table": "patient", "data": { "id": ..., "name": ..., "age": ..., "gender": ..., "address": ..., "contact": ... } }
+- Update: { "operation": "update", "table": "patient", "data": {"id": ..., {"field"}: {"value"}... } }
+- View:   { "operation": "view", "table": "patient","data": { "id": ... } }""",
+    "doctor": """For table: doctor
+- Insert: { "operation": "insert", "table": "doctor", "data": { "doctor_id": ..., "name": ..., "specialization": ..., "schedule": ..., "contact": ... } }
+- Update: { "operation": "update", "table": "doctor",  "data": { "doctor_id": ..., {"field"}: {"value"}... } }
+- View:   { "operation": "view", "table": "doctor","data": {"id": ... } }""",
+    "appointment": """For table: appointment
+- Insert: { "operation": "insert", "table": "appointment", "data": { "appointment_id": ..., "appointment_date": ..., "appointment_time": ..., "patient_id": ..., "doctor_id": ... } }
+- Update: { "operation": "update", "table": "appointment", "data": { "appointment_id": ..., {"field"}: {"value"}... } }
+- View:   { "operation": "view", "table": "appointment","data": {"id": ... } }""",
+    "bill": """For table: bill
+- Insert: { "operation": "insert", "table": "bill", "data": { "bill_id": ..., "amount": ..., "payment_method": ..., "payment_status": ..., "billing_date": ..., "patient_id": ..., "appointment_id": ... } }
+- Update: { "operation": "update", "table": "bill", "data": { "bill_id": ..., {"field"}: {"value"}... } }
+- View:   { "operation": "view", "table": "bill","data":{"id": ... } }""",
+}
+TABLES = tuple(TABLE_SCHEMAS)
+
+_OPERATIONS = ("Then identify the operation: insert (also appears as add), update (also appears as change), "
+               "view (also appears as show, extract, info about).")
+
+_SINGLE = "Only one operation should be extracted per request."
+_PLAN = """Usually a request asks for one operation. If it asks for several, return
+{ "operations": [ ..., ... ] } with one object per operation, in the order they must run.
+When an operation needs the ID created by an earlier one, write "$N.<field>" instead,
+e.g. "patient_id": "$1.patient_id" for the patient added by operation 1."""
+
+# --- Classifier ---
+
+# Table nouns, and field words that only one table has.
+_TABLE_WORDS = re.compile(r"\b(?P<table>patient|doctor|dr|appointment|bill(?:ing)?|invoice)s?\b", re.IGNORECASE)
+_HINT_WORDS = {
+    "patient": re.compile(r"\b(?:age[ds]?|gender|male|female|years?\s+old|address|lives?\s+at)\b", re.IGNORECASE),
+    "doctor": re.compile(r"\b(?:speciali[sz]\w*|cardiolog\w*|surgeon|physician)\b", re.IGNORECASE),
+    "appointment": re.compile(r"\b(?:book(?:ed|ing)?|slot|visit|consultation|reschedule[ds]?|cancel(?:led)?)\b",
+                              re.IGNORECASE),
+    "bill": re.compile(r"\b(?:amount|payment|paid|unpaid|pay|cash|card|upi|insurance|fee)s?\b", re.IGNORECASE),
+}
+# Verbs that start an operation; two or more usually mean a multi-operation request.
+# ("schedule" and "set" are left out: they are as often field names as verbs.)
+_ACTION_WORDS = re.compile(r"\b(?:add|insert|create|register|book|generate|update|change|modify|"
+                           r"edit|show|view|get|display|fetch|find|cancel)\b", re.IGNORECASE)
+_NOUNS = {"patient": "patient", "doctor": "doctor", "dr": "doctor", "appointment": "appointment",
+          "bill": "bill", "billing": "bill", "invoice": "bill"}
+
+# Appointments name a patient and a doctor, bills a patient and an appointment:
+# when the nouns co-occur, the record that references the others is the one
+# being asked about.
+_OWNS = {"appointment": {"patient", "doctor"}, "bill": {"patient", "appointment", "doctor"}}
+
+
+def classify_table(user_text):
+    """The table a message is about, or None when it is not clear enough to route."""
+    if len(_ACTION_WORDS.findall(user_text or "")) > 1:
+        return None
+    mentioned = {_NOUNS[m.group("table").lower()] for m in _TABLE_WORDS.finditer(user_text or "")}
+    for owner in ("bill", "appointment"):
+        if owner in mentioned and mentioned - {owner} <= _OWNS[owner]:
+            return owner
+    if len(mentioned) == 1:
+        return next(iter(mentioned))
+    if mentioned:
+        return None  # e.g. "patient" and "doctor" with nothing tying them together
+    hinted = [table for table, pattern in _HINT_WORDS.items() if pattern.search(user_text or "")]
+    return hinted[0] if len(hinted) == 1 else None
+
+
+# --- Prompts ---
+
+def estimate_tokens(text):
+    # Roughly what Gemini reports for English text.
+    return max(1, len(text) // 4)
+
+
+_FULL_SCHEMA_CHARS = len("\n\n".join(TABLE_SCHEMAS.values()))
+_stats_lock = threading.Lock()
+_stats = {"routed": 0, "full_schema": 0, "prompts": 0, "prompt_tokens_estimated": 0, "schema_chars_saved": 0}
+_routed_by_table = {table: 0 for table in TABLES}
+
+
+def _instructions(tables, plans):
+    if len(tables) == 1:
+        table_line = (f"The request concerns the SQL table: {tables[0]}. "
+                      "Use the JSON format below for it.")
+    else:
+        table_line = f"First identify the SQL table from the text: {', '.join(tables[:-1])}, or {tables[-1]}."
+    schemas = "\n\n".join(TABLE_SCHEMAS[table] for table in tables)
+    return f"""
+{table_line}
+{_OPERATIONS}
+
+{_PLAN if plans else _SINGLE}
+
+Extract the relevant information and return it as JSON based on the table and operation:
+
+{schemas}
+"""
+
+
+def _record(prompt, tables):
+    schema_chars = sum(len(TABLE_SCHEMAS[table]) for table in tables)
+    with _stats_lock:
+        _stats["prompts"] += 1
+        _stats["prompt_tokens_estimated"] += estimate_tokens(prompt)
+        if len(tables) < len(TABLES):
+            _stats["routed"] += 1
+            _stats["schema_chars_saved"] += _FULL_SCHEMA_CHARS - schema_chars
+            for table in tables:
+                _routed_by_table[table] += 1
+        else:
+            _stats["full_schema"] += 1
+
+
+def _tables_for(user_texts):
+    tables = {classify_table(text) for text in user_texts}
+    if None in tables or not tables:
+        return list(TABLES)
+    return [table for table in TABLES if table in tables]
+
+
+def build_prompt(user_text):
+    """Extraction prompt for one message, with only the schema of its table when that is clear."""
+    tables = _tables_for([user_text])
+    prompt = f"""{_instructions(tables, plans=True)}
+Return the output strictly in the above JSON format.
+
+User input: {user_text}
+"""
+    _record(prompt, tables)
+    return prompt
+
+
+def build_batch_prompt(user_texts):
+    """Prompt asking for one extraction per numbered input, returned as a JSON array."""
+    tables = _tables_for(user_texts)
+    numbered = "\n".join(f"{n}. {text}" for n, text in enumerate(user_texts, 1))
+    prompt = f"""{_instructions(tables, plans=False)}
+You are given {len(user_texts)} numbered user inputs. Treat each one as a separate request.
+Return a JSON array with exactly {len(user_texts)} objects, one per input and in the same order,
+each strictly in the above JSON format.
+
+User inputs:
+{numbered}
+"""
+    _record(prompt, tables)
+    return prompt
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+        snapshot.update({f"routed_{table}": count for table, count in _routed_by_table.items()})
+    snapshot["avg_prompt_tokens_estimated"] = (
+        round(snapshot["prompt_tokens_estimated"] / snapshot["prompts"], 1) if snapshot["prompts"] else 0.0)
+    return snapshot
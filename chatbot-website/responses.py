@@ -0,0 +1,143 @@
+# responses.py - Local templates that turn a Hospital result into chat text
+#
+#   text = responses.render("patient", "view", result, intent.data)
+#
+# One template per (table, operation), looked up in RESPONSE_TEMPLATES. The
+# output starts with one of the ✅ / ❌ / ℹ️ / 🔹 markers the UI already uses,
+# so it is final as-is; rewording it with the LLM is an optional extra (see
+# llm1.polish_response). render_plan() joins the replies of a multi-operation
+# request (dict.operations_plan).
+
+from hospital_result import HospitalResult
+
+INTERNAL_ERROR = "❌ The requested operation could not be completed due to an internal issue."
+
+
+def _value(value, missing="n/a"):
+    return missing if value is None or value == "" else value
+
+
+def _lines(header, rows, line, result=None):
+    lines = [header] + [f"• {line(row)}" for row in rows]
+    if result is not None and result.next_cursor is not None:
+        lines.append(f"ℹ️ Showing {len(rows)}. Type 'more' for the next page.")
+    return "\n".join(lines)
+
+
+# --- Templates ---
+# Each takes (result, datas) for a successful result; errors are handled in render().
+
+def _inserted(label, id_keys=()):
+    # id_keys: request fields holding a caller-chosen id (doctors), which the
+    # driver's lastrowid does not report.
+    def template(result, datas):
+        name = datas.get("name")
+        subject = f"{label} {name}" if name else label
+        new_id = next((datas[k] for k in id_keys if datas.get(k) is not None), result.new_id)
+        return f"✅ {subject} added with ID {new_id}."
+    return template
+
+
+def _updated(result, datas):
+    return f"✅ {result.message or 'Record updated'}."
+
+
+def _view_patient(result, datas):
+    p = result.rows[0]
+    return (f"🔹 Patient #{p['PatientID']}: {p['PatientName']}, age {_value(p.get('Age'))}, "
+            f"{_value(p.get('Gender'))}\n"
+            f"Contact: {_value(p.get('Contact'))} | Address: {_value(p.get('Address'))}")
+
+
+def _view_doctor(result, datas):
+    d = result.rows[0]
+    return (f"🔹 Dr. {d['DoctorName']} ({d['DoctorID']}), {_value(d.get('Specialization'))}\n"
+            f"Contact: {_value(d.get('Contact'))} | Schedule: {_value(d.get('Scheduled'))}")
+
+
+def _create_appointment(result, datas):
+    when = " ".join(str(datas[k]) for k in ("appointment_date", "appointment_time") if datas.get(k))
+    return f"✅ Appointment {result.new_id} booked" + (f" for {when}." if when else ".")
+
+
+def _view_appointments(result, datas):
+    rows = result.rows
+    if not rows:
+        return "ℹ️ No appointments found."
+    return _lines("🔹 Appointments:", rows, lambda a: (
+        f"#{a['AppointmentID']} on {a['AppointmentDate']} at {a['AppointmentTime']}: "
+        f"{a['PatientName']} with Dr. {a['DoctorName']} ({_value(a.get('Specialization'))}), "
+        f"{a['AppointmentStatus']}"), result)
+
+
+def _create_bill(result, datas):
+    amount = datas.get("amount")
+    return f"✅ Bill {result.new_id} created" + (f" for {amount}." if amount is not None else ".")
+
+
+def _view_bills(result, datas):
+    rows = result.rows
+    patient_id = datas.get("id", datas.get("patient_id"))
+    if not rows:
+        return f"ℹ️ No billing records found for patient ID {patient_id}."
+    return _lines(f"🔹 Billing records for patient ID {patient_id}:", rows, lambda b: (
+        f"Bill #{b['BillingID']}: {b['Amount']} via {_value(b.get('PaymentMethod'))}, "
+        f"{_value(b.get('PaymentStatus'))}, billed {_value(b.get('BillingDate'))}, "
+        f"appointment {_value(b.get('AppointmentDate'))} with {_value(b.get('DoctorName'))}"), result)
+
+
+RESPONSE_TEMPLATES = {
+    ("patient", "insert"): _inserted("Patient"),
+    ("patient", "update"): _updated,
+    ("patient", "view"): _view_patient,
+    ("doctor", "insert"): _inserted("Doctor", id_keys=("doctor_id", "id")),
+    ("doctor", "update"): _updated,
+    ("doctor", "view"): _view_doctor,
+    ("appointment", "insert"): _create_appointment,
+    ("appointment", "update"): _updated,
+    ("appointment", "view"): _view_appointments,
+    ("bill", "insert"): _create_bill,
+    ("bill", "update"): _updated,
+    ("bill", "view"): _view_bills,
+}
+
+
+def render(table, operation, result, datas=None):
+    """
+    User-facing text for the result of dict.operations(table, operation, datas).
+
+    Strings (validation messages from dict.operations) pass through unchanged.
+    """
+    if result is None:
+        return INTERNAL_ERROR
+    if isinstance(result, str):
+        return result
+    if not isinstance(result, HospitalResult):
+        result = HospitalResult(result)
+    if not result.ok:
+        return f"❌ {result.message or 'The operation failed.'}"
+    template = RESPONSE_TEMPLATES.get((table, operation))
+    if template is None:
+        return f"✅ Done: {dict(result)}"
+    return template(result, datas or {})
+
+
+def render_plan(result):
+    """User-facing text for dict.operations_plan: one line per step, or why nothing was saved."""
+    if result is None:
+        return INTERNAL_ERROR
+    if isinstance(result, str):
+        return result
+    if not isinstance(result, HospitalResult):
+        result = HospitalResult(result)
+    if not result.ok:
+        return f"❌ {result.message or 'The operations failed.'}"
+    return "\n".join(render(step["table"], step["operation"], step["result"], step["data"])
+                     for step in result["steps"])
+
+
+def render_intent(intent, result):
+    """render() for an Intent, render_plan() for an IntentPlan."""
+    if getattr(intent, "steps", None) is not None:
+        return render_plan(result)
+    return render(intent.table, intent.operation, result, intent.data)
@@ -0,0 +1,324 @@
+# schema.py - HospitalDB tables, indexes and query-plan checks
+#
+# Usage:
+#   python schema.py migrate     create/upgrade the tables and indexes
+#   python schema.py check       EXPLAIN every query Hospital issues; exit 1 on a full-table scan
+#
+# Both use the database mysql_helpers.connect_db() points at (DB_BACKEND,
+# DB_HOST, DB_NAME, ... or DB_SQLITE_PATH). Migrations are numbered and
+# recorded in schema_version, so `migrate` is safe to run on every deploy.
+#
+# Indexes follow the listing queries in old_mysql.py: appointments are
+# filtered by PatientID or DoctorID and paged by AppointmentID, bills are
+# filtered by PatientID and paged newest first by (BillingDate, BillingID).
+
+import argparse
+import inspect
+import re
+import sys
+from contextlib import contextmanager
+
+import mysql_helpers
+
+# --- DDL ---
+
+_MYSQL_TABLES = [
+    """CREATE TABLE IF NOT EXISTS Patients (
+        PatientID INT AUTO_INCREMENT PRIMARY KEY,
+        PatientName VARCHAR(100) NOT NULL,
+        Age INT,
+        Gender VARCHAR(20),
+        Contact VARCHAR(50),
+        Address VARCHAR(255),
+        Email VARCHAR(100)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS Doctors (
+        DoctorID VARCHAR(20) PRIMARY KEY,
+        DoctorName VARCHAR(100) NOT NULL,
+        Specialization VARCHAR(100),
+        Contact VARCHAR(50),
+        Scheduled VARCHAR(100)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS Appointments (
+        AppointmentID INT AUTO_INCREMENT PRIMARY KEY,
+        PatientID INT NOT NULL,
+        DoctorID VARCHAR(20) NOT NULL,
+        AppointmentDate DATE,
+        AppointmentTime TIME,
+        AppointmentStatus VARCHAR(20) DEFAULT 'Scheduled',
+        FOREIGN KEY (PatientID) REFERENCES Patients (PatientID),
+        FOREIGN KEY (DoctorID) REFERENCES Doctors (DoctorID)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS Billing (
+        BillingID INT AUTO_INCREMENT PRIMARY KEY,
+        PatientID INT NOT NULL,
+        AppointmentID INT,
+        Amount DECIMAL(10, 2),
+        PaymentMethod VARCHAR(30),
+        PaymentStatus VARCHAR(20) DEFAULT 'Pending',
+        BillingDate DATE DEFAULT (CURRENT_DATE),
+        FOREIGN KEY (PatientID) REFERENCES Patients (PatientID),
+        FOREIGN KEY (AppointmentID) REFERENCES Appointments (AppointmentID)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+]
+
+_SQLITE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS Patients (
+        PatientID INTEGER PRIMARY KEY AUTOINCREMENT,
+        PatientName TEXT NOT NULL,
+        Age INTEGER,
+        Gender TEXT,
+        Contact TEXT,
+        Address TEXT,
+        Email TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS Doctors (
+        DoctorID TEXT PRIMARY KEY,
+        DoctorName TEXT NOT NULL,
+        Specialization TEXT,
+        Contact TEXT,
+        Scheduled TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS Appointments (
+        AppointmentID INTEGER PRIMARY KEY AUTOINCREMENT,
+        PatientID INTEGER NOT NULL REFERENCES Patients (PatientID),
+        DoctorID TEXT NOT NULL REFERENCES Doctors (DoctorID),
+        AppointmentDate TEXT,
+        AppointmentTime TEXT,
+        AppointmentStatus TEXT DEFAULT 'Scheduled'
+    )""",
+    """CREATE TABLE IF NOT EXISTS Billing (
+        BillingID INTEGER PRIMARY KEY AUTOINCREMENT,
+        PatientID INTEGER NOT NULL REFERENCES Patients (PatientID),
+        AppointmentID INTEGER REFERENCES Appointments (AppointmentID),
+        Amount REAL,
+        PaymentMethod TEXT,
+        PaymentStatus TEXT DEFAULT 'Pending',
+        BillingDate TEXT DEFAULT CURRENT_DATE
+    )""",
+]
+
+# (name, table, columns). Each ends in the paging key, so a filtered page is
+# one index range read in order, with no sort.
+INDEXES = [
+    ("idx_appointments_patient", "Appointments", "PatientID, AppointmentID"),
+    ("idx_appointments_doctor", "Appointments", "DoctorID, AppointmentID"),
+    ("idx_billing_patient_date", "Billing", "PatientID, BillingDate, BillingID"),
+    ("idx_billing_appointment", "Billing", "AppointmentID"),
+]
+
+# version -> (description, {dialect: [statements]})
+MIGRATIONS = {
+    1: ("Create tables", {"mysql": _MYSQL_TABLES, "sqlite": _SQLITE_TABLES}),
+    2: ("Listing indexes", {
+        "mysql": [f"CREATE INDEX {name} ON {table} ({columns})" for name, table, columns in INDEXES],
+        "sqlite": [f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})" for name, table, columns in INDEXES],
+    }),
+}
+
+
+def dialect():
+    return "sqlite" if mysql_helpers.DB_BACKEND == "sqlite" else "mysql"
+
+
+def _index_exists(cursor, table, name):
+    cursor.execute("SELECT 1 FROM information_schema.statistics "
+                   "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1", (table, name))
+    return cursor.fetchone() is not None
+
+
+def migrate(conn, dialect_name=None, verbose=False):
+    """Apply every migration not yet recorded in schema_version. Returns the versions applied."""
+    dialect_name = dialect_name or dialect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_version "
+                       "(version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL)")
+        cursor.execute("SELECT version FROM schema_version")
+        done = {row[0] for row in cursor.fetchall()}
+        applied = []
+        for version in sorted(MIGRATIONS):
+            if version in done:
+                continue
+            description, statements = MIGRATIONS[version]
+            for statement in statements[dialect_name]:
+                # MySQL has no CREATE INDEX IF NOT EXISTS: skip indexes a DBA already added.
+                match = re.match(r"CREATE INDEX (\w+) ON (\w+)", statement)
+                if dialect_name == "mysql" and match and _index_exists(cursor, match.group(2), match.group(1)):
+                    continue
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)", (version, description))
+            applied.append(version)
+            if verbose:
+                print(f"Applied migration {version}: {description}")
+        conn.commit()
+        return applied
+    finally:
+        cursor.close()
+
+
+# --- Query-Plan Check ---
+
+# Hospital methods and sample arguments covering every statement they can
+# issue. allow_scan marks exports that read the whole result by design.
+CHECK_CALLS = [
+    ("view_patient", (1,), {}, False),
+    ("update_patient", (1,), dict(name="x", age=1, gender="x", contact="x", address="x", email="x"), False),
+    ("get_doctor", ("D1",), {}, False),
+    ("update_doctor", ("D1",), dict(name="x", specialization="x", contact="x", schedule="x"), False),
+    ("get_appointments", (), {}, False),
+    ("get_appointments", (), dict(after=1), False),
+    ("get_appointments", (), dict(patient_id=1), False),
+    ("get_appointments", (), dict(patient_id=1, after=1), False),
+    ("get_appointments", (), dict(doctor_id="D1"), False),
+    ("get_appointments", (), dict(doctor_id="D1", after=1), False),
+    ("get_appointments", (), dict(appointment_id=1), False),
+    ("update_appointment", (1,), dict(status="x", appointment_date="2025-01-01", appointment_time="10:00"), False),
+    ("get_patient_bills", (1,), {}, False),
+    ("get_patient_bills", (1,), dict(after=["2025-01-01", 1]), False),
+    ("update_bill", (1,), dict(amount=1, payment_method="x", payment_status="x", billing_date="2025-01-01"), False),
+    ("update_bill_status", (1, "x", "2025-01-01"), {}, False),
+    ("iter_appointments", (), {}, True),
+    ("iter_appointments", (), dict(patient_id=1), False),
+    ("iter_patient_bills", (1,), {}, False),
+]
+
+
+class _RecordingCursor:
+    """Stands in for a real cursor: records statements and returns no rows."""
+
+    def __init__(self, recorded):
+        self._recorded = recorded
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def execute(self, query, params=()):
+        self._recorded.append((query, tuple(params or ())))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=1):
+        return []
+
+
+class _RecordingConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@contextmanager
+def _recording(recorded):
+    @contextmanager
+    def pooled_cursor(**cursor_kwargs):
+        yield _RecordingConnection(), _RecordingCursor(recorded)
+
+    original = mysql_helpers.pooled_cursor
+    mysql_helpers.pooled_cursor = pooled_cursor
+    try:
+        yield
+    finally:
+        mysql_helpers.pooled_cursor = original
+
+
+def capture_queries():
+    """Run CHECK_CALLS without a database; returns [(label, query, params, allow_scan)] for reads and updates."""
+    from old_mysql import Hospital
+    hospital = Hospital()
+    captured = []
+    for name, args, kwargs, allow_scan in CHECK_CALLS:
+        recorded = []
+        # Unwrapped: the view cache must not answer instead of the database.
+        method = inspect.unwrap(getattr(Hospital, name))
+        with _recording(recorded):
+            result = method(hospital, *args, **kwargs)
+            if inspect.isgenerator(result):
+                list(result)
+        label = f"{name}({', '.join([repr(a) for a in args] + [f'{k}={v!r}' for k, v in kwargs.items()])})"
+        for query, params in recorded:
+            if re.match(r"\s*(SELECT|UPDATE|DELETE)\b", query, re.I):
+                captured.append((label, " ".join(query.split()), params, allow_scan))
+    return captured
+
+
+def _full_scans(cursor, dialect_name, query, params):
+    """
+    Plan lines that read a whole table (or whole index). A scan is accepted
+    only for an unfiltered page (LIMIT, no equality filter, rows already in
+    order): it stops after one page. With a filter it may read every row
+    before finding a page of matches.
+    """
+    where = re.search(r"\bWHERE\b(.*?)(?:\bORDER BY\b|\bLIMIT\b|$)", query, re.I | re.S)
+    filtered = where is not None and re.search(r"[^<>!]=\s*%s", where.group(1)) is not None
+    bounded = re.search(r"\bLIMIT\b", query, re.I) is not None and not filtered
+    if dialect_name == "sqlite":
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        details = [row[-1] for row in cursor.fetchall()]
+        sorted_in_temp = any("TEMP B-TREE" in d for d in details)
+        return [d for d in details if d.startswith("SCAN") and (not bounded or sorted_in_temp)], details
+    cursor.execute("EXPLAIN " + query, params)
+    rows = cursor.fetchall()
+    columns = [c[0] for c in cursor.description]
+    plan = [dict(zip(columns, row)) for row in rows]
+    details = [f"{p['table']}: type={p['type']} key={p['key']} rows={p['rows']} {p.get('Extra') or ''}".strip()
+               for p in plan]
+    filesort = any("filesort" in (p.get("Extra") or "") or "temporary" in (p.get("Extra") or "") for p in plan)
+    scans = [d for p, d in zip(plan, details)
+             if p["type"] == "ALL" or (p["type"] == "index" and (not bounded or filesort))]
+    return scans, details
+
+
+def check(conn, dialect_name=None, verbose=False):
+    """EXPLAIN every captured query. Returns (queries checked, [(label, query, problem)])."""
+    dialect_name = dialect_name or dialect()
+    queries = capture_queries()
+    failures = []
+    cursor = conn.cursor()
+    try:
+        for label, query, params, allow_scan in queries:
+            try:
+                scans, details = _full_scans(cursor, dialect_name, query, params)
+            except Exception as e:
+                failures.append((label, query, f"EXPLAIN failed: {e}"))
+                continue
+            if verbose:
+                print(f"{label}\n  {query}\n  " + "\n  ".join(details))
+            if scans and not allow_scan:
+                failures.append((label, query, "full scan: " + "; ".join(scans)))
+        conn.rollback()
+    finally:
+        cursor.close()
+    return len(queries), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HospitalDB schema migrations and query-plan checks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Create or upgrade the tables and indexes")
+    p = sub.add_parser("check", help="EXPLAIN every Hospital query and fail on full-table scans")
+    p.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    conn = mysql_helpers.connect_db()
+    try:
+        if args.command == "migrate":
+            applied = migrate(conn, verbose=True)
+            print(f"Schema up to date ({len(applied)} migration(s) applied).")
+            return
+        checked, failures = check(conn, verbose=args.verbose)
+    finally:
+        conn.close()
+    for label, query, problem in failures:
+        print(f"FAIL {label}: {problem}\n     {query}")
+    print(f"{checked} queries checked, {len(failures)} problem(s).")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# sqlite_backend.py - SQLite stand-in for the HospitalDB MySQL schema
+#
+# Selected with DB_BACKEND=sqlite (see mysql_helpers.connect_db). The
+# connection wrapper speaks the small part of the mysql.connector API that
+# old_mysql.Hospital uses: cursor(dictionary=True), %s placeholders,
+# lastrowid / rowcount, commit / rollback, is_connected. Like MySQL with
+# autocommit off, every statement runs inside a transaction that lasts until
+# commit() or rollback().
+#
+# Meant for offline development and benchmarks, not production: SQLite
+# serialises writers, and date/time columns come back as strings.
+
+import sqlite3
+
+import schema
+
+
+class SQLiteCursor:
+    def __init__(self, conn, dictionary=False, **kwargs):
+        self._conn = conn
+        self._cursor = conn.raw.cursor()
+        self._dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, params=()):
+        if not self._conn.raw.in_transaction:
+            self._conn.raw.execute("BEGIN")
+        self._cursor.execute(query.replace("%s", "?"), tuple(params or ()))
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, query, seq_of_params):
+        if not self._conn.raw.in_transaction:
+            self._conn.raw.execute("BEGIN")
+        self._cursor.executemany(query.replace("%s", "?"), seq_of_params)
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-shaped wrapper around a sqlite3 connection."""
+
+    def __init__(self, path):
+        # isolation_level=None: transactions are opened explicitly by the cursor.
+        self.raw = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False,
+                                   uri=path.startswith("file:"))
+        self.raw.execute("PRAGMA foreign_keys = ON")
+        if ":memory:" not in path and "mode=memory" not in path:
+            self.raw.execute("PRAGMA journal_mode = WAL")
+        self.raw.execute("BEGIN IMMEDIATE")  # One connection at a time creates or upgrades the schema
+        schema.migrate(self, "sqlite")
+        self._open = True
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        self._open = False
+        self.raw.close()
+
+
+def connect(path):
+    return SQLiteConnection(path)
@@ -114,6 +114,15 @@ document.addEventListener('DOMContentLoaded', () => {
         synth.speak(currentUtterance);
     }
 
+    // Like speakText, but queues behind anything already being spoken.
+    function speakQueued(text) {
+        if (!voiceEnabled || !synth || !text) return;
+        const utterance = new SpeechSynthesisUtterance(text);
+        utterance.voice = voices.find(v => v.lang.includes('en')) || voices[0];
+        utterance.onerror = (event) => console.error('Speech synthesis error:', event);
+        synth.speak(utterance);
+    }
+
     function toggleVoiceOutput() {
         voiceEnabled = !voiceEnabled;
         voiceToggle.classList.toggle('muted');
@@ -184,15 +193,60 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // --- Main Chat Function ---
+    const STAGE_LABELS = {
+        intent: 'Looking up records...',
+        db: 'Preparing response...'
+    };
+
+    // Continuation token of the last paged listing; sent back so "more" shows the next page.
+    let moreToken = null;
+
     async function sendMessage(messageText) {
         displayMessage(messageText, 'user');
         userInput.value = '';
 
+        // Browsers without streaming fetch bodies use the plain JSON endpoint.
+        if (!window.ReadableStream || !window.TextDecoder) {
+            return sendMessageJson(messageText);
+        }
+
+        const bot = createStreamingMessage();
+        try {
+            const response = await fetch('/chat/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: messageText, more: moreToken })
+            });
+
+            if (!response.ok || !response.body) {
+                const error = await response.json().catch(() => ({}));
+                throw new Error(error.error || error.message || 'Request failed');
+            }
+
+            await readEventStream(response.body, (event, data) => {
+                if (event === 'token') {
+                    bot.append(data.text);
+                } else if (event === 'done') {
+                    moreToken = data.more || null;
+                    bot.finish(data.response);
+                } else if (event === 'error') {
+                    bot.fail(data.response);
+                } else if (STAGE_LABELS[event]) {
+                    bot.status(STAGE_LABELS[event]);
+                }
+            });
+        } catch (error) {
+            console.error('Chat error:', error);
+            bot.fail(`Error: ${error.message || 'Failed to get response'}`);
+        }
+    }
+
+    async function sendMessageJson(messageText) {
         try {
             const response = await fetch('/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: messageText })
+                body: JSON.stringify({ message: messageText, more: moreToken })
             });
 
             if (!response.ok) {
@@ -201,6 +255,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             const data = await response.json();
+            moreToken = data.more || null;
             if (data.response) {
                 displayMessage(data.response, 'bot');
                 speakText(data.response);
@@ -211,6 +266,79 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Parse a text/event-stream body, calling onEvent(event, data) per message.
+    async function readEventStream(body, onEvent) {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
+    }
+
+    // A bot message that fills in as tokens arrive and is spoken sentence by sentence.
+    function createStreamingMessage() {
+        const messageElement = document.createElement('div');
+        messageElement.classList.add('message', 'bot-message');
+        const paragraph = document.createElement('p');
+        paragraph.textContent = '...';
+        messageElement.appendChild(paragraph);
+        chatHistory.appendChild(messageElement);
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+
+        let text = '';
+        let spoken = 0;
+        if (synth && synth.speaking) synth.cancel();
+
+        function speakCompleteSentences(flush) {
+            const pending = text.slice(spoken);
+            const match = flush ? pending : (pending.match(/^[\s\S]*[.!?\n]/) || [''])[0];
+            if (match.trim()) speakQueued(match);
+            spoken += match.length;
+        }
+
+        return {
+            status(label) {
+                if (!text) paragraph.textContent = label;
+            },
+            append(chunk) {
+                text += chunk;
+                paragraph.textContent = text;
+                chatHistory.scrollTop = chatHistory.scrollHeight;
+                speakCompleteSentences(false);
+            },
+            finish(finalText) {
+                if (finalText && finalText !== text.trim()) {
+                    // The streamed text was replaced (e.g. a polish that broke off):
+                    // drop what was queued from it and speak the final text instead.
+                    if (synth && (synth.speaking || synth.pending)) synth.cancel();
+                    text = finalText;
+                    spoken = 0;
+                    paragraph.textContent = text;
+                }
+                speakCompleteSentences(true);
+            },
+            fail(message) {
+                messageElement.classList.replace('bot-message', 'error-message');
+                paragraph.textContent = message;
+            }
+        };
+    }
+
     // --- Initialize ---
     function init() {
         // Load voice preference
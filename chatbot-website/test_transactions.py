@@ -0,0 +1,136 @@
+# test_transactions.py - Multi-step plans and transaction() on the SQLite backend
+#
+#   python -m unittest test_transactions
+#
+# Each test gets a fresh SQLite database and an empty view cache. Covers
+# dict.operations_plan ("$N.field" references, rollback of earlier steps when
+# a later one fails) and mysql_helpers.transaction's after_commit callbacks,
+# which must run on commit and be dropped on rollback.
+
+import os
+import tempfile
+import unittest
+
+import mysql_helpers
+import view_cache
+import dict as dict_logic
+from intent import Intent
+
+
+class SQLiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._saved = (mysql_helpers.DB_BACKEND, mysql_helpers.SQLITE_PATH, mysql_helpers._pool)
+        mysql_helpers.DB_BACKEND = "sqlite"
+        mysql_helpers.SQLITE_PATH = os.path.join(self._tmpdir.name, "hospital.sqlite3")
+        mysql_helpers._pool = None  # The next get_pool() connects to the new file
+        view_cache.cache.clear()
+        self.hos = dict_logic.hos
+
+    def tearDown(self):
+        mysql_helpers.get_pool().close_all()
+        mysql_helpers.DB_BACKEND, mysql_helpers.SQLITE_PATH, mysql_helpers._pool = self._saved
+        view_cache.cache.clear()
+        self._tmpdir.cleanup()
+
+    def count(self, table):
+        with mysql_helpers.pooled_cursor() as (conn, cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def add_doctor(self, doctor_id="7"):
+        result = self.hos.add_doctor(doctor_id, "Dr. Rao", "General", "5550100")
+        self.assertEqual(result["status"], "success", result)
+
+
+class OperationsPlanTest(SQLiteTestCase):
+    def test_step_reference_uses_the_created_id(self):
+        self.add_doctor()
+        result = dict_logic.operations_plan([
+            Intent("patient", "insert", {"name": "Asha", "age": 34, "contact": "5550101", "address": "Pune"}),
+            Intent("appointment", "insert", {"patient_id": "$1.patient_id", "doctor_id": "7",
+                                             "appointment_date": "2025-06-01", "appointment_time": "10:00:00"}),
+        ])
+        self.assertTrue(result.ok, result)
+        patient_id = result["steps"][0]["result"]["patient_id"]
+        self.assertEqual(result["steps"][1]["data"]["patient_id"], patient_id)
+        with mysql_helpers.pooled_cursor() as (conn, cursor):
+            cursor.execute("SELECT PatientID FROM Appointments")
+            self.assertEqual(cursor.fetchall(), [(patient_id,)])
+
+    def test_failing_step_rolls_back_earlier_steps(self):
+        self.add_doctor()
+        patient = Intent("patient", "insert", {"name": "Asha", "age": 34, "contact": "5550101", "address": "Pune"})
+        failing = {
+            "database error": {"patient_id": "$1.patient_id", "doctor_id": "999",  # No such doctor
+                               "appointment_date": "2025-06-01", "appointment_time": "10:00:00"},
+            "missing field": {"patient_id": "$1.patient_id", "doctor_id": "7", "appointment_time": "10:00:00"},
+            "bad reference": {"patient_id": "$3.patient_id", "doctor_id": "7",
+                              "appointment_date": "2025-06-01", "appointment_time": "10:00:00"},
+        }
+        for case, data in failing.items():
+            with self.subTest(case=case):
+                result = dict_logic.operations_plan([patient, Intent("appointment", "insert", data)])
+                self.assertFalse(result.ok)
+                self.assertIn("Step 2", result.message)
+                self.assertEqual(self.count("Patients"), 0)
+                self.assertEqual(self.count("Appointments"), 0)
+
+    def test_rolled_back_plan_leaves_cached_views_alone(self):
+        patient_id = self.hos.insert_patient("Asha", 34, "Female", "5550101", "Pune")["patient_id"]
+        self.assertEqual(self.hos.view_patient(patient_id)["data"]["PatientName"], "Asha")
+        invalidations = view_cache.cache.stats()["invalidations"]
+        result = dict_logic.operations_plan([
+            Intent("patient", "update", {"id": patient_id, "name": "Asha K"}),
+            Intent("appointment", "insert", {"patient_id": patient_id, "doctor_id": "999",
+                                             "appointment_date": "2025-06-01", "appointment_time": "10:00:00"}),
+        ])
+        self.assertFalse(result.ok)
+        self.assertEqual(view_cache.cache.stats()["invalidations"], invalidations)
+        self.assertEqual(self.hos.view_patient(patient_id)["data"]["PatientName"], "Asha")
+
+
+class TransactionTest(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient_id = self.hos.insert_patient("Asha", 34, "Female", "5550101", "Pune")["patient_id"]
+        self.hos.view_patient(self.patient_id)  # Now cached
+        self.invalidations = view_cache.cache.stats()["invalidations"]
+
+    def name(self):
+        return self.hos.view_patient(self.patient_id)["data"]["PatientName"]
+
+    def test_commit_runs_after_commit_callbacks(self):
+        with mysql_helpers.transaction():
+            self.hos.update_patient(self.patient_id, name="Asha K")
+            self.assertTrue(mysql_helpers.in_transaction())
+            # Deferred: the update is not committed yet.
+            self.assertEqual(view_cache.cache.stats()["invalidations"], self.invalidations)
+        self.assertEqual(view_cache.cache.stats()["invalidations"], self.invalidations + 1)
+        self.assertEqual(self.name(), "Asha K")
+
+    def test_rollback_drops_after_commit_callbacks(self):
+        with self.assertRaises(RuntimeError):
+            with mysql_helpers.transaction():
+                self.hos.update_patient(self.patient_id, name="Asha K")
+                raise RuntimeError("abort")
+        self.assertFalse(mysql_helpers.in_transaction())
+        self.assertEqual(view_cache.cache.stats()["invalidations"], self.invalidations)
+        self.assertEqual(self.name(), "Asha")
+
+    def test_nested_block_joins_the_outer_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with mysql_helpers.transaction():
+                with mysql_helpers.transaction():
+                    self.hos.insert_patient("Ravi", 40, "Male", "5550102", "Mumbai")
+                raise RuntimeError("abort")
+        self.assertEqual(self.count("Patients"), 1)
+
+    def test_outside_a_block_after_commit_runs_at_once(self):
+        calls = []
+        mysql_helpers.after_commit(lambda: calls.append(1))
+        self.assertEqual(calls, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+# user_store.py - Login accounts with indexed lookups
+#
+# Replaces the plain users_db dict in app.py. Besides lookup by username,
+# both backends keep secondary indexes on email and on the password-reset
+# token, so register / forgot_password / reset_password no longer scan every
+# account. Expired reset tokens are evicted from the token index.
+#
+#   USER_STORE_BACKEND=memory   (default) process-local dicts
+#   USER_STORE_BACKEND=sqlite   file at USER_STORE_PATH; survives restarts and
+#                               is shared by every worker on the host
+#
+# User records are plain dicts with the same keys users_db used:
+#   {'password_hash', 'role', 'email', 'reset_token', 'reset_token_expiry'}
+# reset_token_expiry is a naive UTC datetime, as app.py produces.
+
+import heapq
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+USER_STORE_BACKEND = os.environ.get("USER_STORE_BACKEND", "memory")
+USER_STORE_PATH = os.environ.get("USER_STORE_PATH", "users.sqlite3")
+
+_FIELDS = ("password_hash", "role", "email", "reset_token", "reset_token_expiry")
+
+
+def _new_record(password_hash, role, email):
+    return {"password_hash": password_hash, "role": role, "email": email,
+            "reset_token": None, "reset_token_expiry": None}
+
+
+class InMemoryUserStore:
+    """Dict-backed store; O(1) lookups by username, email and reset token."""
+
+    def __init__(self):
+        self._users = {}         # username -> record
+        self._by_email = {}      # email -> username
+        self._by_token = {}      # reset_token -> username
+        self._expiries = []      # heap of (expiry, token) for eviction
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, username):
+        return username in self._users
+
+    def get(self, username):
+        """Return a copy of the user's record, or None."""
+        with self._lock:
+            user = self._users.get(username)
+            return dict(user) if user else None
+
+    def get_by_email(self, email):
+        """Return (username, record) for the account with this email, or (None, None)."""
+        with self._lock:
+            username = self._by_email.get(email)
+            if username is None:
+                return None, None
+            return username, dict(self._users[username])
+
+    def get_by_reset_token(self, token):
+        """
+        Return (username, record) for the account holding this reset token, or
+        (None, None). The token may have expired but not been evicted yet;
+        callers check record['reset_token_expiry'].
+        """
+        with self._lock:
+            username = self._by_token.get(token)
+            if username is None:
+                return None, None
+            return username, dict(self._users[username])
+
+    def add(self, username, password_hash, role, email):
+        """Create an account. Returns False if the username or email is already taken."""
+        with self._lock:
+            if username in self._users or email in self._by_email:
+                return False
+            self._users[username] = _new_record(password_hash, role, email)
+            self._by_email[email] = username
+            return True
+
+    def set_reset_token(self, username, token, expiry):
+        """Issue a reset token (replacing any earlier one) and evict expired tokens."""
+        with self._lock:
+            user = self._users[username]
+            if user["reset_token"] is not None:
+                self._by_token.pop(user["reset_token"], None)
+            user["reset_token"] = token
+            user["reset_token_expiry"] = expiry
+            self._by_token[token] = username
+            heapq.heappush(self._expiries, (expiry, token))
+            self._evict_expired(datetime.utcnow())
+
+    def set_password(self, username, password_hash):
+        """Store a new password hash and invalidate the user's reset token."""
+        with self._lock:
+            user = self._users[username]
+            user["password_hash"] = password_hash
+            self._clear_token(user)
+
+    def evict_expired_tokens(self, now=None):
+        """Drop every reset token that expired before `now`; returns how many."""
+        with self._lock:
+            return self._evict_expired(now or datetime.utcnow())
+
+    def _evict_expired(self, now):
+        evicted = 0
+        while self._expiries and self._expiries[0][0] <= now:
+            _, token = heapq.heappop(self._expiries)
+            username = self._by_token.get(token)
+            # The heap also holds tokens already replaced or used; skip those.
+            if username is not None and self._users[username]["reset_token"] == token:
+                self._clear_token(self._users[username])
+                evicted += 1
+        return evicted
+
+    def _clear_token(self, user):
+        if user["reset_token"] is not None:
+            self._by_token.pop(user["reset_token"], None)
+        user["reset_token"] = None
+        user["reset_token_expiry"] = None
+
+
+class SQLiteUserStore:
+    """
+    SQLite-backed store. email and reset_token are UNIQUE columns, so every
+    lookup is an index search. One connection per thread; WAL mode lets
+    several worker processes read while one writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            reset_token TEXT UNIQUE,
+            reset_token_expiry TEXT
+        );
+        CREATE INDEX IF NOT EXISTS users_reset_token_expiry
+            ON users (reset_token_expiry) WHERE reset_token IS NOT NULL;
+    """
+
+    def __init__(self, path=USER_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(row):
+        if row is None:
+            return None, None
+        user = {name: row[name] for name in _FIELDS}
+        if user["reset_token_expiry"] is not None:
+            user["reset_token_expiry"] = datetime.fromisoformat(user["reset_token_expiry"])
+        return row["username"], user
+
+    def _fetch(self, where, value):
+        row = self._conn().execute(f"SELECT * FROM users WHERE {where} = ?", (value,)).fetchone()
+        return self._record(row)
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def __contains__(self, username):
+        return self._conn().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def get(self, username):
+        return self._fetch("username", username)[1]
+
+    def get_by_email(self, email):
+        return self._fetch("email", email)
+
+    def get_by_reset_token(self, token):
+        return self._fetch("reset_token", token)
+
+    def add(self, username, password_hash, role, email):
+        try:
+            self._conn().execute(
+                "INSERT INTO users (username, password_hash, role, email) VALUES (?, ?, ?, ?)",
+                (username, password_hash, role, email))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def set_reset_token(self, username, token, expiry):
+        conn = self._conn()
+        conn.execute("UPDATE users SET reset_token = ?, reset_token_expiry = ? WHERE username = ?",
+                     (token, expiry.isoformat(), username))
+        self._evict_expired(conn, datetime.utcnow())
+
+    def set_password(self, username, password_hash):
+        self._conn().execute(
+            "UPDATE users SET password_hash = ?, reset_token = NULL, reset_token_expiry = NULL WHERE username = ?",
+            (password_hash, username))
+
+    def evict_expired_tokens(self, now=None):
+        return self._evict_expired(self._conn(), now or datetime.utcnow())
+
+    @staticmethod
+    def _evict_expired(conn, now):
+        # ISO-8601 strings of naive UTC datetimes sort chronologically.
+        cursor = conn.execute(
+            "UPDATE users SET reset_token = NULL, reset_token_expiry = NULL "
+            "WHERE reset_token IS NOT NULL AND reset_token_expiry <= ?", (now.isoformat(),))
+        return cursor.rowcount
+
+
+def create_user_store(backend=USER_STORE_BACKEND, path=USER_STORE_PATH):
+    """Build the store selected by USER_STORE_BACKEND."""
+    if backend == "memory":
+        return InMemoryUserStore()
+    if backend == "sqlite":
+        return SQLiteUserStore(path)
+    raise ValueError(f"Unknown USER_STORE_BACKEND '{backend}' (expected 'memory' or 'sqlite')")
@@ -0,0 +1,310 @@
+# view_cache.py - Read-through cache for the Hospital view methods
+#
+#   @view_cache.cached("patient", tags=lambda result, patient_id: [("patient", patient_id)])
+#   def view_patient(self, patient_id): ...
+#
+#   @view_cache.invalidates(lambda result, PatientID, **_: [("patient", PatientID)])
+#   def update_patient(self, PatientID, ...): ...
+#
+# Every cached result carries tags naming the rows it was built from, e.g. an
+# appointment list is tagged with each appointment, patient and doctor it
+# shows plus the filter it answers ("patient_appointments", 7). A write drops
+# exactly the entries tagged with what it changed: updating patient 7
+# invalidates that patient's view and every appointment list showing their
+# name; a new bill for patient 7 invalidates ("patient_bills", 7).
+#
+# Only successful results are cached, so inserts never have to chase a cached
+# "not found". Writes only invalidate after they succeed; inside a
+# mysql_helpers.transaction() block, after it commits. Views inside such a
+# block read the database directly, since they may see uncommitted rows.
+#
+# Backends (VIEW_CACHE_BACKEND):
+#   memory  (default) per-process LRU with TTL
+#   redis   any Redis-compatible server at VIEW_CACHE_URL, shared by all
+#           workers; needs the `redis` package. Values round-trip through
+#           JSON, so dates and decimals come back as strings.
+#   off     no caching
+# The memory backend only sees writes made by its own process: run several
+# workers against one database with the redis backend.
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import mysql_helpers
+from hospital_result import HospitalResult
+
+VIEW_CACHE_BACKEND = os.environ.get("VIEW_CACHE_BACKEND", "memory")
+VIEW_CACHE_SIZE = int(os.environ.get("VIEW_CACHE_SIZE", 4096))     # Entries (memory backend)
+VIEW_CACHE_TTL = float(os.environ.get("VIEW_CACHE_TTL", 60))        # Seconds
+VIEW_CACHE_URL = os.environ.get("VIEW_CACHE_URL", "redis://localhost:6379/0")
+
+logger = logging.getLogger(__name__)
+
+
+def _tag(tag):
+    kind, value = tag
+    return f"{kind}:{value}"
+
+
+# --- Backends ---
+
+class MemoryBackend:
+    """LRU of key -> (expires_at, value, tags) with a tag -> keys index."""
+
+    def __init__(self, max_entries=VIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expired = 0
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Entries are SETEX'd JSON; each tag is a Redis set of the keys carrying it.
+    Size is bounded by the server's maxmemory / eviction policy.
+    """
+
+    def __init__(self, url=VIEW_CACHE_URL, prefix="viewcache:"):
+        import redis  # Optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key):
+        raw = self._redis.get(self._prefix + key)
+        return None if raw is None else HospitalResult(json.loads(raw))
+
+    def set(self, key, value, tags, ttl):
+        ttl = max(1, int(ttl))
+        pipe = self._redis.pipeline()
+        pipe.setex(self._prefix + key, ttl, json.dumps(value, default=str))
+        for tag in tags:
+            pipe.sadd(self._prefix + "tag:" + tag, key)
+            pipe.expire(self._prefix + "tag:" + tag, ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        tag_keys = [self._prefix + "tag:" + tag for tag in tags]
+        if not tag_keys:
+            return 0
+        pipe = self._redis.pipeline()
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        keys = set()
+        for members in pipe.execute():
+            keys |= {k.decode() if isinstance(k, bytes) else k for k in members}
+        self._redis.delete(*[self._prefix + key for key in keys], *tag_keys)
+        return len(keys)
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(self._prefix + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+    def size(self):
+        return None
+
+
+# --- Cache ---
+
+class ViewCache:
+    def __init__(self, backend, ttl=VIEW_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that overlapped one is not stored,
+        # so a read racing a write cannot put the pre-write rows back.
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "skipped": 0, "invalidations": 0,
+                       "invalidated_entries": 0, "errors": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def read_through(self, key, load, tags_for):
+        """Return the cached result for key, or call load() and cache it if it succeeded."""
+        if self.backend is None:
+            return load()
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"View cache read failed for {key}: {e}")
+            self._count("errors")
+            cached = None
+        if cached is not None:
+            self._count("hits")
+            return HospitalResult(cached)
+        self._count("misses")
+
+        generation = self._generation
+        result = load()
+        if not (isinstance(result, dict) and result.get("status") == "success"):
+            return result
+        tags = frozenset(_tag(t) for t in tags_for(result))
+        # Check and store under the lock invalidate() holds, so no invalidation
+        # can slip in between the two.
+        with self._lock:
+            if generation != self._generation:
+                self._stats["skipped"] += 1
+                return result
+            try:
+                self.backend.set(key, result, tags, self.ttl)
+                self._stats["stores"] += 1
+            except Exception as e:
+                logger.warning(f"View cache write failed for {key}: {e}")
+                self._stats["errors"] += 1
+        return result
+
+    def invalidate(self, tags):
+        """Drop every entry carrying one of the (kind, id) tags."""
+        if self.backend is None:
+            return
+        tags = frozenset(_tag(t) for t in tags)
+        with self._lock:
+            self._generation += 1
+            try:
+                dropped = self.backend.invalidate(tags)
+            except Exception as e:
+                # A stale read is worse than a slow one: fall back to flushing everything.
+                logger.error(f"View cache invalidation failed ({e}); clearing the cache.")
+                self._stats["errors"] += 1
+                try:
+                    self.backend.clear()
+                except Exception as e:
+                    logger.error(f"View cache clear failed: {e}")
+                return
+            self._stats["invalidations"] += 1
+            self._stats["invalidated_entries"] += dropped
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+        if self.backend is not None:
+            snapshot["evictions"] = self.backend.evictions
+            snapshot["expired"] = self.backend.expired
+            size = self.backend.size()
+            if size is not None:
+                snapshot["entries"] = size
+        return snapshot
+
+
+def create_view_cache():
+    """Build the cache selected by VIEW_CACHE_BACKEND."""
+    if VIEW_CACHE_BACKEND == "memory":
+        return ViewCache(MemoryBackend())
+    if VIEW_CACHE_BACKEND == "redis":
+        return ViewCache(RedisBackend())
+    if VIEW_CACHE_BACKEND == "off":
+        return ViewCache(None)
+    raise ValueError(f"Unknown VIEW_CACHE_BACKEND '{VIEW_CACHE_BACKEND}' (expected 'memory', 'redis' or 'off')")
+
+
+cache = create_view_cache()
+
+
+# --- Decorators for Hospital methods ---
+
+def cached(kind, tags):
+    """
+    Serve a view method through the cache. The key is `kind` plus the bound
+    arguments; tags(result, **arguments) names the rows the result depends on.
+    """
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if mysql_helpers.in_transaction():
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(list(bound.arguments.items())[1:])  # drop self
+            key = kind + ":" + "&".join(f"{name}={value}" for name, value in arguments.items())
+            return cache.read_through(key, lambda: method(self, *args, **kwargs),
+                                      lambda result: tags(result, **arguments))
+        return wrapper
+    return decorate
+
+
+def invalidates(tags):
+    """After a successful write, drop the entries tagged with tags(result, **arguments)."""
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if isinstance(result, dict) and result.get("status") == "success":
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(list(bound.arguments.items())[1:])
+                dropped = tags(result, **arguments)
+                mysql_helpers.after_commit(lambda: cache.invalidate(dropped))
+            return result
+        return wrapper
+    return decorate
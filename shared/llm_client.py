@@ -0,0 +1,376 @@
+# llm_client.py - Deadlines, retries, hedging and a circuit breaker around LLM calls
+#
+#   client = LLMClient("gemini")
+#   response = client.call(model.generate_content, prompt)
+#   response = await client.call_async(model.generate_content_async, prompt)
+#
+# Shared by chatbot-website and "Gen project 1 LinkedIn": each project has a
+# small llm_client.py that loads this file, so `import llm_client` works from
+# either directory and there is only one implementation to change.
+#
+# Every call gets an overall deadline (LLM_DEADLINE). Within it, a failed
+# attempt is retried after a "full jitter" exponential backoff, but errors the
+# provider marks as the caller's fault (4xx other than 408/429) are not.
+# With LLM_HEDGE=1, an attempt that has not answered by the p95 latency of
+# recent calls (or LLM_HEDGE_AFTER seconds) gets a second, identical request.
+# The first answer wins and the other is abandoned.
+#
+# After LLM_BREAKER_FAILURES consecutive failed attempts the breaker opens and
+# calls fail at once with CircuitOpenError for LLM_BREAKER_COOLDOWN seconds.
+# Then one probe call is let through: success, or an error that shows the
+# provider answered (a 4xx), closes the breaker; a retryable failure reopens
+# it; a probe that ends with no outcome (cancelled, interrupted) hands the
+# slot back, so the next call probes instead.
+#
+# Callers catch LLMUnavailable and fall back to a path that needs no model
+# (rule-based parsing, cached intents, template text, or local metadata in
+# the LinkedIn pipeline).
+#
+# Synchronous calls run on a small worker pool, so a hung request costs a
+# pool thread, never the caller: the caller stops waiting at the deadline.
+#
+# Counters and the breaker state are exported through stats().
+
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 20))                  # Seconds per call, retries included
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 2))                       # Extra attempts after the first
+LLM_RETRY_BASE = float(os.environ.get("LLM_RETRY_BASE", 0.25))            # Seconds; backoff cap doubles per retry
+LLM_RETRY_MAX = float(os.environ.get("LLM_RETRY_MAX", 4))                 # Seconds; largest backoff cap
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+LLM_HEDGE_AFTER = os.environ.get("LLM_HEDGE_AFTER", "p95")                # Seconds, or p95 of recent latencies
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))     # Consecutive failures that open it
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))  # Seconds open before a probe
+LLM_CLIENT_WORKERS = int(os.environ.get("LLM_CLIENT_WORKERS", 16))
+
+HEDGE_MIN_SAMPLES = 20     # Latencies needed before the p95 is trusted for hedging
+LATENCY_WINDOW = 200       # Recent successful attempts kept for the p95
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """The model could not answer in time: breaker open, deadline passed or retries used up."""
+
+
+class CircuitOpenError(LLMUnavailable):
+    """Failing fast while the breaker is open."""
+
+
+class DeadlineExceeded(LLMUnavailable, TimeoutError):
+    """No answer before the call's deadline."""
+
+
+def is_retryable(error):
+    """Everything but client errors: a 4xx status other than 408 (timeout) and 429 (rate limit)."""
+    for attr in ("code", "status_code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int) and 400 <= status < 500:
+            return status in (408, 429)
+    return not isinstance(error, (TypeError, ValueError))
+
+
+# --- Circuit Breaker ---
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+PROBE = "probe"  # What allow() returns to the call that got the half-open probe slot
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, failures=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opens = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+        Whether a call may go out now: False, True, or PROBE for the one call
+        allowed through in half-open state, which must end with a record_*()
+        call or end_probe().
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            if self._probing:
+                return False
+            self._state = HALF_OPEN
+            self._probing = True
+            return PROBE
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive = 0
+            self._probing = False
+
+    def record_answered(self):
+        """The provider answered, if only to reject the request: a probe that gets this closes the breaker."""
+        with self._lock:
+            if self._probing:
+                self._state = CLOSED
+                self._consecutive = 0
+                self._probing = False
+
+    def end_probe(self):
+        """Release a probe slot that recorded no outcome; the next call after the cooldown probes again."""
+        with self._lock:
+            if self._probing:
+                self._probing = False
+                if self._state == HALF_OPEN:
+                    self._state = OPEN  # _opened_at unchanged, so the cooldown has already passed
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._state == HALF_OPEN or self._consecutive >= self.failures:
+                if self._state != OPEN:
+                    self.opens += 1
+                    logger.warning(f"LLM circuit breaker opened after {self._consecutive} consecutive failures.")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# --- Client ---
+
+class LLMClient:
+    def __init__(self, name="llm", deadline=LLM_DEADLINE, retries=LLM_RETRIES, retry_base=LLM_RETRY_BASE,
+                 retry_max=LLM_RETRY_MAX, hedge=LLM_HEDGE, hedge_after=LLM_HEDGE_AFTER, breaker=None,
+                 workers=LLM_CLIENT_WORKERS):
+        self.name = name
+        self.deadline = deadline
+        self.retries = retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.hedge = hedge
+        self.hedge_after = None if hedge_after in (None, "p95") else float(hedge_after)
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-call")
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "attempts": 0, "retries": 0, "hedges": 0,
+                       "hedge_wins": 0, "timeouts": 0, "rejected": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    # --- Policy ---
+
+    def _admit(self):
+        """Count a call and let it through the breaker; True if it is the half-open probe."""
+        self._count("calls")
+        allowed = self.breaker.allow()
+        if not allowed:
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name}: circuit breaker open, failing fast")
+        return allowed == PROBE
+
+    def _hedge_delay(self, hedge):
+        if not (self.hedge if hedge is None else hedge):
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def _backoff(self, attempt):
+        return self._random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    def _succeeded(self, started):
+        self.breaker.record_success()
+        with self._lock:
+            self._stats["successes"] += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def _failed(self, error):
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:  # A rejected request says the provider is up
+            self.breaker.record_answered()
+        self._count("failures")
+        if isinstance(error, DeadlineExceeded):
+            self._count("timeouts")
+
+    def _next_delay(self, error, attempt, retries, remaining):
+        """Seconds to wait before retrying after `error`, or None to give up."""
+        if attempt >= retries or not is_retryable(error) or self.breaker.state == OPEN:
+            return None
+        delay = self._backoff(attempt)
+        return delay if delay < remaining else None
+
+    # --- Synchronous ---
+
+    def call(self, fn, *args, deadline=None, retries=None, hedge=None, **kwargs):
+        """
+        fn(*args, **kwargs) under this client's deadline, retry, hedging and
+        breaker policy; keyword overrides apply to this call only.
+
+        Raises:
+            LLMUnavailable if no answer came in time; a non-retryable error from fn as-is.
+        """
+        probe = self._admit()
+        try:
+            return self._call(fn, args, kwargs, deadline, retries, hedge)
+        finally:
+            if probe:
+                self.breaker.end_probe()  # No-op if the probe recorded an outcome
+
+    def _call(self, fn, args, kwargs, deadline, retries, hedge):
+        retries = self.retries if retries is None else retries
+        end = time.monotonic() + (self.deadline if deadline is None else deadline)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = self._attempt(fn, args, kwargs, end - started, self._hedge_delay(hedge))
+            except Exception as e:
+                self._failed(e)
+                delay = self._next_delay(e, attempt, retries, end - time.monotonic())
+                if delay is None:
+                    if isinstance(e, LLMUnavailable) or not is_retryable(e):
+                        raise
+                    raise LLMUnavailable(f"{self.name}: failed after {attempt + 1} attempt(s): {e}") from e
+                logger.info(f"{self.name}: attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s.")
+                self._count("retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._succeeded(started)
+            return result
+
+    def _submit(self, fn, args, kwargs):
+        self._count("attempts")
+        return self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def _attempt(self, fn, args, kwargs, timeout, hedge_delay):
+        end = time.monotonic() + timeout
+        first = self._submit(fn, args, kwargs)
+        pending = {first}
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                self._count("hedges")
+                pending.add(self._submit(fn, args, kwargs))
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        for future in pending:
+            future.cancel()  # Cannot stop a running call; its result is ignored
+        if pending or error is None:
+            raise DeadlineExceeded(f"{self.name}: no answer within {timeout:.2f}s")
+        raise error
+
+    # --- Asynchronous ---
+
+    async def call_async(self, fn, *args, deadline=None, retries=None, hedge=None, **kwargs):
+        """Async variant of call() for coroutine functions; abandoned attempts are cancelled."""
+        probe = self._admit()
+        try:
+            return await self._call_async(fn, args, kwargs, deadline, retries, hedge)
+        finally:
+            if probe:
+                self.breaker.end_probe()  # Also runs when the caller is cancelled mid-probe
+
+    async def _call_async(self, fn, args, kwargs, deadline, retries, hedge):
+        retries = self.retries if retries is None else retries
+        end = time.monotonic() + (self.deadline if deadline is None else deadline)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = await self._attempt_async(fn, args, kwargs, end - started, self._hedge_delay(hedge))
+            except Exception as e:
+                self._failed(e)
+                delay = self._next_delay(e, attempt, retries, end - time.monotonic())
+                if delay is None:
+                    if isinstance(e, LLMUnavailable) or not is_retryable(e):
+                        raise
+                    raise LLMUnavailable(f"{self.name}: failed after {attempt + 1} attempt(s): {e}") from e
+                self._count("retries")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._succeeded(started)
+            return result
+
+    async def _attempt_async(self, fn, args, kwargs, timeout, hedge_delay):
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        self._count("attempts")
+        first = asyncio.ensure_future(fn(*args, **kwargs))
+        pending = {first}
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    self._count("hedges")
+                    self._count("attempts")
+                    pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, end - loop.time()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            if pending or error is None:
+                raise DeadlineExceeded(f"{self.name}: no answer within {timeout:.2f}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- Metrics ---
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        state = self.breaker.state
+        snapshot.update({"breaker_state": _STATE_CODES[state], "breaker_open": int(state == OPEN),
+                         "breaker_opens": self.breaker.opens})
+        hedge_after = self._hedge_delay(True)
+        snapshot["hedge_after_ms"] = round(hedge_after * 1000, 1) if hedge_after is not None else 0.0
+        return snapshot
@@ -0,0 +1,97 @@
+# test_llm_client.py - Circuit breaker probes in llm_client
+#
+#   python -m unittest test_llm_client
+#
+# A half-open probe must always end the half-open state, whatever way the
+# call finishes; otherwise every later call fails with CircuitOpenError.
+
+import asyncio
+import time
+import unittest
+
+from llm_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, LLMClient
+
+COOLDOWN = 0.05
+
+
+class ProviderDown(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def fail(error):
+    raise error
+
+
+async def fail_async(error):
+    raise error
+
+
+async def answer_async(value):
+    return value
+
+
+class ProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient("test", retries=0, breaker=CircuitBreaker(failures=1, cooldown=COOLDOWN))
+        # Open the breaker, then wait for the cooldown so the next call is the probe.
+        with self.assertRaises(Exception):
+            self.client.call(fail, ProviderDown("down"))
+        self.assertEqual(self.client.breaker.state, OPEN)
+        time.sleep(COOLDOWN * 2)
+        self.assertEqual(self.client.breaker.state, HALF_OPEN)
+
+    def tearDown(self):
+        self.client._executor.shutdown(wait=False)
+
+    def test_successful_probe_closes(self):
+        self.assertEqual(self.client.call(lambda: "ok"), "ok")
+        self.assertEqual(self.client.breaker.state, CLOSED)
+
+    def test_retryable_probe_failure_reopens(self):
+        with self.assertRaises(Exception):
+            self.client.call(fail, ProviderDown("still down"))
+        self.assertEqual(self.client.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.client.call(lambda: "ok")
+
+    def test_non_retryable_probe_error_closes(self):
+        for error in (BadRequest("bad"), ValueError("bad"), TypeError("bad")):
+            with self.subTest(error=error):
+                self.setUp()
+                with self.assertRaises(type(error)):
+                    self.client.call(fail, error)
+                self.assertEqual(self.client.breaker.state, CLOSED)
+                self.assertEqual(self.client.call(lambda: "ok"), "ok")
+
+    def test_non_retryable_async_probe_error_closes(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.client.call_async(fail_async, ValueError("bad")))
+        self.assertEqual(self.client.breaker.state, CLOSED)
+        self.assertEqual(asyncio.run(self.client.call_async(answer_async, "ok")), "ok")
+
+    def test_cancelled_async_probe_releases_the_slot(self):
+        async def cancelled_probe():
+            task = asyncio.ensure_future(self.client.call_async(asyncio.sleep, 10))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancelled_probe())
+        self.assertNotEqual(self.client.breaker.state, CLOSED)
+        self.assertEqual(asyncio.run(self.client.call_async(answer_async, "ok")), "ok")
+        self.assertEqual(self.client.breaker.state, CLOSED)
+
+    def test_timed_out_async_probe_releases_the_slot(self):
+        # What asgi_app's asyncio.wait_for(..., LLM_TIMEOUT) does to a slow call.
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(asyncio.wait_for(self.client.call_async(asyncio.sleep, 10), 0.01))
+        self.assertEqual(asyncio.run(self.client.call_async(answer_async, "ok")), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()